@@ -1,8 +1,41 @@
 import amulet
-from amulet.api.errors import ChunkLoadError, ChunkDoesNotExist
+from amulet.api.errors import ChunkDoesNotExist
 from amulet.api.chunk import Chunk
 import time
-from land_data_reader import LandDataReader
+from array import array
+from land_data_reader import LandDataError, LandDataReader
+from bedrock_keys import (
+    get_level_db, iter_prefix, iter_chunk_records, iter_chunk_coords, iter_chunk_versions, parse_digp_key,
+    split_actor_ids, chunk_exists, chunk_key_range, chunk_key, iter_subchunk_records, subchunk_indices_in_y_range,
+    version_in_range, SUBCHUNK_HEIGHT, TAG_CHECKSUMS, DIMENSION_IDS, DIGP_PREFIX, ACTOR_PREFIX
+)
+from world_compaction import compact_db, get_db_directory, print_compaction_stats
+from chunk_archive import ChunkArchiveWriter, archive_chunk
+from reset_pipeline import ResetPipeline, print_pipeline_stats
+from protection_model import ProtectionModel, DB_TO_MINECRAFT_DIMENSION
+from protection_snapshot import DEFAULT_SNAPSHOT_DIR, pack_coord
+from reset_verification import (
+    DigestFile, capture_protected_digests, verify_reset, print_verification_report, save_verification_report
+)
+from world_snapshot import create_snapshot, find_snapshot_manifest, record_reset_chunks, swap_snapshot
+from world_census import run_census, print_census, save_census
+from preview_estimate import estimate_reset, print_estimate, DEFAULT_SAMPLES as DEFAULT_ESTIMATE_SAMPLES
+from chunk_index import ChunkIndex, build_chunk_index
+from margin_sweep import sweep_margins, print_sweep, save_sweep, DEFAULT_MAX_MARGIN
+from rolling_reset import RollingCursor, build_plan, ORDER_KEY
+from reset_telemetry import (
+    ResetTelemetry, ConsoleTelemetryReporter, format_phase_summary,
+    PHASE_OPEN_WORLD, PHASE_LOAD_LANDS, PHASE_SCAN, PHASE_RESET, PHASE_SAVE, PHASE_COMPACT
+)
+from memory_profile import (
+    MemoryProfiler, print_memory_report, CHECKPOINT_LAND_LOAD, CHECKPOINT_PROTECTION_BUILD, CHECKPOINT_SCAN,
+    CHECKPOINT_DELETE, CHECKPOINT_PRE_SAVE, CHECKPOINT_SAVE
+)
+from decision_export import (
+    DecisionWriter, ChunkDecision, DECISION_PRESERVE, DECISION_RESET, DECISION_ERROR,
+    REASON_PRESERVE_LIST, REASON_UNPROTECTED, REASON_LOAD_ERROR,
+    REASON_DELETE_ERROR, REASON_VERSION_FILTER
+)
 
 class ChunkAutoResetter:
     """
@@ -10,45 +43,154 @@ class ChunkAutoResetter:
     支持与EndStone ARC Core领地插件集成
     """
     
-    def __init__(self, world_path, land_db_path=None):
+    def __init__(self, world_path, land_db_path=None, pipeline_queue_size=256, delete_batch_size=64,
+                 pipeline_max_queued_mb=64, protection_cache_dir=DEFAULT_SNAPSHOT_DIR):
         """
         初始化区块重置器
         
         Args:
             world_path (str): Minecraft世界路径
             land_db_path (str): 领地数据库路径，如果不提供则不使用领地保护
+            pipeline_queue_size (int): 重置流水线中每个队列的最大长度（预读的区块数量上限）
+            delete_batch_size (int): 重置流水线提交阶段每批处理的区块数量
+            pipeline_max_queued_mb (float): 重置流水线中尚未提交的预读记录总大小上限（MB，扫描阶段的内存上限），
+                                            None 表示只受队列长度限制
+            protection_cache_dir (str): 编译后的保护快照目录（相对路径相对于领地数据库所在目录），
+                                        之后的运行直接内存映射加载保护区块表；
+                                        None 表示每次都从领地表重新计算
         """
         self.world_path = world_path
         self.land_db_path = land_db_path
+        self.pipeline_queue_size = pipeline_queue_size
+        self.delete_batch_size = delete_batch_size
+        self.pipeline_max_queued_mb = pipeline_max_queued_mb
+        self.protection_cache_dir = protection_cache_dir
         self.level = None
         self.land_reader = None
         
+        # 本次运行中被修改过的键范围：key -> [最小键, 最大键]，用于按范围压缩数据库
+        self._touched_key_ranges = {}
+        
+        # 世界是快照的世界副本时，记录被重置的区块 {维度ID: array('q', [cx, cz, ...])}，保存后写入 snapshot.json
+        self._snapshot_manifest = find_snapshot_manifest(world_path)
+        self._unrecorded_reset_chunks = {}
+        
+        # 领地保护模型（与GUI共享，按维度/额外保护距离/领地数据版本缓存）
+        self.protection_model = None
+        
         # 维度名称映射：领地数据库维度名 -> Minecraft维度名
-        self.dimension_mapping = {
-            'Overworld': 'minecraft:overworld',      # 首字母大写
-            'Nether': 'minecraft:the_nether',        # 首字母大写
-            'TheEnd': 'minecraft:the_end',           # 驼峰命名
-            # 兼容小写格式（如果有的话）
-            'overworld': 'minecraft:overworld',
-            'nether': 'minecraft:the_nether',
-            'the_end': 'minecraft:the_end'
-        }
+        self.dimension_mapping = DB_TO_MINECRAFT_DIMENSION
+        
+        # 运行遥测（当前阶段、速度、剩余时间），可在其他线程中轮询 telemetry.snapshot()
+        self.telemetry = ResetTelemetry()
+        
+        # 可选的内存剖析，默认关闭（见 enable_memory_profiling）
+        self.memory_profiler = None
+        
+        # 重置结果校验：重置前的受保护区块摘要和本次删除的区块（见 begin_verification）
+        self._verification = None
         
+    def enable_memory_profiling(self, report_path=None, trace_allocations=True, top_n=10):
+        """
+        开启内存剖析：在每个阶段结束时记录 RSS 和 tracemalloc 检查点
+        
+        检查点写入 stats['memory']，并在每个检查点后立即重写报告文件，
+        进程因内存不足被杀死时，报告中最后一个检查点之后的阶段即为出问题的阶段。
+        
+        Args:
+            report_path (str): 报告文件路径（JSON），None 表示只写入统计信息
+            trace_allocations (bool): 是否跟踪分配位置（tracemalloc，会明显降低速度），False 时只记录 RSS
+            top_n (int): 每个检查点记录的分配位置数量
+        
+        Returns:
+            MemoryProfiler: 剖析器
+        """
+        self.disable_memory_profiling()
+        self.memory_profiler = MemoryProfiler(report_path, trace_allocations, top_n).start()
+        return self.memory_profiler
+    
+    def disable_memory_profiling(self):
+        """关闭内存剖析"""
+        if self.memory_profiler is not None:
+            self.memory_profiler.stop()
+            self.memory_profiler = None
+    
+    def _memory_checkpoint(self, phase, stats=None, **details):
+        """未开启内存剖析时直接返回；否则记录检查点，并把报告写入 stats['memory']"""
+        if self.memory_profiler is None:
+            return
+        self.memory_profiler.checkpoint(phase, **details)
+        if stats is not None:
+            stats['memory'] = self.memory_profiler.report()
+    
+    def begin_verification(self, digest_path, dimension="minecraft:overworld", extra_protection_distance=0,
+                           protected=None, progress_callback=None):
+        """
+        重置前记录受保护区块原始记录的摘要，之后删除的区块会被记录下来，保存世界后调用 finish_verification 校验
+        
+        Args:
+            digest_path (str): 摘要文件路径
+            dimension (str): 维度名称
+            extra_protection_distance (int): 额外保护距离（区块单位），默认为0
+            protected: 受保护的区块坐标，None 时使用领地保护的区块（手动保留区块时传入保留列表）
+            progress_callback: 可选的进度回调函数，格式为 callback(current, total, message)
+        
+        Returns:
+            int: 记录了摘要的受保护区块数量，世界未加载时返回 None
+        """
+        if not self.level:
+            print("错误: 世界未加载")
+            return None
+        if protected is None:
+            protected = self.get_land_protection_map(dimension, extra_protection_distance)
+        print("正在记录受保护区块的摘要...")
+        digest_file = capture_protected_digests(get_level_db(self.level), dimension, protected, digest_path,
+                                                world_path=self.world_path, progress_callback=progress_callback)
+        self._verification = {'digest_path': digest_path, 'dimension': dimension, 'reset_chunks': array('Q')}
+        return len(digest_file)
+    
+    def finish_verification(self, report_path=None, progress_callback=None):
+        """
+        保存世界后校验：受保护区块的记录与重置前一致，本次删除的区块在数据库中没有残留记录
+        
+        Args:
+            report_path (str): 可选的校验报告路径（JSON）
+            progress_callback: 可选的进度回调函数，格式为 callback(current, total, message)
+        
+        Returns:
+            dict: 校验结果，格式见 reset_verification.verify_reset；没有调用 begin_verification 时返回 None
+        """
+        if not self.level or self._verification is None:
+            print("错误: 没有进行中的重置校验")
+            return None
+        verification, self._verification = self._verification, None
+        print("正在校验重置结果...")
+        result = verify_reset(get_level_db(self.level), DigestFile.load(verification['digest_path']),
+                              verification['reset_chunks'], progress_callback)
+        print_verification_report(result)
+        if report_path:
+            save_verification_report(result, report_path)
+            print(f"校验报告已保存到: {report_path}")
+        return result
+    
     def load_world(self):
         """加载Minecraft世界"""
         try:
-            self.level = amulet.load_level(self.world_path)
+            with self.telemetry.phase(PHASE_OPEN_WORLD):
+                self.level = amulet.load_level(self.world_path)
             print(f"成功加载世界: {self.world_path}")
             
-            # 如果提供了领地数据库路径，则初始化领地读取器
-            if self.land_db_path:
+            # 如果提供了领地数据库路径，则初始化领地读取器（调用方已提供读取器时直接使用）
+            if self.land_db_path and self.land_reader is None:
                 try:
                     self.land_reader = LandDataReader(self.land_db_path)
+                    self.protection_model = ProtectionModel(self.land_reader, snapshot_dir=self.protection_cache_dir)
                     print(f"成功连接到领地数据库: {self.land_db_path}")
                 except Exception as e:
                     print(f"警告: 无法连接到领地数据库 {self.land_db_path}: {e}")
                     print("将继续执行，但无法使用领地保护功能")
                     self.land_reader = None
+                    self.protection_model = None
             
             return True
         except Exception as e:
@@ -61,6 +203,101 @@ class ChunkAutoResetter:
             self.level.close()
             print("世界已关闭")
     
+    def _mark_key_range_touched(self, range_id, start_key, end_key):
+        """记录一个被修改过的键范围，同一 range_id 的范围会合并"""
+        current = self._touched_key_ranges.get(range_id)
+        if current is None:
+            self._touched_key_ranges[range_id] = [start_key, end_key]
+        else:
+            current[0] = min(current[0], start_key)
+            current[1] = max(current[1], end_key)
+    
+    def _mark_chunk_touched(self, cx, cz, dimension):
+        """记录被删除区块的键范围"""
+        dim_id = DIMENSION_IDS.get(dimension, 0)
+        self._mark_key_range_touched(('chunk', dim_id), *chunk_key_range(cx, cz, dim_id))
+        if self._snapshot_manifest is not None:
+            self._unrecorded_reset_chunks.setdefault(dim_id, array('q')).extend((cx, cz))
+    
+    def _open_archive(self, archive_path):
+        """创建区块前像存档写入器"""
+        if not archive_path:
+            return None
+        writer = ChunkArchiveWriter(archive_path)
+        print(f"重置前的区块数据将写入存档: {archive_path} (压缩算法: {writer.codec})")
+        return writer
+    
+    def _close_archive(self, archive_writer, stats):
+        """关闭区块前像存档并把存档信息写入统计"""
+        if archive_writer is None:
+            return
+        archive_writer.close()
+        stats['archived_chunks'] = archive_writer.chunk_count
+        stats['archive_raw_bytes'] = archive_writer.raw_bytes
+        stats['archive_bytes'] = archive_writer.archive_bytes
+        print(f"已存档区块数量: {archive_writer.chunk_count} "
+              f"(原始 {archive_writer.raw_bytes / 1024 / 1024:.2f} MB, "
+              f"压缩后 {archive_writer.archive_bytes / 1024 / 1024:.2f} MB)")
+    
+    def _delete_chunk(self, cx, cz, dimension, archive_writer=None, records=None):
+        """
+        删除一个区块，删除前可先把原始记录写入前像存档
+        
+        Args:
+            cx (int): 区块X坐标
+            cz (int): 区块Z坐标
+            dimension (str): 维度名称
+            archive_writer (ChunkArchiveWriter): 可选的存档写入器，存档失败时不会删除区块
+            records (list): 已预读的区块原始记录，为 None 时从数据库读取
+        """
+        # 0. 写入前像存档（失败时抛出异常，区块保持不变）
+        if archive_writer is not None:
+            dim_id = DIMENSION_IDS.get(dimension, 0)
+            if records is not None:
+                archive_writer.add_chunk(dim_id, cx, cz, records)
+            else:
+                archive_chunk(archive_writer, get_level_db(self.level), cx, cz, dim_id)
+        
+        # 正确的区块重置方法：删除后注册空区块
+        # 1. 删除现有区块（先记录键范围，删除后不会再有可能失败的步骤）
+        self._mark_chunk_touched(cx, cz, dimension)
+        self.level.delete_chunk(cx, cz, dimension)
+        if self._verification is not None and self._verification['dimension'] == dimension:
+            self._verification['reset_chunks'].append(pack_coord(cx, cz))
+        
+        # 2. 注册空区块到历史数据库（防止状态不一致）
+        key = (dimension, cx, cz)
+        if key not in self.level.chunks._history_database:
+            self.level.chunks._register_original_entry(key, Chunk(cx, cz))
+    
+    def _open_decision_export(self, export_path):
+        """创建区块决策流式导出写入器"""
+        if not export_path:
+            return None
+        writer = DecisionWriter(export_path)
+        print(f"区块决策列表将导出到: {export_path} (格式: {writer.format})")
+        return writer
+    
+    def _close_decision_export(self, decision_writer, stats):
+        """关闭区块决策导出文件并把导出数量写入统计"""
+        if decision_writer is None:
+            return
+        decision_writer.close()
+        stats['exported_decisions'] = decision_writer.count
+        print(f"已导出 {decision_writer.count} 条区块决策到: {decision_writer.path}")
+    
+    def _export_decision(self, decision_writer, cx, cz, dimension, decision, reason, land_id=None,
+                         stored_bytes=None):
+        """写入一条区块决策，附带区块在数据库中的存储字节数（未提供时从数据库读取）"""
+        if decision_writer is None:
+            return
+        if stored_bytes is None:
+            stored_bytes = sum(
+                len(key) + len(value)
+                for key, value in iter_chunk_records(get_level_db(self.level), cx, cz, DIMENSION_IDS.get(dimension, 0))
+            )
+        decision_writer.write(cx, cz, dimension, decision, reason, land_id, stored_bytes)
+    
     def get_chunks_covered_by_lands(self, dimension="minecraft:overworld", extra_protection_distance=0):
         """
         获取被领地覆盖的所有区块坐标（包括额外保护距离）
@@ -72,67 +309,362 @@ class ChunkAutoResetter:
         Returns:
             set: 被领地覆盖的区块坐标集合 {(cx1, cz1), (cx2, cz2), ...}
         """
+        return set(self.get_land_protection_map(dimension, extra_protection_distance))
+    
+    def get_land_protection_map(self, dimension="minecraft:overworld", extra_protection_distance=0):
+        """
+        获取被领地覆盖的区块及其保护原因
+        
+        结果由共享的保护模型按 (维度, 额外保护距离, 领地数据版本) 缓存，
+        GUI 加载配置后再预览不会重复读取和计算领地。
+        
+        Args:
+            dimension (str): Minecraft维度名称
+            extra_protection_distance (int): 额外保护距离（区块单位），默认为0
+            
+        Returns:
+            dict: {(cx, cz): (原因, 领地ID)}，原因为 'land'（领地范围内）或 'margin'（额外保护距离内）；
+                  同一区块被多个领地覆盖时，领地范围优先于额外保护距离；没有提供领地数据库时为空
+        
+        Raises:
+            LandDataError: 提供了领地数据库但无法读取（数据库被锁定、文件不存在等）；
+                           不返回空的保护表，避免所有区块都被当作不受保护
+        """
         if not self.land_reader:
+            if self.land_db_path:
+                raise LandDataError(f"无法读取领地数据库 {self.land_db_path}，拒绝在没有领地保护的情况下继续")
             print("警告: 领地数据读取器未初始化，无法获取领地覆盖的区块")
-            return set()
+            return {}
+        if self.protection_model is None or self.protection_model.land_reader is not self.land_reader:
+            self.protection_model = ProtectionModel(self.land_reader, snapshot_dir=self.protection_cache_dir)
         
-        # 将Minecraft维度名转换为领地数据库维度名
-        db_dimension = None
-        for db_dim, mc_dim in self.dimension_mapping.items():
-            if mc_dim == dimension:
-                db_dimension = db_dim
-                break
-        
-        if not db_dimension:
+        if not self.protection_model.get_db_dimension(dimension):
             print(f"警告: 不支持的维度 {dimension}")
-            return set()
+            return {}
         
         try:
-            # 获取指定维度的所有领地
-            lands = self.land_reader.get_lands_by_dimension(db_dimension)
-            covered_chunks = set()
-            
-            print(f"在维度 {db_dimension} 中找到 {len(lands)} 个领地")
-            
-            for land in lands:
-                # 获取领地边界坐标
-                min_x, min_z = land['min_x'], land['min_z']
-                max_x, max_z = land['max_x'], land['max_z']
-                
-                # 计算覆盖的区块范围
-                start_chunk_x = min_x // 16
-                start_chunk_z = min_z // 16
-                end_chunk_x = max_x // 16
-                end_chunk_z = max_z // 16
-                
-                # 应用额外保护距离
-                protected_start_x = start_chunk_x - extra_protection_distance
-                protected_start_z = start_chunk_z - extra_protection_distance
-                protected_end_x = end_chunk_x + extra_protection_distance
-                protected_end_z = end_chunk_z + extra_protection_distance
-                
-                # 添加所有被覆盖的区块（包括额外保护范围）
-                for cx in range(protected_start_x, protected_end_x + 1):
-                    for cz in range(protected_start_z, protected_end_z + 1):
-                        covered_chunks.add((cx, cz))
-                
-                if extra_protection_distance > 0:
-                    print(f"领地 '{land['land_name']}' (ID: {land['land_id']}) 覆盖区块 "
-                          f"({start_chunk_x}, {start_chunk_z}) 到 ({end_chunk_x}, {end_chunk_z})，"
-                          f"额外保护后: ({protected_start_x}, {protected_start_z}) 到 ({protected_end_x}, {protected_end_z})")
-                else:
-                    print(f"领地 '{land['land_name']}' (ID: {land['land_id']}) 覆盖区块 "
-                          f"({start_chunk_x}, {start_chunk_z}) 到 ({end_chunk_x}, {end_chunk_z})")
+            with self.telemetry.phase(PHASE_LOAD_LANDS):
+                lands = self.protection_model.get_lands(dimension)
+                self._memory_checkpoint(CHECKPOINT_LAND_LOAD, lands=len(lands))
+                covered_chunks = self.protection_model.get_protection_map(dimension, extra_protection_distance)
+                self.telemetry.update(current=len(covered_chunks))
+                self._memory_checkpoint(CHECKPOINT_PROTECTION_BUILD, protected_chunks=len(covered_chunks))
             
+            print(f"在维度 {self.protection_model.get_db_dimension(dimension)} 中找到 {len(lands)} 个领地")
             print(f"总共有 {len(covered_chunks)} 个区块被领地覆盖")
             return covered_chunks
             
         except Exception as e:
             print(f"获取领地覆盖区块时发生错误: {e}")
-            return set()
+            raise
+    
+    def _scan_existing_chunks(self, dimension, search_range, stats, with_versions=False):
+        """
+        按数据库键顺序扫描搜索范围内实际存在的区块
+        
+        只顺序扫描键得到区块坐标（不读取区块数据），后续的预读和删除按同样的顺序进行，
+        使 LevelDB 按存储顺序访问数据，避免按行列顺序随机探测。
+        
+        Args:
+            dimension (str): 维度名称
+            search_range (int): 搜索范围（以区块为单位）
+            stats (dict): 统计信息，会写入 total_checked；with_versions 时还会写入
+                          chunk_versions（版本号 -> 区块数量，未知版本记为 -1）
+            with_versions (bool): 是否在同一次扫描中读取每个区块的版本号
+        
+        Returns:
+            tuple: (coords, versions)，coords 为交替存放 cx, cz 的紧凑数组；
+                   versions 为与之对应的版本号数组（未知为 -1），未读取版本时为 None
+        """
+        print("正在按数据库键顺序扫描区块...")
+        scan_start = time.time()
+        db = get_level_db(self.level)
+        dim_id = DIMENSION_IDS.get(dimension, 0)
+        coords = array('i')
+        versions = None
+        with self.telemetry.phase(PHASE_SCAN):
+            if with_versions:
+                versions = array('h')
+                histogram = {}
+                for cx, cz, version in iter_chunk_versions(db, dim_id, search_range):
+                    version = -1 if version is None else version
+                    coords.append(cx)
+                    coords.append(cz)
+                    versions.append(version)
+                    histogram[version] = histogram.get(version, 0) + 1
+                    if len(versions) % 1000 == 0:
+                        self.telemetry.update(current=len(versions))
+                stats['chunk_versions'] = dict(sorted(histogram.items()))
+            else:
+                for cx, cz in iter_chunk_coords(db, dim_id, search_range):
+                    coords.append(cx)
+                    coords.append(cz)
+                    if len(coords) % 2000 == 0:
+                        self.telemetry.update(current=len(coords) // 2)
+            self.telemetry.update(current=len(coords) // 2)
+        stats['total_checked'] = (search_range * 2 + 1) ** 2
+        self._memory_checkpoint(CHECKPOINT_SCAN, stats, chunks=len(coords) // 2)
+        print(f"扫描完成，范围内共有 {len(coords) // 2} 个区块，耗时 {time.time() - scan_start:.1f} 秒")
+        return coords, versions
+    
+    @staticmethod
+    def version_in_range(version, version_range):
+        """
+        判断区块版本号是否在版本范围内
+        
+        Args:
+            version (int): 区块版本号，-1 或 None 表示未知
+            version_range (tuple): (最小版本, 最大版本)，包含端点，None 表示不限
+        
+        Returns:
+            bool: 是否在范围内；范围有任一端点时，未知版本视为不在范围内
+        """
+        return version_in_range(version, version_range)
+    
+    @staticmethod
+    def format_version_range(version_range):
+        """把版本范围格式化为便于阅读的文本"""
+        min_version, max_version = version_range
+        return f"{'不限' if min_version is None else min_version} ~ {'不限' if max_version is None else max_version}"
+    
+    @staticmethod
+    def print_version_stats(stats):
+        """打印区块版本分布和因版本过滤而保留的区块数量"""
+        print("区块版本分布:")
+        for version, count in stats.get('chunk_versions', {}).items():
+            print(f"  {'未知' if version < 0 else version}: {count} 个区块")
+        print(f"因版本不在范围内而保留的区块数量: {stats.get('version_filtered_chunks', 0)}")
+    
+    @staticmethod
+    def land_classifier(covered):
+        """
+        按领地保护表分类的 classify 函数（用于 iter_decisions）
+        
+        Args:
+            covered (dict): get_land_protection_map 的结果 {(cx, cz): (原因, 领地ID)}
+        
+        Returns:
+            callable: classify(cx, cz) -> (决策, 原因, 领地ID)
+        """
+        def classify(cx, cz):
+            protection = covered.get((cx, cz))
+            if protection is not None:
+                return (DECISION_PRESERVE,) + protection
+            return DECISION_RESET, REASON_UNPROTECTED, None
+        return classify
+    
+    @staticmethod
+    def preserve_list_classifier(preserve_chunks):
+        """
+        按保留列表分类的 classify 函数（用于 iter_decisions）
+        
+        Args:
+            preserve_chunks (iterable): 要保留的区块坐标 [(cx1, cz1), (cx2, cz2), ...]
+        
+        Returns:
+            callable: classify(cx, cz) -> (决策, 原因, 领地ID)
+        """
+        preserve_set = set(preserve_chunks)
+        
+        def classify(cx, cz):
+            if (cx, cz) in preserve_set:
+                return DECISION_PRESERVE, REASON_PRESERVE_LIST, None
+            return DECISION_RESET, REASON_UNPROTECTED, None
+        return classify
+    
+    def iter_decisions(self, dimension, search_range, classify, stats=None, dry_run=True, version_range=None,
+                       archive_path=None, with_sizes=False, progress_callback=None):
+        """
+        按数据库键顺序逐个产生区块决策的惰性迭代器
+        
+        读取线程按键顺序预读区块的原始记录，分类线程调用 classify 做出决策，
+        实际执行时删除和存档在迭代的线程中按批执行，然后逐条产生决策。
+        内存占用只与流水线队列长度有关；调用方可以随时停止迭代（或调用迭代器的 close()），
+        之后的区块不会再被处理，流水线线程和存档会被正常关闭。
+        
+        注意：第一次取值时会先定位搜索范围内所有存在的区块（只读键，见 _scan_existing_chunks），
+        完成后才产生第一个决策，范围很大时第一个决策需要等待这次扫描；之后的决策随流水线逐个产生。
+        
+        Args:
+            dimension (str): 维度名称
+            search_range (int): 搜索范围（以区块为单位）
+            classify (callable): classify(cx, cz) -> (决策, 原因, 领地ID)，在分类线程中调用，不能访问世界对象；
+                                 见 land_classifier / preserve_list_classifier
+            stats (dict): 可选的统计信息，会写入 total_checked、found_chunks、preserved_chunks、reset_chunks、
+                          errors 和流水线统计
+            dry_run (bool): 是否为试运行模式；False 时每个重置区块在产生决策之前已被删除（需要之后 save_world）
+            version_range (tuple): 可选的区块版本范围 (最小版本, 最大版本)，包含端点，None 表示不限；
+                                   提供时只重置版本在范围内的区块，其余区块以 version_filter 原因保留
+            archive_path (str): 可选的前像存档路径（仅实际执行时使用）
+            with_sizes (bool): 是否预读区块记录以得到 stored_bytes，否则 stored_bytes 为 None
+            progress_callback: 可选的进度回调函数，格式为 callback(current, total, message)
+        
+        Yields:
+            ChunkDecision: (cx, cz, dimension, decision, reason, land_id, stored_bytes)；
+                           加载或删除失败的区块决策为 error
+        """
+        if not self.level:
+            print("错误: 世界未加载")
+            return
+        if stats is None:
+            stats = {}
+        for key in ('found_chunks', 'preserved_chunks', 'reset_chunks', 'errors'):
+            stats.setdefault(key, 0)
+        
+        archive_writer = pipeline = batches = None
+        processed = 0
+        try:
+            archive_writer = None if dry_run else self._open_archive(archive_path)
+            read_records = archive_writer is not None or with_sizes
+            
+            coords, versions = self._scan_existing_chunks(dimension, search_range, stats,
+                                                          with_versions=version_range is not None)
+            total = len(coords) // 2
+            if version_range is not None:
+                stats['version_filtered_chunks'] = 0
+                base_classify = classify
+            
+                def classify(cx, cz, version):
+                    # 领地保护优先于版本过滤，保留原因如实记录为领地/保留列表
+                    verdict = base_classify(cx, cz)
+                    if verdict[0] == DECISION_RESET and not self.version_in_range(version, version_range):
+                        return DECISION_PRESERVE, REASON_VERSION_FILTER, None
+                    return verdict
+            
+                coord_pairs = ((coords[index * 2], coords[index * 2 + 1], versions[index]) for index in range(total))
+            else:
+                coord_pairs = ((coords[index * 2], coords[index * 2 + 1]) for index in range(total))
+            pipeline = ResetPipeline(
+                get_level_db(self.level), DIMENSION_IDS.get(dimension, 0), classify,
+                read_records=read_records, queue_size=self.pipeline_queue_size, batch_size=self.delete_batch_size,
+                max_queued_bytes=(int(self.pipeline_max_queued_mb * 1024 * 1024)
+                                  if self.pipeline_max_queued_mb is not None else None)
+            )
+            
+            self.telemetry.begin_phase(PHASE_RESET, total)
+            batches = pipeline.run(coord_pairs)
+            for batch in batches:
+                for cx, cz, decision, reason, land_id, stored_bytes, records, error in batch:
+                    processed += 1
+                    self.telemetry.update(advance=1, add_bytes=stored_bytes or 0)
+                    if processed % 1000 == 0:
+                        print(f"已检查 {processed} 个区块...")
+                    if progress_callback and processed % 100 == 0:
+                        read_depth, decision_depth = pipeline.queue_depths()
+                        progress_callback(processed, total, f"检查区块 {processed}/{total} "
+                                                            f"(预读队列 {read_depth}, 决策队列 {decision_depth})")
+                    
+                    if error is not None:
+                        stats['errors'] += 1
+                        print(f"区块加载错误 ({cx}, {cz}): {error}")
+                        yield ChunkDecision(cx, cz, dimension, DECISION_ERROR, REASON_LOAD_ERROR, None, 0)
+                        continue
+                    
+                    if not read_records:
+                        stored_bytes = None
+                    stats['found_chunks'] += 1
+                    if decision == DECISION_PRESERVE:
+                        stats['preserved_chunks'] += 1
+                        if reason == REASON_VERSION_FILTER:
+                            stats['version_filtered_chunks'] += 1
+                        yield ChunkDecision(cx, cz, dimension, DECISION_PRESERVE, reason, land_id, stored_bytes)
+                        continue
+                    
+                    # 重置区块
+                    if not dry_run:
+                        try:
+                            self._delete_chunk(cx, cz, dimension, archive_writer, records)
+                        except Exception as e:
+                            print(f"重置区块 ({cx}, {cz}) 时发生错误: {e}")
+                            stats['errors'] += 1
+                            yield ChunkDecision(cx, cz, dimension, DECISION_ERROR, REASON_DELETE_ERROR,
+                                                None, stored_bytes)
+                            continue
+                    stats['reset_chunks'] += 1
+                    yield ChunkDecision(cx, cz, dimension, DECISION_RESET, reason, None, stored_bytes)
+        finally:
+            # 提前停止迭代时先结束流水线线程；打开存档或扫描坐标失败时流水线还没有开始
+            if batches is not None:
+                batches.close()
+                self.telemetry.end_phase()
+                pipeline.report(stats)
+                self._memory_checkpoint(CHECKPOINT_DELETE, stats, chunks=processed)
+            self._close_archive(archive_writer, stats)
+    
+    def iter_reset_decisions(self, dimension="minecraft:overworld", search_range=50, extra_protection_distance=0,
+                             preserve_chunks=None, dry_run=True, version_range=None, archive_path=None,
+                             with_sizes=False, progress_callback=None, stats=None):
+        """
+        按领地保护（或保留列表）逐个产生区块决策，参数与 reset_chunks_except_lands 相同
+        
+        例如只查看将被重置的区块，找到 100 个后停止：
+            for decision in itertools.islice(
+                    (d for d in resetter.iter_reset_decisions(search_range=750) if d.decision == 'reset'), 100):
+                print(decision.cx, decision.cz)
+        
+        Args:
+            preserve_chunks (iterable): 要保留的区块坐标列表；提供时按保留列表分类，不使用领地保护
+            其余参数见 reset_chunks_except_lands 和 iter_decisions
+        
+        Yields:
+            ChunkDecision: (cx, cz, dimension, decision, reason, land_id, stored_bytes)
+        """
+        if preserve_chunks is not None:
+            classify = self.preserve_list_classifier(preserve_chunks)
+        else:
+            covered = self.get_land_protection_map(dimension, extra_protection_distance)
+            if stats is not None:
+                stats['land_protected_chunks'] = len(covered)
+            classify = self.land_classifier(covered)
+        yield from self.iter_decisions(dimension, search_range, classify, stats, dry_run, version_range,
+                                       archive_path, with_sizes, progress_callback)
+    
+    def _run_reset_pipeline(self, dimension, search_range, classify, stats, dry_run=True,
+                            progress_callback=None, archive_path=None, export_path=None,
+                            preserve_label="领地保护", log_limit=10, version_range=None):
+        """
+        消费 iter_decisions 产生的决策：输出日志并写入决策导出文件
+        
+        Args:
+            dimension (str): 维度名称
+            search_range (int): 搜索范围（以区块为单位）
+            classify (callable): classify(cx, cz) -> (决策, 原因, 领地ID)，见 iter_decisions
+            stats (dict): 统计信息
+            dry_run (bool): 是否为试运行模式
+            progress_callback: 可选的进度回调函数，格式为 callback(current, total, message)
+            archive_path (str): 可选的前像存档路径
+            export_path (str): 可选的决策导出路径
+            preserve_label (str): 输出保留区块时显示的原因
+            log_limit (int): 保留/重置区块各最多输出多少条，None 表示全部输出
+            version_range (tuple): 可选的区块版本范围，见 iter_decisions
+        """
+        decision_writer = self._open_decision_export(export_path)
+        
+        def log_chunk(count, message, more_message):
+            if log_limit is None or count <= log_limit:
+                print(message)
+            elif count == log_limit + 1:
+                print(more_message)
+        
+        try:
+            for record in self.iter_decisions(dimension, search_range, classify, stats, dry_run, version_range,
+                                              archive_path, decision_writer is not None, progress_callback):
+                self._export_decision(decision_writer, *record)
+                if record.decision == DECISION_PRESERVE:
+                    # 版本过滤保留的区块可能很多，只计数不逐条输出
+                    if record.reason != REASON_VERSION_FILTER:
+                        log_chunk(stats['preserved_chunks'], f"保留区块 ({preserve_label}): ({record.cx}, {record.cz})",
+                                  "... (更多保留区块)")
+                elif record.decision == DECISION_RESET:
+                    log_chunk(stats['reset_chunks'],
+                              f"{'将重置' if dry_run else '已重置'}区块: ({record.cx}, {record.cz})",
+                              "... (更多重置区块)")
+        finally:
+            self._close_decision_export(decision_writer, stats)
     
     def reset_chunks_except_lands(self, dimension="minecraft:overworld", search_range=50, 
-                                 extra_protection_distance=0, dry_run=True, progress_callback=None):
+                                 extra_protection_distance=0, dry_run=True, progress_callback=None,
+                                 archive_path=None, export_path=None, version_range=None):
         """
         重置除领地覆盖区块外的所有区块
         
@@ -142,6 +674,12 @@ class ChunkAutoResetter:
             extra_protection_distance (int): 额外保护距离（区块单位），默认为0
             dry_run (bool): 是否为试运行模式，True时不会实际修改世界
             progress_callback: 可选的进度回调函数，格式为 callback(current, total, message)
+            archive_path (str): 可选的前像存档路径，实际执行时会先把要删除的区块原始数据写入存档，
+                                之后可用 chunk_archive.py restore 恢复全部或部分区块
+            export_path (str): 可选的决策导出路径（.csv / .jsonl / .bin），扫描时逐条写入每个区块的
+                               坐标、决策、原因和存储大小
+            version_range (tuple): 可选的区块版本范围 (最小版本, 最大版本)，包含端点，None 表示不限；
+                                   提供时只重置不受保护且版本在范围内的区块（例如旧版本生成的区块）
         
         Returns:
             dict: 包含统计信息的字典
@@ -150,8 +688,8 @@ class ChunkAutoResetter:
             print("错误: 世界未加载")
             return None
         
-        # 获取被领地覆盖的区块（包括额外保护距离）
-        land_covered_chunks = self.get_chunks_covered_by_lands(dimension, extra_protection_distance)
+        # 获取被领地覆盖的区块及保护原因（包括额外保护距离）
+        land_covered_chunks = self.get_land_protection_map(dimension, extra_protection_distance)
         
         stats = {
             'total_checked': 0,
@@ -168,67 +706,13 @@ class ChunkAutoResetter:
             print(f"额外保护距离: {extra_protection_distance} 区块")
         print(f"搜索范围: -{search_range} 到 {search_range}")
         print(f"维度: {dimension}")
+        if version_range is not None:
+            print(f"区块版本范围: {self.format_version_range(version_range)}")
         print("-" * 50)
         
-        # 计算总的检查坐标数（用于进度显示）
-        total_coords = (search_range * 2 + 1) ** 2
-        
-        # 遍历指定范围内的所有可能区块坐标
-        for cx in range(-search_range, search_range + 1):
-            for cz in range(-search_range, search_range + 1):
-                stats['total_checked'] += 1
-                
-                # 显示进度
-                if stats['total_checked'] % 1000 == 0:
-                    print(f"已检查 {stats['total_checked']} 个坐标...")
-                
-                # 调用进度回调
-                if progress_callback and stats['total_checked'] % 100 == 0:
-                    progress_callback(stats['total_checked'], total_coords, 
-                                    f"检查区块 {stats['total_checked']}/{total_coords}")
-                
-                try:
-                    # 尝试获取区块
-                    chunk = self.level.get_chunk(cx, cz, dimension)
-                    stats['found_chunks'] += 1
-                    # 检查是否被领地覆盖
-                    if (cx, cz) in land_covered_chunks:
-                        stats['preserved_chunks'] += 1
-                        if stats['preserved_chunks'] <= 10:  # 只显示前10个保留的区块
-                            print(f"保留区块 (领地保护): ({cx}, {cz})")
-                        elif stats['preserved_chunks'] == 11:
-                            print("... (更多保留区块)")
-                    else:
-                        # 重置区块
-                        if not dry_run:
-                            # 正确的区块重置方法：删除后注册空区块
-                            try:
-                                # 1. 删除现有区块
-                                self.level.delete_chunk(cx, cz, dimension)
-                                
-                                # 2. 注册空区块到历史数据库（防止状态不一致）
-                                key = (dimension, cx, cz)
-                                if key not in self.level.chunks._history_database:
-                                    self.level.chunks._register_original_entry(key, Chunk(cx, cz))
-                                    
-                            except Exception as e:
-                                print(f"重置区块 ({cx}, {cz}) 时发生错误: {e}")
-                                stats['errors'] += 1
-                                continue
-                        stats['reset_chunks'] += 1
-                        if stats['reset_chunks'] <= 10:  # 只显示前10个重置的区块
-                            print(f"{'将重置' if dry_run else '已重置'}区块: ({cx}, {cz})")
-                        elif stats['reset_chunks'] == 11:
-                            print("... (更多重置区块)")
-                except ChunkDoesNotExist:
-                    # 区块不存在，跳过
-                    continue
-                except ChunkLoadError as e:
-                    stats['errors'] += 1
-                    print(f"区块加载错误 ({cx}, {cz}): {e}")
-                except Exception as e:
-                    stats['errors'] += 1
-                    print(f"未知错误 ({cx}, {cz}): {e}")
+        self._run_reset_pipeline(dimension, search_range, self.land_classifier(land_covered_chunks), stats,
+                                 dry_run, progress_callback, archive_path, export_path,
+                                 preserve_label="领地保护", log_limit=10, version_range=version_range)
         
         print("-" * 50)
         print("操作完成统计:")
@@ -238,11 +722,15 @@ class ChunkAutoResetter:
         print(f"保留的区块数量: {stats['preserved_chunks']}")
         print(f"{'将重置' if dry_run else '已重置'}的区块数量: {stats['reset_chunks']}")
         print(f"错误数量: {stats['errors']}")
+        if version_range is not None:
+            self.print_version_stats(stats)
+        print_pipeline_stats(stats['pipeline'])
         
         return stats
     
     def reset_chunks_with_preserve(self, preserve_chunks, dimension="minecraft:overworld", 
-                                 search_range=50, dry_run=True, progress_callback=None):
+                                 search_range=50, dry_run=True, progress_callback=None,
+                                 archive_path=None, export_path=None, version_range=None):
         """
         重置区块，保留指定的区块
         
@@ -252,6 +740,12 @@ class ChunkAutoResetter:
             search_range (int): 搜索范围（以区块为单位），默认50（即-50到50的范围）
             dry_run (bool): 是否为试运行模式，True时不会实际修改世界
             progress_callback: 可选的进度回调函数，格式为 callback(current, total, message)
+            archive_path (str): 可选的前像存档路径，实际执行时会先把要删除的区块原始数据写入存档，
+                                之后可用 chunk_archive.py restore 恢复全部或部分区块
+            export_path (str): 可选的决策导出路径（.csv / .jsonl / .bin），扫描时逐条写入每个区块的
+                               坐标、决策、原因和存储大小
+            version_range (tuple): 可选的区块版本范围 (最小版本, 最大版本)，包含端点，None 表示不限；
+                                   提供时只重置不受保护且版本在范围内的区块（例如旧版本生成的区块）
         
         Returns:
             dict: 包含统计信息的字典
@@ -260,7 +754,6 @@ class ChunkAutoResetter:
             print("错误: 世界未加载")
             return None
         
-        preserve_set = set(preserve_chunks)
         stats = {
             'total_checked': 0,
             'found_chunks': 0,
@@ -273,72 +766,353 @@ class ChunkAutoResetter:
         print(f"保留区块: {preserve_chunks}")
         print(f"搜索范围: -{search_range} 到 {search_range}")
         print(f"维度: {dimension}")
+        if version_range is not None:
+            print(f"区块版本范围: {self.format_version_range(version_range)}")
         print("-" * 50)
         
-        # 计算总的检查坐标数（用于进度显示）
-        total_coords = (search_range * 2 + 1) ** 2
+        self._run_reset_pipeline(dimension, search_range, self.preserve_list_classifier(preserve_chunks), stats,
+                                 dry_run, progress_callback, archive_path, export_path,
+                                 preserve_label="保留列表", log_limit=None, version_range=version_range)
         
-        # 遍历指定范围内的所有可能区块坐标
-        for cx in range(-search_range, search_range + 1):
-            for cz in range(-search_range, search_range + 1):
-                stats['total_checked'] += 1
-                
-                # 显示进度
-                if stats['total_checked'] % 1000 == 0:
-                    print(f"已检查 {stats['total_checked']} 个坐标...")
+        print("-" * 50)
+        print("操作完成统计:")
+        print(f"检查的坐标总数: {stats['total_checked']}")
+        print(f"找到的区块数量: {stats['found_chunks']}")
+        print(f"保留的区块数量: {stats['preserved_chunks']}")
+        print(f"{'将重置' if dry_run else '已重置'}的区块数量: {stats['reset_chunks']}")
+        print(f"错误数量: {stats['errors']}")
+        if version_range is not None:
+            self.print_version_stats(stats)
+        print_pipeline_stats(stats['pipeline'])
+        
+        return stats
+    
+    def reset_subchunks_in_y_range(self, min_y, max_y, dimension="minecraft:overworld", search_range=50,
+                                   extra_protection_distance=0, include_protected=False, dry_run=True,
+                                   progress_callback=None, archive_path=None):
+        """
+        只删除搜索范围内区块中位于指定方块Y范围的子区块记录
+        
+        直接按原始键删除 SubChunkPrefix 记录（整个子区块都在Y范围内才删除），区块的其他记录保持不变，
+        不经过 amulet 解码和重写整个区块，修改直接写入数据库，无需 save_world。
+        受领地保护的区块默认完全保留；include_protected 为 True 时，对声明了Y范围的领地，
+        还会删除其中与领地Y范围不重叠的子区块。
+        
+        Args:
+            min_y (int): 最小方块Y（包含）
+            max_y (int): 最大方块Y（包含）
+            dimension (str): 维度名称，默认为主世界
+            search_range (int): 搜索范围（以区块为单位），默认50
+            extra_protection_distance (int): 额外保护距离（区块单位），默认为0
+            include_protected (bool): 是否处理受保护区块中领地Y范围之外的子区块
+            dry_run (bool): 是否为试运行模式，True时不会实际修改世界
+            progress_callback: 可选的进度回调函数，格式为 callback(current, total, message)
+            archive_path (str): 可选的前像存档路径，实际执行时会先把受影响区块的全部原始记录写入存档，
+                                之后可用 chunk_archive.py restore 恢复
+        
+        Returns:
+            dict: 包含统计信息的字典
+        """
+        if not self.level:
+            print("错误: 世界未加载")
+            return None
+        
+        reset_indices = subchunk_indices_in_y_range(min_y, max_y)
+        if not reset_indices:
+            print(f"错误: Y范围 {min_y} ~ {max_y} 内没有完整的子区块（子区块高度为 {SUBCHUNK_HEIGHT} 格）")
+            return None
+        
+        db = get_level_db(self.level)
+        dim_id = DIMENSION_IDS.get(dimension, 0)
+        land_covered_chunks = self.get_land_protection_map(dimension, extra_protection_distance)
+        claimed_y_ranges = {}
+        if include_protected and self.protection_model is not None:
+            claimed_y_ranges = self.protection_model.get_claimed_y_ranges(dimension, extra_protection_distance)
+        
+        stats = {
+            'total_checked': 0,
+            'found_chunks': 0,
+            'land_protected_chunks': len(land_covered_chunks),
+            'preserved_chunks': 0,
+            'affected_chunks': 0,
+            'partially_protected_chunks': 0,
+            'reset_subchunks': 0,
+            'reset_bytes': 0,
+            'errors': 0
+        }
+        
+        print(f"开始{'试运行' if dry_run else '实际'}重置子区块...")
+        print(f"Y范围: {min_y} ~ {max_y} (子区块索引 {reset_indices.start} ~ {reset_indices.stop - 1})")
+        print(f"领地保护的区块数量: {stats['land_protected_chunks']}")
+        if include_protected:
+            print("受保护区块中领地Y范围之外的子区块也会被重置")
+        print(f"搜索范围: -{search_range} 到 {search_range}")
+        print(f"维度: {dimension}")
+        print("-" * 50)
+        
+        archive_writer = None if dry_run else self._open_archive(archive_path)
+        coords, _ = self._scan_existing_chunks(dimension, search_range, stats)
+        total = len(coords) // 2
+        self.telemetry.begin_phase(PHASE_RESET, total)
+        try:
+            for index in range(total):
+                cx, cz = coords[index * 2], coords[index * 2 + 1]
+                stats['found_chunks'] += 1
+                self.telemetry.update(advance=1)
+                if progress_callback and stats['found_chunks'] % 100 == 0:
+                    progress_callback(stats['found_chunks'], total, f"检查区块 {stats['found_chunks']}/{total}")
                 
-                # 调用进度回调
-                if progress_callback and stats['total_checked'] % 100 == 0:
-                    progress_callback(stats['total_checked'], total_coords, 
-                                    f"检查区块 {stats['total_checked']}/{total_coords}")
+                indices = reset_indices
+                if (cx, cz) in land_covered_chunks:
+                    claimed = claimed_y_ranges.get((cx, cz))
+                    if claimed is None:
+                        stats['preserved_chunks'] += 1
+                        continue
+                    # 只保留与领地Y范围重叠的子区块
+                    indices = [y for y in reset_indices
+                               if (y * SUBCHUNK_HEIGHT > claimed[1]
+                                   or y * SUBCHUNK_HEIGHT + SUBCHUNK_HEIGHT - 1 < claimed[0])]
                 
                 try:
-                    # 尝试获取区块
-                    chunk = self.level.get_chunk(cx, cz, dimension)
-                    stats['found_chunks'] += 1
-                    
-                    # 检查是否在保留列表中
-                    if (cx, cz) in preserve_set:
-                        stats['preserved_chunks'] += 1
-                        print(f"保留区块: ({cx}, {cz})")
-                    else:
-                        # 重置区块
-                        if not dry_run:
-                            # 正确的区块重置方法：删除后注册空区块
-                            try:
-                                # 1. 删除现有区块
-                                self.level.delete_chunk(cx, cz, dimension)
-                                
-                                # 2. 注册空区块到历史数据库（防止状态不一致）
-                                key = (dimension, cx, cz)
-                                if key not in self.level.chunks._history_database:
-                                    self.level.chunks._register_original_entry(key, Chunk(cx, cz))
-                                    
-                            except Exception as e:
-                                print(f"重置区块 ({cx}, {cz}) 时发生错误: {e}")
-                                stats['errors'] += 1
-                                continue
-                        
-                        stats['reset_chunks'] += 1
-                        print(f"{'将重置' if dry_run else '已重置'}区块: ({cx}, {cz})")
-                        
-                except ChunkDoesNotExist:
-                    # 区块不存在，跳过
-                    continue
-                except ChunkLoadError as e:
-                    stats['errors'] += 1
-                    print(f"区块加载错误 ({cx}, {cz}): {e}")
+                    records = [(key, value) for y, key, value in iter_subchunk_records(db, cx, cz, dim_id)
+                               if y in indices]
+                    if not records:
+                        continue
+                    if not dry_run:
+                        if archive_writer is not None:
+                            archive_chunk(archive_writer, db, cx, cz, dim_id)
+                        for key, _ in records:
+                            db.delete(key)
+                        # 旧版本世界的校验和记录包含每个子区块的哈希，删除子区块后已失效
+                        db.delete(chunk_key(cx, cz, dim_id, TAG_CHECKSUMS))
+                        self._mark_chunk_touched(cx, cz, dimension)
                 except Exception as e:
+                    print(f"重置区块 ({cx}, {cz}) 的子区块时发生错误: {e}")
                     stats['errors'] += 1
-                    print(f"未知错误 ({cx}, {cz}): {e}")
+                    continue
+                
+                stats['affected_chunks'] += 1
+                if (cx, cz) in land_covered_chunks:
+                    stats['partially_protected_chunks'] += 1
+                record_bytes = sum(len(key) + len(value) for key, value in records)
+                stats['reset_subchunks'] += len(records)
+                stats['reset_bytes'] += record_bytes
+                self.telemetry.update(add_bytes=record_bytes)
+                if stats['affected_chunks'] <= 10:
+                    print(f"{'将重置' if dry_run else '已重置'}区块 ({cx}, {cz}) 的 {len(records)} 个子区块")
+                elif stats['affected_chunks'] == 11:
+                    print("... (更多区块)")
+        finally:
+            self.telemetry.end_phase()
+            self._close_archive(archive_writer, stats)
+            self._memory_checkpoint(CHECKPOINT_DELETE, stats, chunks=stats['found_chunks'])
+            if not dry_run:
+                # 删除已直接写入数据库，不经过 save_world，在这里把修改过的区块记录到快照（中途出错时也记录已删除的部分）
+                self._record_snapshot_resets()
         
         print("-" * 50)
         print("操作完成统计:")
         print(f"检查的坐标总数: {stats['total_checked']}")
         print(f"找到的区块数量: {stats['found_chunks']}")
-        print(f"保留的区块数量: {stats['preserved_chunks']}")
-        print(f"{'将重置' if dry_run else '已重置'}的区块数量: {stats['reset_chunks']}")
+        print(f"完全保留的受保护区块数量: {stats['preserved_chunks']}")
+        print(f"{'将重置' if dry_run else '已重置'}子区块的区块数量: {stats['affected_chunks']} "
+              f"(其中受保护区块 {stats['partially_protected_chunks']} 个)")
+        print(f"{'将重置' if dry_run else '已重置'}的子区块数量: {stats['reset_subchunks']}, "
+              f"{stats['reset_bytes'] / 1024 / 1024:.2f} MB")
+        print(f"错误数量: {stats['errors']}")
+        
+        return stats
+    
+    def reset_chunks_rolling(self, cursor_path, dimension="minecraft:overworld", search_range=50,
+                             extra_protection_distance=0, order=ORDER_KEY, max_seconds=None, max_chunks=None,
+                             max_bytes=None, dry_run=True, archive_path=None, progress_callback=None,
+                             started_at=None):
+        """
+        在预算内继续一轮滚动重置，保存世界后推进游标
+        
+        第一次运行（或上一轮已完成、参数改变）时生成新一轮计划，之后每次运行从游标位置继续，
+        直到达到时间、区块数量或字节数预算中的任意一个。时间预算包含保存世界的时间（传入 started_at 时也包含加载世界的时间），
+        按之前运行测得的每区块保存耗时预留。执行时按最新的领地数据重新检查每个区块。
+        实际执行时本方法会自行保存世界，保存成功后才推进游标。
+        
+        Args:
+            cursor_path (str): 游标文件路径（JSON），计划保存在 <cursor_path>.plan
+            dimension (str): 维度名称，默认为主世界
+            search_range (int): 搜索范围（以区块为单位），默认50
+            extra_protection_distance (int): 额外保护距离（区块单位），默认为0
+            order (str): 优先级，key / largest / farthest，见 rolling_reset.ORDERS
+            max_seconds (float): 本次运行的时间预算（秒，含保存），None 表示不限制
+            max_chunks (int): 本次最多重置的区块数量，None 表示不限制
+            max_bytes (int): 本次最多重置的存储字节数，None 表示不限制
+            dry_run (bool): 是否为试运行模式，True时不修改世界，也不推进游标
+            archive_path (str): 可选的前像存档路径（每次运行建议使用不同的文件）
+            progress_callback: 可选的进度回调函数，格式为 callback(current, total, message)
+            started_at (float): 时间预算的起点（time.time()），应在加载世界之前取得，
+                                使加载世界的时间也计入预算；None 表示从调用时开始计时
+        
+        Returns:
+            dict: 包含统计信息的字典；世界未加载、没有预算或领地数据库无法读取时返回 None
+        """
+        if not self.level:
+            print("错误: 世界未加载")
+            return None
+        if max_seconds is None and max_chunks is None and max_bytes is None:
+            print("错误: 滚动重置至少需要一种预算（时间、区块数量或字节数）")
+            return None
+        
+        start_time = started_at if started_at is not None else time.time()
+        db = get_level_db(self.level)
+        dim_id = DIMENSION_IDS.get(dimension, 0)
+        try:
+            land_covered_chunks = self.get_land_protection_map(dimension, extra_protection_distance)
+            land_rects = self.protection_model.get_land_rects(dimension) if self.protection_model else []
+        except LandDataError as e:
+            # 不生成新计划、不开始新一轮，游标保持不变
+            print(f"错误: {e}，中止滚动重置")
+            return None
+        
+        cursor = RollingCursor(cursor_path)
+        params = {
+            'dimension': dimension,
+            'search_range': search_range,
+            'extra_protection_distance': extra_protection_distance,
+            'order': order,
+        }
+        new_plan = cursor.needs_new_plan(params)
+        if new_plan:
+            if cursor.state['params'] not in (None, params) and cursor.position < cursor.total:
+                print("警告: 滚动重置参数已改变，放弃未完成的计划并开始新一轮")
+            print(f"正在生成新一轮滚动重置计划 (优先级: {order})...")
+            plan = build_plan(db, dim_id, search_range, land_covered_chunks, order, land_rects)
+            position = 0
+            if not dry_run:
+                cursor.start_cycle(params, plan)
+        else:
+            plan = cursor.load_plan()
+            position = cursor.position
+        total = len(plan) // 2
+        save_seconds_per_chunk = cursor.save_seconds_per_chunk()
+        
+        stats = {
+            'cycle': cursor.state['cycle'] + (1 if new_plan and dry_run else 0),
+            'plan_total': total,
+            'start_position': position,
+            'position': position,
+            'found_chunks': 0,
+            'preserved_chunks': 0,
+            'missing_chunks': 0,
+            'reset_chunks': 0,
+            'reset_bytes': 0,
+            'errors': 0,
+            'stop_reason': 'complete',
+            'save_seconds': None,
+        }
+        
+        print(f"开始{'试运行' if dry_run else '实际'}滚动重置 (第 {stats['cycle']} 轮)...")
+        print(f"计划进度: {position}/{total}")
+        budgets = []
+        if max_seconds is not None:
+            budgets.append(f"时间 {max_seconds / 60:.1f} 分钟 (预留保存 {save_seconds_per_chunk * 1000:.1f} 毫秒/区块)")
+        if max_chunks is not None:
+            budgets.append(f"区块 {max_chunks} 个")
+        if max_bytes is not None:
+            budgets.append(f"存储 {max_bytes / 1024 / 1024:.1f} MB")
+        print(f"预算: {', '.join(budgets)}")
+        print("-" * 50)
+        
+        archive_writer = None if dry_run else self._open_archive(archive_path)
+        self.telemetry.begin_phase(PHASE_RESET, total)
+        self.telemetry.update(current=position)
+        try:
+            while position < total:
+                cx, cz = plan[position * 2], plan[position * 2 + 1]
+                
+                # 处理下一个区块之前检查预算（时间预算为保存本次所有重置区块预留时间）
+                if max_chunks is not None and stats['reset_chunks'] >= max_chunks:
+                    stats['stop_reason'] = 'chunks'
+                    break
+                if max_seconds is not None and (time.time() - start_time
+                                                 + (stats['reset_chunks'] + 1) * save_seconds_per_chunk) >= max_seconds:
+                    stats['stop_reason'] = 'time'
+                    break
+                
+                if (cx, cz) in land_covered_chunks:
+                    # 计划生成后被圈地的区块
+                    stats['preserved_chunks'] += 1
+                    position += 1
+                    continue
+                if not chunk_exists(db, cx, cz, dim_id):
+                    stats['missing_chunks'] += 1
+                    position += 1
+                    continue
+                
+                stats['found_chunks'] += 1
+                records = list(iter_chunk_records(db, cx, cz, dim_id))
+                chunk_bytes = sum(len(key) + len(value) for key, value in records)
+                if (max_bytes is not None and stats['reset_chunks'] > 0
+                        and stats['reset_bytes'] + chunk_bytes > max_bytes):
+                    stats['stop_reason'] = 'bytes'
+                    break
+                
+                if not dry_run:
+                    try:
+                        self._delete_chunk(cx, cz, dimension, archive_writer, records)
+                    except Exception as e:
+                        print(f"重置区块 ({cx}, {cz}) 时发生错误: {e}")
+                        stats['errors'] += 1
+                        position += 1
+                        continue
+                stats['reset_chunks'] += 1
+                stats['reset_bytes'] += chunk_bytes
+                position += 1
+                self.telemetry.update(current=position, add_bytes=chunk_bytes)
+                
+                if progress_callback and stats['reset_chunks'] % 100 == 0:
+                    progress_callback(position, total, f"滚动重置 {position}/{total} "
+                                                       f"(本次 {stats['reset_chunks']} 个区块)")
+        finally:
+            self.telemetry.end_phase()
+            self._close_archive(archive_writer, stats)
+            self._memory_checkpoint(CHECKPOINT_DELETE, stats, chunks=position - stats['start_position'])
+        stats['position'] = position
+        
+        if not dry_run:
+            if stats['reset_chunks'] > 0:
+                save_start = time.time()
+                if not self.save_world():
+                    stats['errors'] += 1
+                    print("错误: 保存世界失败，游标未推进，下次运行将重新处理这些区块")
+                    return stats
+                stats['save_seconds'] = round(time.time() - save_start, 3)
+            cursor.record_run(position, {
+                'cycle': stats['cycle'],
+                'finished': time.strftime("%Y-%m-%d %H:%M:%S"),
+                'elapsed_seconds': round(time.time() - start_time, 3),
+                'save_seconds': stats['save_seconds'],
+                'start_position': stats['start_position'],
+                'end_position': position,
+                'reset_chunks': stats['reset_chunks'],
+                'reset_bytes': stats['reset_bytes'],
+                'stop_reason': stats['stop_reason'],
+            })
+        
+        remaining = total - position
+        processed = position - stats['start_position']
+        print("-" * 50)
+        print("滚动重置统计:")
+        print(f"本次{'将重置' if dry_run else '已重置'}的区块数量: {stats['reset_chunks']}, "
+              f"{stats['reset_bytes'] / 1024 / 1024:.2f} MB")
+        print(f"计划生成后被保护的区块数量: {stats['preserved_chunks']}")
+        print(f"已不存在的区块数量: {stats['missing_chunks']}")
         print(f"错误数量: {stats['errors']}")
+        if stats['save_seconds'] is not None:
+            print(f"保存耗时: {stats['save_seconds']:.1f} 秒")
+        print(f"本次结束原因: {stats['stop_reason']}, 总耗时 {time.time() - start_time:.1f} 秒")
+        print(f"计划进度: {position}/{total}" + (f" ({position / total * 100:.1f}%)" if total else ""))
+        if remaining == 0:
+            print("本轮计划已全部完成，下次运行将开始新一轮")
+        elif processed > 0:
+            print(f"按本次进度估算，还需约 {-(-remaining // processed)} 次运行完成本轮")
         
         return stats
     
@@ -350,6 +1124,7 @@ class ChunkAutoResetter:
             progress_callback: 可选的进度回调函数，格式为 callback(current, total)
         """
         if self.level:
+            self.telemetry.begin_phase(PHASE_SAVE)
             try:
                 print("正在保存世界...")
                 
@@ -362,6 +1137,7 @@ class ChunkAutoResetter:
                     print("元数据重新计算完成")
                 except Exception as e:
                     print(f"警告: 元数据重新计算失败，但不影响保存: {e}")
+                self._memory_checkpoint(CHECKPOINT_PRE_SAVE)
                 
                 # 定义进度回调函数
                 def default_progress_callback(chunk_index, chunk_count):
@@ -372,14 +1148,298 @@ class ChunkAutoResetter:
                 # 使用提供的回调函数或默认的进度显示
                 callback = progress_callback if progress_callback else default_progress_callback
                 
+                def telemetry_callback(chunk_index, chunk_count):
+                    self.telemetry.update(current=chunk_index, total=chunk_count)
+                    callback(chunk_index, chunk_count)
+                
                 # 调用带进度回调的保存方法
-                self.level.save(progress_callback=callback)
+                self.level.save(progress_callback=telemetry_callback)
+                self._memory_checkpoint(CHECKPOINT_SAVE)
                 print("世界保存成功!")
+                self._record_snapshot_resets()
                 return True
             except Exception as e:
                 print(f"保存世界失败: {e}")
                 return False
+            finally:
+                self.telemetry.end_phase()
         return False
+
+    def _record_snapshot_resets(self):
+        """世界是快照的世界副本时，把已保存的被重置区块记录到快照，替换时不必再比较整个副本"""
+        if not self._unrecorded_reset_chunks:
+            return
+        chunks = [(dim_id, coords[index], coords[index + 1])
+                  for dim_id, coords in self._unrecorded_reset_chunks.items() for index in range(0, len(coords), 2)]
+        total = record_reset_chunks(self.world_path, chunks)
+        self._unrecorded_reset_chunks.clear()
+        if total is not None:
+            print(f"已把 {len(chunks)} 个被重置的区块记录到快照 (共 {total} 个): {self._snapshot_manifest}")
+
+    def collect_orphaned_actors(self, dry_run=True, batch_size=1000, progress_callback=None):
+        """
+        清理没有任何区块引用的实体记录（actorprefix）
+
+        新版基岩版把实体存放在 actorprefix<实体ID> 记录中，由 digp<区块> 摘要引用。
+        区块被重置后这些记录可能残留在 level.db 中。本方法只做一次流式扫描：
+        先遍历 digp 摘要收集仍被引用的实体ID（所属区块已不存在的摘要同样视为孤立），
+        再遍历 actorprefix 记录找出未被引用的部分，并分批删除。
+
+        应在 save_world 之后调用，确保区块删除已经写入数据库。
+
+        Args:
+            dry_run (bool): 是否为试运行模式，True时只统计不删除
+            batch_size (int): 每批删除的记录数量
+            progress_callback: 可选的进度回调函数，格式为 callback(current, total, message)
+
+        Returns:
+            dict: 包含统计信息的字典（数量与字节数）
+        """
+        if not self.level:
+            print("错误: 世界未加载")
+            return None
+
+        db = get_level_db(self.level)
+        stats = {
+            'digest_records': 0,
+            'orphaned_digests': 0,
+            'orphaned_digest_bytes': 0,
+            'referenced_actors': 0,
+            'actor_records': 0,
+            'actor_bytes': 0,
+            'orphaned_actors': 0,
+            'orphaned_actor_bytes': 0,
+            'deleted_records': 0,
+            'errors': 0
+        }
+
+        print(f"开始{'试运行' if dry_run else '实际'}清理孤立实体数据...")
+        print("-" * 50)
+
+        pending_deletes = []
+
+        def flush_deletes():
+            """分批删除已收集的孤立记录"""
+            if dry_run or not pending_deletes:
+                pending_deletes.clear()
+                return
+            for key in pending_deletes:
+                try:
+                    db.delete(key)
+                    stats['deleted_records'] += 1
+                    range_id = 'digp' if key.startswith(DIGP_PREFIX) else 'actor'
+                    self._mark_key_range_touched(range_id, key, key + b"\x00")
+                except Exception as e:
+                    stats['errors'] += 1
+                    print(f"删除记录 {key!r} 时发生错误: {e}")
+            pending_deletes.clear()
+            if progress_callback:
+                progress_callback(stats['deleted_records'], 0, f"已删除 {stats['deleted_records']} 条孤立记录")
+
+        # 1. 遍历实体摘要，收集仍被引用的实体ID
+        referenced_actor_ids = set()
+        try:
+            for key, value in iter_prefix(db, DIGP_PREFIX):
+                position = parse_digp_key(key)
+                if position is None:
+                    continue
+                stats['digest_records'] += 1
+
+                if chunk_exists(db, *position):
+                    referenced_actor_ids.update(split_actor_ids(value))
+                else:
+                    # 所属区块已被删除，摘要本身也是孤立数据
+                    stats['orphaned_digests'] += 1
+                    stats['orphaned_digest_bytes'] += len(key) + len(value)
+                    pending_deletes.append(key)
+                    if len(pending_deletes) >= batch_size:
+                        flush_deletes()
+        except Exception as e:
+            stats['errors'] += 1
+            print(f"扫描实体摘要时发生错误: {e}")
+            return stats
+        flush_deletes()
+        stats['referenced_actors'] = len(referenced_actor_ids)
+
+        # 2. 遍历实体记录，找出未被引用的部分
+        try:
+            for key, value in iter_prefix(db, ACTOR_PREFIX):
+                stats['actor_records'] += 1
+                record_bytes = len(key) + len(value)
+                stats['actor_bytes'] += record_bytes
+
+                if progress_callback and stats['actor_records'] % 1000 == 0:
+                    progress_callback(stats['actor_records'], 0, f"检查实体记录 {stats['actor_records']}")
+
+                if key[len(ACTOR_PREFIX):] in referenced_actor_ids:
+                    continue
+                stats['orphaned_actors'] += 1
+                stats['orphaned_actor_bytes'] += record_bytes
+                pending_deletes.append(key)
+                if len(pending_deletes) >= batch_size:
+                    flush_deletes()
+        except Exception as e:
+            stats['errors'] += 1
+            print(f"扫描实体记录时发生错误: {e}")
+        flush_deletes()
+
+        print("-" * 50)
+        print("孤立实体清理统计:")
+        print(f"实体摘要数量: {stats['digest_records']}")
+        print(f"孤立实体摘要: {stats['orphaned_digests']} 条, {stats['orphaned_digest_bytes']} 字节")
+        print(f"实体记录数量: {stats['actor_records']} 条, {stats['actor_bytes']} 字节")
+        print(f"{'将删除' if dry_run else '已删除'}的孤立实体: "
+              f"{stats['orphaned_actors']} 条, {stats['orphaned_actor_bytes']} 字节")
+        print(f"错误数量: {stats['errors']}")
+
+        return stats
+
+    def compact_world(self, touched_only=True, progress_callback=None):
+        """
+        压缩世界数据库，清除删除区块后留下的删除标记，回收磁盘空间
+
+        应在 save_world 之后调用。
+
+        Args:
+            touched_only (bool): 为True时只压缩本次运行中修改过的键范围，否则压缩整个数据库
+            progress_callback: 可选的进度回调函数，格式为 callback(current, total, message)
+
+        Returns:
+            dict: 包含压缩前后字节数（bytes_before / bytes_after）的统计信息
+        """
+        if not self.level:
+            print("错误: 世界未加载")
+            return None
+
+        key_ranges = None
+        if touched_only:
+            if not self._touched_key_ranges:
+                print("本次运行没有修改过的键范围，无需压缩")
+                return None
+            key_ranges = [tuple(key_range) for key_range in self._touched_key_ranges.values()]
+
+        try:
+            print("开始压缩世界数据库...")
+            def telemetry_callback(current, total, message):
+                self.telemetry.update(current=current, total=total)
+                if progress_callback:
+                    progress_callback(current, total, message)
+            
+            with self.telemetry.phase(PHASE_COMPACT):
+                stats = compact_db(get_level_db(self.level), get_db_directory(self.world_path),
+                                   key_ranges=key_ranges, progress_callback=telemetry_callback)
+            print_compaction_stats(stats)
+            self._touched_key_ranges.clear()
+            return stats
+        except Exception as e:
+            print(f"压缩世界数据库失败: {e}")
+            return None
+    
+    def census_world(self, dimension="minecraft:overworld", search_range=None, extra_protection_distance=0,
+                     json_path=None, progress_callback=None):
+        """
+        统计世界存储空间的分布（只遍历键和值的长度，不解码区块）
+        
+        同时按给定的预览参数估算可回收的空间：维度内搜索范围中未被领地保护的区块。
+        
+        Args:
+            dimension (str): 预览的维度
+            search_range (int): 预览的搜索范围（区块），None 表示整个维度
+            extra_protection_distance (int): 额外保护距离（区块单位）
+            json_path (str): 可选，把统计结果保存为 JSON
+            progress_callback: 可选的进度回调函数，格式为 callback(current, total, message)
+        
+        Returns:
+            dict: 统计结果，格式见 world_census.run_census
+        """
+        if not self.level:
+            print("错误: 世界未加载")
+            return None
+        
+        protected_chunks = set()
+        if self.land_reader:
+            protected_chunks = self.get_land_protection_map(dimension, extra_protection_distance)
+        
+        print("开始统计世界存储空间...")
+        census = run_census(get_level_db(self.level), dimension, search_range, protected_chunks,
+                            progress_callback)
+        print_census(census)
+        if json_path:
+            save_census(census, json_path)
+            print(f"统计结果已保存到: {json_path}")
+        return census
+    
+    def estimate_reset_preview(self, dimension="minecraft:overworld", search_range=50, extra_protection_distance=0,
+                               version_range=None, samples=DEFAULT_ESTIMATE_SAMPLES, confidence=0.95, seed=None,
+                               progress_callback=None):
+        """
+        抽样估算按给定参数重置的结果，通常一两秒内返回，用于反复调整搜索范围和额外保护距离
+        
+        Args:
+            dimension (str): 维度名称
+            search_range (int): 搜索范围（以区块为单位）
+            extra_protection_distance (int): 额外保护距离（区块单位）
+            version_range (tuple): 可选的区块版本范围 (最小版本, 最大版本)，含义与重置时相同
+            samples (int): 抽样数量（大约访问的区块数）
+            confidence (float): 置信水平
+            seed (int): 随机数种子
+            progress_callback: 可选的进度回调函数，格式为 callback(current, total, message)
+        
+        Returns:
+            dict: 估算结果，格式见 preview_estimate.estimate_reset
+        """
+        if not self.level:
+            print("错误: 世界未加载")
+            return None
+        
+        protected_chunks = {}
+        if self.land_reader:
+            protected_chunks = self.get_land_protection_map(dimension, extra_protection_distance)
+        estimate = estimate_reset(get_level_db(self.level), dimension, search_range, protected_chunks, version_range,
+                                  samples, confidence=confidence, seed=seed, progress_callback=progress_callback)
+        print_estimate(estimate)
+        return estimate
+    
+    def sweep_protection_margins(self, dimension="minecraft:overworld", search_ranges=(50,),
+                                 max_margin=DEFAULT_MAX_MARGIN, version_range=None, json_path=None,
+                                 progress_callback=None):
+        """
+        一次扫描计算额外保护距离从 0 到 max_margin、各搜索范围下将被重置的区块数量和字节数
+        
+        Args:
+            dimension (str): 维度名称
+            search_ranges (iterable): 一个或多个搜索范围（以区块为单位）
+            max_margin (int): 最大额外保护距离
+            version_range (tuple): 可选的区块版本范围 (最小版本, 最大版本)，含义与重置时相同
+            json_path (str): 可选，把扫描结果保存为 JSON
+            progress_callback: 可选的进度回调函数，格式为 callback(current, total, message)
+        
+        Returns:
+            dict: 扫描结果，格式见 margin_sweep.sweep_margins
+        """
+        if not self.level:
+            print("错误: 世界未加载")
+            return None
+        
+        # 领地矩形来自保护模型，没有领地数据库时所有区块的距离都视为无穷远
+        land_rects = []
+        if self.land_reader:
+            self.get_land_protection_map(dimension, 0)
+            land_rects = self.protection_model.get_land_rects(dimension) if self.protection_model else []
+        
+        print("正在建立区块索引...")
+        dim_id = DIMENSION_IDS.get(dimension, 0)
+        with self.telemetry.phase(PHASE_SCAN):
+            index = build_chunk_index(get_level_db(self.level), dim_id, max(search_ranges),
+                                      progress_callback=progress_callback)
+            index = index.get(dim_id) or ChunkIndex.empty()
+            self.telemetry.update(current=len(index))
+        sweep = sweep_margins(index, land_rects, search_ranges, max_margin, version_range, dimension)
+        print_sweep(sweep)
+        if json_path:
+            save_sweep(sweep, json_path)
+            print(f"扫描结果已保存到: {json_path}")
+        return sweep
     
     def get_chunk_info(self, cx, cz, dimension="minecraft:overworld"):
         """
@@ -411,6 +1471,37 @@ class ChunkAutoResetter:
             return {'coordinates': (cx, cz), 'exists': False, 'error': str(e)}
 
 
+def prompt_post_save_maintenance(resetter):
+    """保存后的维护操作：询问是否清理孤立实体数据、是否压缩数据库"""
+    print("\n=== 孤立实体数据检查 ===")
+    gc_stats = resetter.collect_orphaned_actors(dry_run=True)
+    if gc_stats and gc_stats['orphaned_actors'] + gc_stats['orphaned_digests'] > 0:
+        user_input = input("是否删除这些孤立实体数据？(y/N): ")
+        if user_input.lower() in ['y', 'yes']:
+            resetter.collect_orphaned_actors(dry_run=False)
+
+    user_input = input("是否压缩世界数据库以回收磁盘空间？(y/N): ")
+    if user_input.lower() in ['y', 'yes']:
+        resetter.compact_world()
+
+
+def prompt_version_range():
+    """询问要重置的区块版本范围，两端都留空时返回 None（不按版本过滤）"""
+    print("区块版本范围（只重置版本在范围内的区块，留空表示不限）")
+    while True:
+        try:
+            min_text = input("最小版本: ").strip()
+            max_text = input("最大版本: ").strip()
+            min_version = int(min_text) if min_text else None
+            max_version = int(max_text) if max_text else None
+        except ValueError:
+            print("版本号必须是整数")
+            continue
+        if min_version is None and max_version is None:
+            return None
+        return min_version, max_version
+
+
 def main():
     """主函数示例"""
     # 使用示例
@@ -419,6 +1510,17 @@ def main():
     
     print("=== Minecraft 区块自动重置器 (集成领地保护) ===\n")
     
+    # 快照模式：服务器保持运行，重置在世界快照上进行，最后停服替换
+    use_snapshot = input("是否使用快照模式（服务器保持运行，重置在世界快照上进行）？(y/N): ").lower() in ['y', 'yes']
+    live_world_path = world_path
+    if use_snapshot:
+        input("请在服务器控制台执行 save hold，待 save query 显示可以复制后按回车...")
+        snapshot_info = create_snapshot(live_world_path)
+        if not snapshot_info:
+            return
+        world_path = snapshot_info['work_path']
+    world_saved = False
+    
     # 询问用户是否使用领地保护
     use_land_protection = input("是否使用领地保护功能？(y/N): ").lower() in ['y', 'yes']
     
@@ -429,8 +1531,17 @@ def main():
         # 创建重置器实例（不使用领地保护）
         resetter = ChunkAutoResetter(world_path)
     
+    # 内存剖析（排查大范围重置被系统因内存不足杀死的问题）
+    memory_report_path = input("内存剖析报告路径（.json，留空则不剖析）: ").strip() or None
+    if memory_report_path:
+        resetter.enable_memory_profiling(memory_report_path)
+    
+    # 后台定期打印当前阶段、速度和剩余时间
+    reporter = ConsoleTelemetryReporter(resetter.telemetry).start()
+    
     # 加载世界
     if not resetter.load_world():
+        reporter.stop()
         return
     
     try:
@@ -444,12 +1555,17 @@ def main():
             except ValueError:
                 search_range = 50
             
+            export_path = input("决策导出路径（.csv/.jsonl/.bin，留空则不导出）: ").strip() or None
+            version_range = prompt_version_range()
+            
             # 首先进行试运行，查看将要进行的操作
             print("\n=== 试运行模式 ===")
             stats = resetter.reset_chunks_except_lands(
                 dimension="minecraft:overworld",
                 search_range=search_range,
-                dry_run=True  # 试运行模式
+                dry_run=True,  # 试运行模式
+                export_path=export_path,
+                version_range=version_range
             )
             
             if stats and stats['reset_chunks'] > 0:
@@ -459,18 +1575,28 @@ def main():
                                  f"是否确认执行？(y/N): ")
                 
                 if user_input.lower() in ['y', 'yes']:
+                    archive_path = input("撤销存档路径（留空则不创建存档）: ").strip() or None
+                    digest_path = input("校验摘要文件路径（重置后校验受保护区块，留空则不校验）: ").strip() or None
+                    if digest_path:
+                        resetter.begin_verification(digest_path, dimension="minecraft:overworld")
                     print("\n=== 实际执行模式 ===")
                     # 实际执行重置
                     final_stats = resetter.reset_chunks_except_lands(
                         dimension="minecraft:overworld",
                         search_range=search_range,
-                        dry_run=False  # 实际执行
+                        dry_run=False,  # 实际执行
+                        archive_path=archive_path,
+                        version_range=version_range
                     )
                     
                     # 保存世界
                     if final_stats and final_stats['reset_chunks'] > 0:
                         print("\n开始保存世界...")
-                        resetter.save_world()
+                        if resetter.save_world():
+                            world_saved = True
+                            if digest_path:
+                                resetter.finish_verification()
+                            prompt_post_save_maintenance(resetter)
                 else:
                     print("操作已取消")
             else:
@@ -500,13 +1626,18 @@ def main():
             except ValueError:
                 search_range = 20
             
+            export_path = input("决策导出路径（.csv/.jsonl/.bin，留空则不导出）: ").strip() or None
+            version_range = prompt_version_range()
+            
             # 首先进行试运行，查看将要进行的操作
             print("\n=== 试运行模式 ===")
             stats = resetter.reset_chunks_with_preserve(
                 preserve_chunks=preserve_chunks,
                 dimension="minecraft:overworld",
                 search_range=search_range,
-                dry_run=True  # 试运行模式
+                dry_run=True,  # 试运行模式
+                export_path=export_path,
+                version_range=version_range
             )
             
             if stats and stats['reset_chunks'] > 0:
@@ -514,27 +1645,50 @@ def main():
                 user_input = input(f"\n将要重置 {stats['reset_chunks']} 个区块，是否确认执行？(y/N): ")
                 
                 if user_input.lower() in ['y', 'yes']:
+                    archive_path = input("撤销存档路径（留空则不创建存档）: ").strip() or None
+                    digest_path = input("校验摘要文件路径（重置后校验保留区块，留空则不校验）: ").strip() or None
+                    if digest_path:
+                        resetter.begin_verification(digest_path, dimension="minecraft:overworld",
+                                                    protected=set(preserve_chunks))
                     print("\n=== 实际执行模式 ===")
                     # 实际执行重置
                     final_stats = resetter.reset_chunks_with_preserve(
                         preserve_chunks=preserve_chunks,
                         dimension="minecraft:overworld",
                         search_range=search_range,
-                        dry_run=False  # 实际执行
+                        dry_run=False,  # 实际执行
+                        archive_path=archive_path,
+                        version_range=version_range
                     )
                     
                     # 保存世界
                     if final_stats and final_stats['reset_chunks'] > 0:
                         print("\n开始保存世界...")
-                        resetter.save_world()
+                        if resetter.save_world():
+                            world_saved = True
+                            if digest_path:
+                                resetter.finish_verification()
+                            prompt_post_save_maintenance(resetter)
                 else:
                     print("操作已取消")
             else:
                 print("没有需要重置的区块")
             
+    except LandDataError as e:
+        print(f"错误: {e}")
     finally:
         # 关闭世界
         resetter.close_world()
+        reporter.stop()
+        print(f"各阶段耗时: {format_phase_summary(resetter.telemetry.snapshot())}")
+        if resetter.memory_profiler is not None:
+            print_memory_report(resetter.memory_profiler.report())
+            print(f"内存剖析报告已写入: {memory_report_path}")
+            resetter.disable_memory_profiling()
+    
+    if use_snapshot and world_saved:
+        input("\n请关闭服务器后按回车，将重置后的快照替换回世界...")
+        swap_snapshot(live_world_path)
 
 
 if __name__ == "__main__":
@@ -10,20 +10,75 @@ Minecraft 区块重置器 GUI
 
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox, scrolledtext
+import colorsys
+import datetime
+import logging
+import logging.handlers
+import math
+import queue
 import threading
 import os
 import sys
+import time
 from pathlib import Path
 
 # 导入我们的核心模块
+# ChunkAutoResetter 依赖 amulet（以及 PyMCTranslate 的大量版本数据），导入很慢，
+# 只在加载配置时于后台线程中导入，窗口可以立即显示；领地相关模块只依赖标准库
 try:
-    from ChunkAutoResetter import ChunkAutoResetter
     from land_data_reader import LandDataReader
+    from protection_model import ProtectionModel, land_chunk_bounds
+    from protection_snapshot import DEFAULT_SNAPSHOT_DIR
+    from world_census import save_census
+    from preview_estimate import format_estimate
+    from margin_sweep import save_sweep
+    from reset_telemetry import ResetTelemetry, format_telemetry, format_phase_summary, PHASE_LOAD_LANDS
 except ImportError as e:
     print(f"导入错误: {e}")
     print("请确保 ChunkAutoResetter.py 和 land_data_reader.py 在同一目录下")
     sys.exit(1)
 
+_resetter_class = None
+
+
+def load_resetter_class():
+    """
+    导入世界编辑组件（amulet）并返回 ChunkAutoResetter 类，只在第一次调用时导入
+    
+    Raises:
+        ImportError: 未安装 amulet-core
+    """
+    global _resetter_class
+    if _resetter_class is None:
+        from ChunkAutoResetter import ChunkAutoResetter
+        _resetter_class = ChunkAutoResetter
+    return _resetter_class
+
+# 检查领地数据库变化的间隔（毫秒）
+LAND_WATCH_INTERVAL_MS = 5000
+
+# 刷新运行遥测显示的间隔（毫秒）
+TELEMETRY_POLL_INTERVAL_MS = 500
+
+# 日志窗口默认最多保留的行数，以及把排队的日志批量写入窗口的间隔（毫秒）
+LOG_MAX_LINES = 2000
+LOG_FLUSH_INTERVAL_MS = 200
+
+# 完整日志文件（按大小轮转）
+LOG_FILE_NAME = "chunk_resetter.log"
+LOG_FILE_MAX_BYTES = 10 * 1024 * 1024
+LOG_FILE_BACKUP_COUNT = 3
+
+# 保存世界时每隔多少百分比输出一条进度日志并更新状态栏
+SAVE_LOG_STEP_PERCENT = 5
+
+# 额外保护距离扫描的默认最大距离（区块），当前设置的两倍更大时使用两倍
+SWEEP_MAX_MARGIN = 16
+
+# 重置结果校验的摘要文件和报告（程序目录下）
+VERIFY_DIGEST_FILE = "protected_chunks.dig"
+VERIFY_REPORT_FILE = "verification_report.json"
+
 
 class ChunkResetterGUI:
     """区块重置器图形界面"""
@@ -43,19 +98,43 @@ class ChunkResetterGUI:
         self.search_range = tk.StringVar(value="750")
         self.extra_protection_distance = tk.StringVar(value="0")
         self.dimension = tk.StringVar(value="minecraft:overworld")
+        self.compact_after_save = tk.BooleanVar(value=False)
+        self.verify_after_save = tk.BooleanVar(value=False)
+        self.archive_path = tk.StringVar()
+        self.export_path = tk.StringVar()
+        self.min_chunk_version = tk.StringVar()
+        self.max_chunk_version = tk.StringVar()
+        self.log_max_lines = tk.StringVar(value=str(LOG_MAX_LINES))
+        self.log_to_file = tk.BooleanVar(value=False)
         
         # 核心对象
         self.resetter = None
         self.land_reader = None
+        self.protection_model = None
         self.lands_data = []
-        self.covered_chunks = set()
+        self.covered_chunks = {}
+        
+        # 运行遥测：加载配置时读取领地使用，创建重置器后交给重置器共用
+        self.telemetry = ResetTelemetry()
         
         # 操作状态
         self.is_processing = False
+        # 最近一次预览的 (维度, 额外保护距离, 搜索范围, 保护模型版本)，用于判断预览是否过期
+        self.preview_state = None
         
         # 创建界面
         self.create_widgets()
         
+        # 维度或额外保护距离变化时刷新领地统计
+        self.dimension.trace_add("write", self._on_dimension_changed)
+        self.extra_protection_distance.trace_add("write", self._on_protection_distance_changed)
+        
+        # 定时检查领地数据库的变化
+        self.root.after(LAND_WATCH_INTERVAL_MS, self._watch_land_database)
+        
+        # 定时刷新运行遥测
+        self.root.after(TELEMETRY_POLL_INTERVAL_MS, self._poll_telemetry)
+        
         # 绑定关闭事件
         self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
     
@@ -148,6 +227,37 @@ class ChunkResetterGUI:
         dimension_combo = ttk.Combobox(settings_frame, textvariable=self.dimension, width=25, state="readonly")
         dimension_combo['values'] = ("minecraft:overworld", "minecraft:the_nether", "minecraft:the_end")
         dimension_combo.grid(row=2, column=1, sticky=tk.W, pady=(10, 0))
+        
+        # 保存后压缩数据库
+        compact_check = ttk.Checkbutton(settings_frame, text="保存后压缩数据库", variable=self.compact_after_save)
+        compact_check.grid(row=3, column=1, sticky=tk.W, pady=(10, 0))
+        ttk.Label(settings_frame, text="(清除删除标记以回收磁盘空间，加快重置后首次启动服务器)").grid(row=3, column=2, sticky=tk.W, padx=(10, 0), pady=(10, 0))
+        
+        # 撤销存档
+        ttk.Label(settings_frame, text="撤销存档:").grid(row=4, column=0, sticky=tk.W, padx=(0, 10), pady=(10, 0))
+        archive_entry = ttk.Entry(settings_frame, textvariable=self.archive_path, width=30)
+        archive_entry.grid(row=4, column=1, sticky=tk.W, pady=(10, 0))
+        ttk.Button(settings_frame, text="浏览", command=self.select_archive_path).grid(row=4, column=2, sticky=tk.W, padx=(10, 0), pady=(10, 0))
+        
+        # 决策导出
+        ttk.Label(settings_frame, text="决策导出:").grid(row=5, column=0, sticky=tk.W, padx=(0, 10), pady=(10, 0))
+        export_entry = ttk.Entry(settings_frame, textvariable=self.export_path, width=30)
+        export_entry.grid(row=5, column=1, sticky=tk.W, pady=(10, 0))
+        ttk.Button(settings_frame, text="浏览", command=self.select_export_path).grid(row=5, column=2, sticky=tk.W, padx=(10, 0), pady=(10, 0))
+        
+        # 区块版本范围
+        ttk.Label(settings_frame, text="区块版本范围:").grid(row=6, column=0, sticky=tk.W, padx=(0, 10), pady=(10, 0))
+        version_frame = ttk.Frame(settings_frame)
+        version_frame.grid(row=6, column=1, sticky=tk.W, pady=(10, 0))
+        ttk.Entry(version_frame, textvariable=self.min_chunk_version, width=6).pack(side=tk.LEFT)
+        ttk.Label(version_frame, text="~").pack(side=tk.LEFT, padx=5)
+        ttk.Entry(version_frame, textvariable=self.max_chunk_version, width=6).pack(side=tk.LEFT)
+        ttk.Label(settings_frame, text="(只重置版本在范围内的区块，留空表示不限；先预览查看版本分布)").grid(row=6, column=2, sticky=tk.W, padx=(10, 0), pady=(10, 0))
+        
+        # 保存后校验
+        verify_check = ttk.Checkbutton(settings_frame, text="保存后校验受保护区块", variable=self.verify_after_save)
+        verify_check.grid(row=7, column=1, sticky=tk.W, pady=(10, 0))
+        ttk.Label(settings_frame, text="(确认受保护区块的原始数据未被修改、被重置区块已无残留，需额外遍历两次数据库)").grid(row=7, column=2, sticky=tk.W, padx=(10, 0), pady=(10, 0))
     
     def create_land_info_area(self, parent, row):
         """创建领地信息显示区域"""
@@ -204,15 +314,32 @@ class ChunkResetterGUI:
         self.cancel_button = ttk.Button(control_frame, text="取消操作", command=self.cancel_operation, state=tk.DISABLED)
         self.cancel_button.grid(row=0, column=2, padx=(0, 10))
         
+        # 存储统计按钮
+        self.census_button = ttk.Button(control_frame, text="存储统计", command=self.run_census, state=tk.DISABLED)
+        self.census_button.grid(row=0, column=3, padx=(0, 10))
+        
+        # 快速估算按钮（抽样，用于调整参数）
+        self.estimate_button = ttk.Button(control_frame, text="快速估算", command=self.quick_estimate, state=tk.DISABLED)
+        self.estimate_button.grid(row=0, column=4, padx=(0, 10))
+        
+        # 额外保护距离扫描按钮（曲线）
+        self.sweep_button = ttk.Button(control_frame, text="保护距离曲线", command=self.run_margin_sweep,
+                                       state=tk.DISABLED)
+        self.sweep_button.grid(row=0, column=5, padx=(0, 10))
+        
         # 进度条
         self.progress = ttk.Progressbar(control_frame, mode='determinate', maximum=100)
-        self.progress.grid(row=0, column=3, padx=(20, 0), sticky=(tk.W, tk.E))
+        self.progress.grid(row=0, column=6, padx=(20, 0), sticky=(tk.W, tk.E))
         
         # 进度百分比标签
         self.progress_label = ttk.Label(control_frame, text="0%", width=5)
-        self.progress_label.grid(row=0, column=4, padx=(5, 0))
+        self.progress_label.grid(row=0, column=7, padx=(5, 0))
+        
+        # 运行遥测（当前阶段、速度、剩余时间）
+        self.telemetry_label = ttk.Label(control_frame, text="", foreground="gray")
+        self.telemetry_label.grid(row=1, column=0, columnspan=8, sticky=tk.W, pady=(5, 0))
         
-        control_frame.columnconfigure(3, weight=1)
+        control_frame.columnconfigure(6, weight=1)
     
     def create_log_area(self, parent, row):
         """创建日志输出区域"""
@@ -222,13 +349,29 @@ class ChunkResetterGUI:
         log_frame.rowconfigure(0, weight=1)
         parent.rowconfigure(row, weight=1)
         
-        # 日志文本区域
+        # 日志文本区域（有行数上限，日志先进入队列，再定时批量写入）
         self.log_text = scrolledtext.ScrolledText(log_frame, height=8, wrap=tk.WORD)
         self.log_text.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+        self.log_view = BoundedLogView(self.root, self.log_text, LOG_MAX_LINES)
+        
+        log_options = ttk.Frame(log_frame)
+        log_options.grid(row=1, column=0, pady=(10, 0), sticky=(tk.W, tk.E))
         
         # 清空日志按钮
-        clear_button = ttk.Button(log_frame, text="清空日志", command=self.clear_log)
-        clear_button.grid(row=1, column=0, pady=(10, 0), sticky=tk.W)
+        clear_button = ttk.Button(log_options, text="清空日志", command=self.clear_log)
+        clear_button.pack(side=tk.LEFT)
+        
+        # 日志窗口行数上限
+        ttk.Label(log_options, text="最多显示行数:").pack(side=tk.LEFT, padx=(20, 5))
+        max_lines_spinbox = ttk.Spinbox(log_options, from_=100, to=100000, increment=500, width=8,
+                                        textvariable=self.log_max_lines, command=self._on_log_max_lines_changed)
+        max_lines_spinbox.pack(side=tk.LEFT)
+        max_lines_spinbox.bind("<FocusOut>", lambda event: self._on_log_max_lines_changed())
+        max_lines_spinbox.bind("<Return>", lambda event: self._on_log_max_lines_changed())
+        
+        # 完整日志文件
+        ttk.Checkbutton(log_options, text=f"同时写入完整日志文件 ({LOG_FILE_NAME})", variable=self.log_to_file,
+                        command=self._on_log_to_file_changed).pack(side=tk.LEFT, padx=(20, 0))
     
     def create_status_bar(self, parent, row):
         """创建状态栏"""
@@ -251,19 +394,56 @@ class ChunkResetterGUI:
         if path:
             self.db_path.set(path)
     
+    def select_archive_path(self):
+        """选择撤销存档路径"""
+        path = filedialog.asksaveasfilename(
+            title="选择撤销存档保存位置",
+            defaultextension=".cra",
+            filetypes=[("区块存档", "*.cra"), ("所有文件", "*.*")]
+        )
+        if path:
+            self.archive_path.set(path)
+    
+    def select_export_path(self):
+        """选择决策导出路径"""
+        path = filedialog.asksaveasfilename(
+            title="选择决策列表导出位置",
+            defaultextension=".csv",
+            filetypes=[("CSV表格", "*.csv"), ("JSON Lines", "*.jsonl"), ("紧凑二进制", "*.bin"), ("所有文件", "*.*")]
+        )
+        if path:
+            self.export_path.set(path)
+    
     def log_message(self, message, level="INFO"):
-        """添加日志消息"""
-        import datetime
+        """添加日志消息（可在任意线程调用，日志先进入队列，由界面线程批量显示）"""
         timestamp = datetime.datetime.now().strftime("%H:%M:%S")
-        log_entry = f"[{timestamp}] {level}: {message}\n"
-        
-        self.log_text.insert(tk.END, log_entry)
-        self.log_text.see(tk.END)
-        self.root.update()
+        self.log_view.write(f"[{timestamp}] {level}: {message}")
     
     def clear_log(self):
         """清空日志"""
-        self.log_text.delete(1.0, tk.END)
+        self.log_view.clear()
+    
+    def _on_log_max_lines_changed(self):
+        """修改日志窗口的行数上限"""
+        try:
+            max_lines = int(self.log_max_lines.get())
+        except ValueError:
+            self.log_max_lines.set(str(self.log_view.max_lines))
+            return
+        self.log_view.set_max_lines(max_lines)
+        self.log_max_lines.set(str(self.log_view.max_lines))
+    
+    def _on_log_to_file_changed(self):
+        """开启或关闭完整日志文件"""
+        if self.log_to_file.get():
+            try:
+                path = self.log_view.open_log_file(LOG_FILE_NAME)
+                self.log_message(f"完整日志将写入: {path}")
+            except OSError as e:
+                self.log_to_file.set(False)
+                messagebox.showerror("错误", f"无法打开日志文件: {e}")
+        else:
+            self.log_view.close_log_file()
     
     def update_status(self, message):
         """更新状态栏"""
@@ -297,27 +477,45 @@ class ChunkResetterGUI:
             self.update_status("正在加载配置...")
             self.log_message("开始加载配置")
             
-            # 创建重置器实例
-            self.resetter = ChunkAutoResetter(self.world_path.get(), self.db_path.get())
+            # 领地数据只依赖 sqlite，先读取并显示，不必等待世界编辑组件
+            self.log_message("正在获取领地信息...")
+            try:
+                self.land_reader = LandDataReader(self.db_path.get())
+            except Exception as e:
+                raise Exception(f"领地数据库连接失败: {e}")
+            self.protection_model = ProtectionModel(self.land_reader, snapshot_dir=DEFAULT_SNAPSHOT_DIR)
+            with self.telemetry.phase(PHASE_LOAD_LANDS):
+                self._load_lands_info()
+                self.telemetry.update(current=len(self.lands_data))
+            
+            # 导入世界编辑组件
+            self.log_message("正在加载世界编辑组件 (amulet)...")
+            import_start = time.perf_counter()
+            try:
+                resetter_class = load_resetter_class()
+            except ImportError as e:
+                raise Exception(f"请先安装 amulet-core (pip install amulet-core): {e}")
+            self.log_message(f"世界编辑组件加载完成，耗时 {time.perf_counter() - import_start:.1f} 秒")
+            
+            # 创建重置器实例，与界面共用领地读取器和保护模型
+            self.resetter = resetter_class(self.world_path.get(), self.db_path.get())
+            self.resetter.land_reader = self.land_reader
+            self.resetter.protection_model = self.protection_model
+            self.resetter.telemetry = self.telemetry
             
             # 加载世界
             self.log_message("正在加载世界...")
             if not self.resetter.load_world():
                 raise Exception("世界加载失败")
             
-            # 检查领地数据库
-            if not self.resetter.land_reader:
-                raise Exception("领地数据库连接失败")
-            
-            # 获取领地信息
-            self.log_message("正在获取领地信息...")
-            self._load_lands_info()
-            
-            self.log_message("配置加载完成")
+            self.log_message(f"配置加载完成 ({format_phase_summary(self.telemetry.snapshot())})")
             self.update_status("配置加载完成")
             
-            # 启用预览按钮
+            # 启用预览、统计、估算和扫描按钮
             self.preview_button.config(state=tk.NORMAL)
+            self.census_button.config(state=tk.NORMAL)
+            self.estimate_button.config(state=tk.NORMAL)
+            self.sweep_button.config(state=tk.NORMAL)
             
         except Exception as e:
             self.log_message(f"配置加载失败: {e}", "ERROR")
@@ -330,18 +528,11 @@ class ChunkResetterGUI:
         for item in self.land_tree.get_children():
             self.land_tree.delete(item)
         
-        # 获取维度对应的数据库维度名
-        dimension_mapping = {
-            'minecraft:overworld': 'Overworld',    # 首字母大写
-            'minecraft:the_nether': 'Nether',     # 首字母大写  
-            'minecraft:the_end': 'TheEnd'         # 驼峰命名
-        }
-        
-        db_dimension = dimension_mapping.get(self.dimension.get(), 'Overworld')
+        # 使用与重置引擎共享的保护模型，预览时不会重复读取领地
+        dimension = self.dimension.get()
         
         # 获取领地数据
-        self.lands_data = self.resetter.land_reader.get_lands_by_dimension(db_dimension)
-        self.covered_chunks = set()
+        self.lands_data = self.protection_model.get_lands(dimension)
         
         # 填充树形视图
         for land in self.lands_data:
@@ -353,18 +544,9 @@ class ChunkResetterGUI:
             coord_range = f"({land['min_x']}, {land['min_z']}) - ({land['max_x']}, {land['max_z']})"
             
             # 计算覆盖的区块
-            start_chunk_x = land['min_x'] // 16
-            start_chunk_z = land['min_z'] // 16
-            end_chunk_x = land['max_x'] // 16
-            end_chunk_z = land['max_z'] // 16
-            
+            start_chunk_x, start_chunk_z, end_chunk_x, end_chunk_z = land_chunk_bounds(land)
             chunk_range = f"({start_chunk_x}, {start_chunk_z}) - ({end_chunk_x}, {end_chunk_z})"
             
-            # 添加到覆盖区块集合
-            for cx in range(start_chunk_x, end_chunk_x + 1):
-                for cz in range(start_chunk_z, end_chunk_z + 1):
-                    self.covered_chunks.add((cx, cz))
-            
             # 面积
             area = land['area']
             
@@ -372,9 +554,125 @@ class ChunkResetterGUI:
             self.land_tree.insert("", tk.END, values=(land_id, name, owner, coord_range, chunk_range, area))
         
         # 更新统计信息
+        self._update_protection_stats()
+    
+    def _update_protection_stats(self):
+        """按当前维度和额外保护距离更新领地统计（结果由保护模型缓存，只计算变化的部分）"""
+        if not self.protection_model:
+            return
+        
+        try:
+            extra_protection = max(0, int(self.extra_protection_distance.get()))
+        except ValueError:
+            return
+        
+        self.covered_chunks = self.protection_model.get_protection_map(self.dimension.get(), extra_protection)
         stats_text = f"共找到 {len(self.lands_data)} 个领地，覆盖 {len(self.covered_chunks)} 个区块"
+        if extra_protection > 0:
+            stats_text += f"（含额外保护距离 {extra_protection}）"
         self.stats_label.config(text=stats_text)
     
+    def _on_dimension_changed(self, *args):
+        """切换维度后刷新领地列表"""
+        if self.protection_model and not self.is_processing:
+            self._load_lands_info()
+    
+    def _on_protection_distance_changed(self, *args):
+        """修改额外保护距离后刷新统计"""
+        if not self.is_processing:
+            self._update_protection_stats()
+    
+    def _watch_land_database(self):
+        """定时检查领地数据库，只把变化的领地增量应用到保护模型"""
+        if self.resetter and self.protection_model and not self.is_processing:
+            try:
+                changes = self.protection_model.refresh()
+                if changes:
+                    self._on_lands_changed(changes)
+                elif self.preview_state and self.preview_state[3] != self.protection_model.revision:
+                    # 领地变化已在其他操作中被应用，无法统计受影响的区块
+                    self._mark_preview_stale(None)
+            except Exception as e:
+                self.log_message(f"检查领地数据变化失败: {e}", "ERROR")
+        self.root.after(LAND_WATCH_INTERVAL_MS, self._watch_land_database)
+    
+    def _poll_telemetry(self):
+        """定时显示重置引擎的当前阶段、速度和剩余时间"""
+        snapshot = self.telemetry.snapshot()
+        if snapshot['phase'] is not None:
+            self.telemetry_label.config(text=format_telemetry(snapshot))
+        elif snapshot['phases']:
+            self.telemetry_label.config(text=f"各阶段耗时: {format_phase_summary(snapshot)}")
+        self.root.after(TELEMETRY_POLL_INTERVAL_MS, self._poll_telemetry)
+    
+    def _on_lands_changed(self, changes):
+        """领地数据变化后刷新领地列表，并检查预览是否过期"""
+        self.log_message(f"领地数据已变化: 新增 {len(changes['added'])} 个，删除 {len(changes['removed'])} 个，"
+                         f"修改 {len(changes['changed'])} 个", "WARNING")
+        self._load_lands_info()
+        
+        if not self.preview_state:
+            return
+        dimension, extra_protection, search_range, _ = self.preview_state
+        class_changes = changes['class_changes'].get((dimension, max(0, extra_protection)))
+        if class_changes is None:
+            self._mark_preview_stale(None)
+            return
+        
+        changed_in_range = sum(
+            1 for cx, cz in class_changes
+            if -search_range <= cx <= search_range and -search_range <= cz <= search_range
+        )
+        if changed_in_range > 0:
+            self._mark_preview_stale(changed_in_range)
+        else:
+            # 变化的领地不影响预览范围，预览结果仍然有效
+            self.preview_state = self.preview_state[:3] + (self.protection_model.revision,)
+    
+    def _mark_preview_stale(self, changed_chunks):
+        """
+        标记之前的预览已过期，需要重新预览才能执行
+        
+        Args:
+            changed_chunks (int): 预览范围内保护状态发生变化的区块数，无法统计时为 None
+        """
+        self.preview_state = None
+        self.execute_button.config(state=tk.DISABLED)
+        if changed_chunks is None:
+            message = "领地数据已变化，之前的预览已过期，请重新预览"
+        else:
+            message = f"领地数据已变化，预览范围内 {changed_chunks} 个区块的保护状态改变，请重新预览"
+        self.log_message(message, "WARNING")
+        self.update_status(message)
+    
+    def get_version_range(self):
+        """
+        读取区块版本范围设置
+        
+        Returns:
+            tuple: (是否有效, 版本范围)，两端都留空时版本范围为 None
+        """
+        try:
+            min_text = self.min_chunk_version.get().strip()
+            max_text = self.max_chunk_version.get().strip()
+            min_version = int(min_text) if min_text else None
+            max_version = int(max_text) if max_text else None
+        except ValueError:
+            messagebox.showerror("错误", "区块版本必须是整数")
+            return False, None
+        if min_version is None and max_version is None:
+            return True, None
+        return True, (min_version, max_version)
+    
+    def log_version_stats(self, stats):
+        """在日志中显示区块版本分布和版本过滤结果"""
+        if 'chunk_versions' not in stats:
+            return
+        distribution = ", ".join(f"{'未知' if version < 0 else version}: {count}"
+                                 for version, count in stats['chunk_versions'].items())
+        self.log_message(f"区块版本分布: {distribution or '无'}")
+        self.log_message(f"因版本不在范围内而保留的区块数量: {stats['version_filtered_chunks']}")
+    
     def preview_reset(self):
         """预览重置操作"""
         if not self.resetter:
@@ -393,10 +691,15 @@ class ChunkResetterGUI:
             messagebox.showerror("错误", "额外保护距离必须是数字")
             return
         
+        valid, version_range = self.get_version_range()
+        if not valid:
+            return
+        
         # 在后台线程中执行预览
-        threading.Thread(target=self._preview_reset_thread, args=(search_range, extra_protection), daemon=True).start()
+        threading.Thread(target=self._preview_reset_thread, args=(search_range, extra_protection, version_range),
+                         daemon=True).start()
     
-    def _preview_reset_thread(self, search_range, extra_protection):
+    def _preview_reset_thread(self, search_range, extra_protection, version_range=None):
         """在后台线程中执行预览"""
         try:
             self.is_processing = True
@@ -423,10 +726,14 @@ class ChunkResetterGUI:
                 search_range=search_range,
                 extra_protection_distance=extra_protection,
                 dry_run=True,
-                progress_callback=progress_callback
+                progress_callback=progress_callback,
+                export_path=self.export_path.get() or None,
+                version_range=version_range
             )
             
             if stats:
+                self.preview_state = (self.dimension.get(), extra_protection, search_range,
+                                      self.protection_model.revision)
                 self.log_message("预览完成")
                 self.log_message(f"检查的坐标总数: {stats['total_checked']}")
                 self.log_message(f"找到的区块数量: {stats['found_chunks']}")
@@ -434,6 +741,17 @@ class ChunkResetterGUI:
                 self.log_message(f"将被保留的区块数量: {stats['preserved_chunks']}")
                 self.log_message(f"将被重置的区块数量: {stats['reset_chunks']}")
                 self.log_message(f"错误数量: {stats['errors']}")
+                self.log_version_stats(stats)
+                pipeline_stats = stats['pipeline']
+                self.log_message(
+                    f"流水线等待: 读取 {pipeline_stats['reader']['wait_output_seconds']:.1f} 秒, "
+                    f"分类 {pipeline_stats['classifier']['wait_input_seconds']:.1f} 秒, "
+                    f"提交 {pipeline_stats['writer']['wait_input_seconds']:.1f} 秒; "
+                    f"预读队列最大深度 {pipeline_stats['read_queue']['max_depth']}/{pipeline_stats['queue_size']}, "
+                    f"预读数据峰值 {pipeline_stats['queued_bytes']['peak_bytes'] / 1024 / 1024:.1f} MB"
+                )
+                if 'exported_decisions' in stats:
+                    self.log_message(f"已导出 {stats['exported_decisions']} 条区块决策到: {self.export_path.get()}")
                 
                 if stats['reset_chunks'] > 0:
                     self.execute_button.config(state=tk.NORMAL)
@@ -478,11 +796,16 @@ class ChunkResetterGUI:
             return
         
         # 最终确认
+        if self.archive_path.get():
+            undo_text = (f"被删除区块的原始数据将先写入撤销存档:\n{self.archive_path.get()}\n"
+                         "可使用 chunk_archive.py restore 恢复全部或部分区块。\n\n")
+        else:
+            undo_text = "操作不可撤销，请确保已备份世界文件。\n\n"
         result = messagebox.askyesno(
             "最终确认",
             "⚠️ 警告 ⚠️\n\n"
             "此操作将永久删除未被领地保护的区块！\n"
-            "操作不可撤销，请确保已备份世界文件。\n\n"
+            f"{undo_text}"
             "确定要继续吗？",
             icon='warning'
         )
@@ -502,10 +825,15 @@ class ChunkResetterGUI:
             messagebox.showerror("错误", "额外保护距离必须是数字")
             return
         
+        valid, version_range = self.get_version_range()
+        if not valid:
+            return
+        
         # 在后台线程中执行重置
-        threading.Thread(target=self._execute_reset_thread, args=(search_range, extra_protection), daemon=True).start()
+        threading.Thread(target=self._execute_reset_thread, args=(search_range, extra_protection, version_range),
+                         daemon=True).start()
     
-    def _execute_reset_thread(self, search_range, extra_protection):
+    def _execute_reset_thread(self, search_range, extra_protection, version_range=None):
         """在后台线程中执行重置"""
         try:
             self.is_processing = True
@@ -514,6 +842,7 @@ class ChunkResetterGUI:
             self.execute_button.config(state=tk.DISABLED)
             self.preview_button.config(state=tk.DISABLED)
             self.cancel_button.config(state=tk.NORMAL)
+            self.preview_state = None
             
             self.update_status("正在执行重置操作...")
             self.log_message("开始执行重置操作")
@@ -527,38 +856,78 @@ class ChunkResetterGUI:
                     self.update_status(message)
                     self.root.update()
             
+            verify = self.verify_after_save.get()
+            if verify:
+                self.log_message("正在记录受保护区块的摘要...")
+                protected_count = self.resetter.begin_verification(
+                    VERIFY_DIGEST_FILE, self.dimension.get(), extra_protection, progress_callback=progress_callback)
+                self.log_message(f"已记录 {protected_count} 个受保护区块的摘要")
+            
             # 执行实际重置
             stats = self.resetter.reset_chunks_except_lands(
                 dimension=self.dimension.get(),
                 search_range=search_range,
                 extra_protection_distance=extra_protection,
                 dry_run=False,
-                progress_callback=progress_callback
+                progress_callback=progress_callback,
+                archive_path=self.archive_path.get() or None,
+                export_path=self.export_path.get() or None,
+                version_range=version_range
             )
             
             if stats:
                 self.log_message("重置操作完成")
                 self.log_message(f"成功重置了 {stats['reset_chunks']} 个区块")
+                self.log_version_stats(stats)
+                if 'archived_chunks' in stats:
+                    self.log_message(f"已写入撤销存档: {stats['archived_chunks']} 个区块, "
+                                     f"{stats['archive_bytes'] / 1024 / 1024:.2f} MB")
                 
                 # 保存世界
                 self.log_message("正在保存世界...")
                 self.update_status("正在保存世界...")
                 
                 # 定义保存进度回调函数
+                last_logged_step = [-1]
+                
                 def save_progress_callback(chunk_index, chunk_count):
                     if chunk_count > 0:
                         progress = (chunk_index / chunk_count) * 100
-                        self.log_message(f"保存进度: {chunk_index}/{chunk_count} ({progress:.1f}%)")
-                        self.update_status(f"保存中... {progress:.1f}%")
+                        # 每个区块都会回调一次，日志和状态栏（会刷新界面）只在进度每跨过一档时更新
+                        step = int(progress // SAVE_LOG_STEP_PERCENT)
+                        if step != last_logged_step[0] or chunk_index == chunk_count:
+                            last_logged_step[0] = step
+                            self.log_message(f"保存进度: {chunk_index}/{chunk_count} ({progress:.1f}%)")
+                            self.update_status(f"保存中... {progress:.1f}%")
                 
                 if self.resetter.save_world(progress_callback=save_progress_callback):
                     self.log_message("世界保存成功")
+                    
+                    verification_text = ""
+                    if verify:
+                        self.update_status("正在校验重置结果...")
+                        result = self.resetter.finish_verification(VERIFY_REPORT_FILE, progress_callback)
+                        self.log_message(f"重置结果校验{'通过' if result['ok'] else '失败'}: "
+                                         f"受保护区块被修改 {len(result['modified'])} 个、被删除 {len(result['missing'])} 个，"
+                                         f"重置区块仍有记录 {len(result['reset_residue'])} 个，"
+                                         f"详见 {VERIFY_REPORT_FILE}", "INFO" if result['ok'] else "ERROR")
+                        verification_text = f"重置结果校验: {'通过' if result['ok'] else '失败，详见日志'}\n"
+                    
+                    compaction_text = ""
+                    if self.compact_after_save.get():
+                        compaction_stats = self._compact_world(progress_callback)
+                        if compaction_stats:
+                            compaction_text = (f"回收空间: "
+                                               f"{compaction_stats['bytes_reclaimed'] / 1024 / 1024:.2f} MB\n")
+                    
                     self.update_status("操作完成")
                     messagebox.showinfo(
                         "操作完成",
                         f"重置操作成功完成！\n\n"
                         f"重置区块: {stats['reset_chunks']} 个\n"
                         f"保留区块: {stats['preserved_chunks']} 个\n"
+                        f"{compaction_text}"
+                        f"{verification_text}"
                         f"世界已保存"
                     )
                 else:
@@ -582,6 +951,188 @@ class ChunkResetterGUI:
             self.execute_button.config(state=tk.DISABLED)
             self.cancel_button.config(state=tk.DISABLED)
     
+    def run_census(self):
+        """统计世界存储空间并显示热力图"""
+        if not self.resetter:
+            messagebox.showerror("错误", "请先加载配置")
+            return
+        
+        # 搜索范围和额外保护距离用于估算预览可回收的空间，无效时按整个维度统计
+        try:
+            search_range = int(self.search_range.get())
+        except ValueError:
+            search_range = None
+        try:
+            extra_protection = max(0, int(self.extra_protection_distance.get()))
+        except ValueError:
+            extra_protection = 0
+        
+        threading.Thread(target=self._census_thread, args=(search_range, extra_protection), daemon=True).start()
+    
+    def _census_thread(self, search_range, extra_protection):
+        """在后台线程中统计世界存储空间"""
+        try:
+            self.is_processing = True
+            self.preview_button.config(state=tk.DISABLED)
+            self.census_button.config(state=tk.DISABLED)
+            self.update_status("正在统计世界存储空间...")
+            self.log_message("开始统计世界存储空间（不解码区块）")
+            
+            def progress_callback(current, total, message):
+                self.update_status(message)
+            
+            dimension = self.dimension.get()
+            census = self.resetter.census_world(dimension, search_range, extra_protection,
+                                                progress_callback=progress_callback)
+            if not census:
+                raise Exception("世界未加载")
+            
+            mb = 1024 * 1024
+            self.log_message(f"统计完成: {census['total_keys']} 条记录, {census['total_bytes'] / mb:.2f} MB, "
+                             f"耗时 {census['elapsed_seconds']:.1f} 秒")
+            for name, entry in census['dimensions'].items():
+                self.log_message(f"  {name}: {entry['chunks']} 个区块, {entry['bytes'] / mb:.2f} MB")
+            preview = census['preview']
+            self.log_message(f"按当前设置预览可回收: {preview['reclaimable_chunks']} 个区块, "
+                             f"{preview['reclaimable_bytes'] / mb:.2f} MB")
+            self.update_status("统计完成")
+            
+            self.root.after(0, lambda: CensusHeatmapWindow(self.root, census, dimension))
+        except Exception as e:
+            self.log_message(f"存储统计失败: {e}", "ERROR")
+            self.update_status("存储统计失败")
+            messagebox.showerror("错误", f"存储统计失败: {e}")
+        finally:
+            self.is_processing = False
+            self.preview_button.config(state=tk.NORMAL)
+            self.census_button.config(state=tk.NORMAL)
+    
+    def quick_estimate(self):
+        """抽样估算当前设置的重置结果"""
+        if not self.resetter:
+            messagebox.showerror("错误", "请先加载配置")
+            return
+        
+        try:
+            search_range = int(self.search_range.get())
+            extra_protection = max(0, int(self.extra_protection_distance.get()))
+        except ValueError:
+            messagebox.showerror("错误", "搜索范围和额外保护距离必须是数字")
+            return
+        
+        valid, version_range = self.get_version_range()
+        if not valid:
+            return
+        
+        threading.Thread(target=self._estimate_thread, args=(search_range, extra_protection, version_range),
+                         daemon=True).start()
+    
+    def _estimate_thread(self, search_range, extra_protection, version_range=None):
+        """在后台线程中执行抽样估算"""
+        try:
+            self.is_processing = True
+            self.preview_button.config(state=tk.DISABLED)
+            self.estimate_button.config(state=tk.DISABLED)
+            self.update_status("正在抽样估算...")
+            
+            estimate = self.resetter.estimate_reset_preview(
+                self.dimension.get(), search_range, extra_protection, version_range,
+                progress_callback=lambda current, total, message: self.update_status(message)
+            )
+            if not estimate:
+                raise Exception("世界未加载")
+            
+            if estimate['exact']:
+                self.log_message(f"快速估算 (±{search_range}, 额外保护 {extra_protection}): "
+                                 f"已访问全部 {estimate['samples']} 个区块，结果为精确值")
+            else:
+                self.log_message(f"快速估算 (±{search_range}, 额外保护 {extra_protection}): "
+                                 f"抽样访问 {estimate['samples']} 个区块，{estimate['confidence']:.0%} 置信区间")
+            self.log_message(f"  找到的区块数量: {format_estimate(estimate, 'found_chunks')}")
+            self.log_message(f"  将被保留的区块数量: {format_estimate(estimate, 'preserved_chunks')}")
+            self.log_message(f"  将被重置的区块数量: {format_estimate(estimate, 'reset_chunks')}")
+            self.log_message(f"  可回收空间: {format_estimate(estimate, 'reset_bytes')}")
+            self.update_status(f"估算完成 - 约重置 {estimate['estimates']['reset_chunks']['value']} 个区块，"
+                               f"耗时 {estimate['elapsed_seconds']:.1f} 秒；确定参数后请执行完整预览")
+        except Exception as e:
+            self.log_message(f"快速估算失败: {e}", "ERROR")
+            self.update_status("快速估算失败")
+            messagebox.showerror("错误", f"快速估算失败: {e}")
+        finally:
+            self.is_processing = False
+            self.preview_button.config(state=tk.NORMAL)
+            self.estimate_button.config(state=tk.NORMAL)
+    
+    def run_margin_sweep(self):
+        """一次扫描计算各额外保护距离下的重置结果，并以曲线显示"""
+        if not self.resetter:
+            messagebox.showerror("错误", "请先加载配置")
+            return
+        
+        try:
+            search_range = int(self.search_range.get())
+            extra_protection = max(0, int(self.extra_protection_distance.get()))
+        except ValueError:
+            messagebox.showerror("错误", "搜索范围和额外保护距离必须是数字")
+            return
+        
+        valid, version_range = self.get_version_range()
+        if not valid:
+            return
+        
+        # 当前搜索范围以及它的 1/4、1/2、3/4 各画一条曲线
+        search_ranges = sorted({max(1, search_range * quarter // 4) for quarter in range(1, 5)})
+        max_margin = max(SWEEP_MAX_MARGIN, extra_protection * 2)
+        threading.Thread(target=self._margin_sweep_thread,
+                         args=(search_ranges, max_margin, extra_protection, version_range), daemon=True).start()
+    
+    def _margin_sweep_thread(self, search_ranges, max_margin, extra_protection, version_range=None):
+        """在后台线程中执行额外保护距离扫描"""
+        try:
+            self.is_processing = True
+            self.preview_button.config(state=tk.DISABLED)
+            self.sweep_button.config(state=tk.DISABLED)
+            self.update_status("正在扫描额外保护距离...")
+            self.log_message(f"开始额外保护距离扫描 (0 ~ {max_margin}, 搜索范围 {search_ranges})")
+            
+            dimension = self.dimension.get()
+            sweep = self.resetter.sweep_protection_margins(
+                dimension, search_ranges, max_margin, version_range,
+                progress_callback=lambda current, total, message: self.update_status(message)
+            )
+            if not sweep:
+                raise Exception("世界未加载")
+            
+            column = len(sweep['search_ranges']) - 1
+            current = min(extra_protection, max_margin)
+            self.log_message(f"扫描完成，耗时 {sweep['elapsed_seconds']:.1f} 秒: ±{sweep['search_ranges'][column]} 内 "
+                             f"额外保护距离 {current} 时将重置 {sweep['reset_chunks'][column][current]} 个区块, "
+                             f"{sweep['reset_bytes'][column][current] / 1024 / 1024:.2f} MB")
+            self.update_status("额外保护距离扫描完成")
+            self.root.after(0, lambda: MarginSweepWindow(self.root, sweep, extra_protection))
+        except Exception as e:
+            self.log_message(f"额外保护距离扫描失败: {e}", "ERROR")
+            self.update_status("额外保护距离扫描失败")
+            messagebox.showerror("错误", f"额外保护距离扫描失败: {e}")
+        finally:
+            self.is_processing = False
+            self.preview_button.config(state=tk.NORMAL)
+            self.sweep_button.config(state=tk.NORMAL)
+    
+    def _compact_world(self, progress_callback):
+        """压缩世界数据库并记录压缩前后的大小"""
+        self.log_message("正在压缩世界数据库...")
+        self.update_status("正在压缩数据库...")
+        
+        compaction_stats = self.resetter.compact_world(progress_callback=progress_callback)
+        if compaction_stats:
+            self.log_message(f"压缩前大小: {compaction_stats['bytes_before'] / 1024 / 1024:.2f} MB")
+            self.log_message(f"压缩后大小: {compaction_stats['bytes_after'] / 1024 / 1024:.2f} MB")
+            self.log_message(f"数据库压缩完成，耗时 {compaction_stats['elapsed_seconds']:.1f} 秒")
+        else:
+            self.log_message("数据库压缩未执行或失败", "WARNING")
+        return compaction_stats
+    
     def cancel_operation(self):
         """取消操作"""
         if self.is_processing:
@@ -612,18 +1163,379 @@ class ChunkResetterGUI:
             except:
                 pass
         
+        self.log_view.close()
         self.root.destroy()
 
 
+class BoundedLogView:
+    """
+    有行数上限的日志窗口
+    
+    日志行先放入线程安全的队列，由界面线程定时批量插入文本框（每批一次插入），
+    超过行数上限时删除最早的行；一批日志多于上限时只显示最后的部分。
+    可选地把每一行写入按大小轮转的日志文件，窗口中被丢弃的行在文件中仍然完整保留。
+    """
+    
+    def __init__(self, root, text_widget, max_lines=LOG_MAX_LINES, flush_interval_ms=LOG_FLUSH_INTERVAL_MS):
+        """
+        Args:
+            root: Tk 根窗口
+            text_widget: 显示日志的文本框
+            max_lines (int): 窗口中最多保留的行数
+            flush_interval_ms (int): 批量写入窗口的间隔（毫秒）
+        """
+        self.root = root
+        self.text = text_widget
+        self.max_lines = max(1, max_lines)
+        self.flush_interval_ms = flush_interval_ms
+        self._queue = queue.SimpleQueue()
+        self._line_count = 0
+        self._file_logger = None
+        self._file_handler = None
+        self._closed = False
+        self.root.after(self.flush_interval_ms, self._flush)
+    
+    def write(self, line):
+        """添加一行日志（可在任意线程调用）"""
+        self._queue.put(line)
+    
+    def set_max_lines(self, max_lines):
+        """修改行数上限，立即删除超出的行"""
+        self.max_lines = max(1, max_lines)
+        self._trim()
+    
+    def clear(self):
+        """清空窗口中的日志（不影响日志文件）"""
+        self.text.delete(1.0, tk.END)
+        self._line_count = 0
+    
+    def open_log_file(self, path, max_bytes=LOG_FILE_MAX_BYTES, backup_count=LOG_FILE_BACKUP_COUNT):
+        """
+        开始把完整日志写入按大小轮转的文件
+        
+        Returns:
+            str: 日志文件的绝对路径
+        """
+        self.close_log_file()
+        handler = logging.handlers.RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count,
+                                                       encoding="utf-8")
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger = logging.getLogger(f"{__name__}.log_view.{id(self)}")
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+        logger.addHandler(handler)
+        self._file_logger, self._file_handler = logger, handler
+        return os.path.abspath(path)
+    
+    def close_log_file(self):
+        """停止写入日志文件"""
+        if self._file_handler is not None:
+            self._file_logger.removeHandler(self._file_handler)
+            self._file_handler.close()
+            self._file_logger = self._file_handler = None
+    
+    def _drain(self):
+        """取出队列中的全部日志行"""
+        lines = []
+        while True:
+            try:
+                lines.append(self._queue.get_nowait())
+            except queue.Empty:
+                return lines
+    
+    def _flush(self):
+        """把排队的日志批量写入窗口和日志文件"""
+        lines = self._drain()
+        if lines:
+            if self._file_logger is not None:
+                for line in lines:
+                    self._file_logger.info(line)
+            
+            omitted = len(lines) - self.max_lines
+            if omitted > 0:
+                lines = [f"... (窗口中省略了 {omitted} 行日志)"] + lines[-(self.max_lines - 1):]
+            
+            # 只有视图停留在底部时才自动滚动，方便查看历史日志
+            at_bottom = self.text.yview()[1] >= 0.999
+            self.text.insert(tk.END, "\n".join(lines) + "\n")
+            self._line_count += len(lines)
+            self._trim()
+            if at_bottom:
+                self.text.see(tk.END)
+        
+        if not self._closed:
+            self.root.after(self.flush_interval_ms, self._flush)
+    
+    def _trim(self):
+        """删除超出行数上限的最早的行"""
+        excess = self._line_count - self.max_lines
+        if excess > 0:
+            self.text.delete(1.0, f"{excess + 1}.0")
+            self._line_count = self.max_lines
+    
+    def close(self):
+        """停止定时刷新，把剩余的日志写入文件并关闭"""
+        self._closed = True
+        if self._file_logger is not None:
+            for line in self._drain():
+                self._file_logger.info(line)
+        self.close_log_file()
+
+
+class CensusHeatmapWindow:
+    """世界存储统计热力图窗口（每个格子为一个或多个 32×32 区块的区域，颜色按存储字节数的对数）"""
+    
+    CANVAS_SIZE = 600
+    # 每个方向最多绘制的格子数，区域更多时合并相邻区域
+    MAX_CELLS = 200
+    
+    def __init__(self, parent, census, dimension):
+        self.census = census
+        self.window = tk.Toplevel(parent)
+        self.window.title("世界存储统计")
+        self.window.resizable(False, False)
+        
+        top_frame = ttk.Frame(self.window, padding="10")
+        top_frame.grid(row=0, column=0, sticky=(tk.W, tk.E))
+        
+        ttk.Label(top_frame, text="维度:").grid(row=0, column=0, sticky=tk.W)
+        dimensions = list(census['dimensions']) or [dimension]
+        self.dimension = tk.StringVar(value=dimension if dimension in dimensions else dimensions[0])
+        dimension_combo = ttk.Combobox(top_frame, textvariable=self.dimension, values=dimensions,
+                                       state="readonly", width=22)
+        dimension_combo.grid(row=0, column=1, padx=(5, 10))
+        dimension_combo.bind("<<ComboboxSelected>>", lambda event: self._draw())
+        
+        ttk.Button(top_frame, text="保存 JSON", command=self._save_json).grid(row=0, column=2)
+        
+        self.summary_label = ttk.Label(top_frame, text="")
+        self.summary_label.grid(row=1, column=0, columnspan=3, sticky=tk.W, pady=(5, 0))
+        
+        self.canvas = tk.Canvas(self.window, width=self.CANVAS_SIZE, height=self.CANVAS_SIZE, background="#202020")
+        self.canvas.grid(row=1, column=0, padx=10)
+        self.canvas.bind("<Motion>", self._on_motion)
+        
+        self.info_label = ttk.Label(self.window, text="将鼠标移到格子上查看区域信息", padding="10")
+        self.info_label.grid(row=2, column=0, sticky=tk.W)
+        
+        self._cells = {}
+        self._draw()
+    
+    @staticmethod
+    def _heat_color(ratio):
+        """0 到 1 映射为蓝 → 红的颜色"""
+        red, green, blue = colorsys.hsv_to_rgb((1.0 - ratio) * 2 / 3, 0.85, 0.95)
+        return f"#{int(red * 255):02x}{int(green * 255):02x}{int(blue * 255):02x}"
+    
+    def _draw(self):
+        """绘制当前维度的热力图"""
+        self.canvas.delete("all")
+        self._cells = {}
+        dimension = self.dimension.get()
+        regions = [region for region in self.census['regions'] if region['dimension'] == dimension]
+        
+        mb = 1024 * 1024
+        dimension_stats = self.census['dimensions'].get(dimension, {'chunks': 0, 'bytes': 0})
+        summary = f"{dimension}: {dimension_stats['chunks']} 个区块, {dimension_stats['bytes'] / mb:.2f} MB"
+        preview = self.census['preview']
+        if preview and preview['dimension'] == dimension:
+            summary += (f"    按当前设置预览可回收: {preview['reclaimable_chunks']} 个区块, "
+                        f"{preview['reclaimable_bytes'] / mb:.2f} MB")
+        self.summary_label.config(text=summary)
+        
+        if not regions:
+            self.canvas.create_text(self.CANVAS_SIZE / 2, self.CANVAS_SIZE / 2, text="没有数据", fill="white")
+            return
+        
+        # 区域过多时合并相邻区域
+        min_rx = min(region['rx'] for region in regions)
+        max_rx = max(region['rx'] for region in regions)
+        min_rz = min(region['rz'] for region in regions)
+        max_rz = max(region['rz'] for region in regions)
+        span = max(max_rx - min_rx, max_rz - min_rz) + 1
+        self._factor = max(1, math.ceil(span / self.MAX_CELLS))
+        for region in regions:
+            key = ((region['rx'] - min_rx) // self._factor, (region['rz'] - min_rz) // self._factor)
+            cell = self._cells.setdefault(key, [0, 0])
+            cell[0] += region['chunks']
+            cell[1] += region['bytes']
+        
+        self._min_rx, self._min_rz = min_rx, min_rz
+        self._cell_size = self.CANVAS_SIZE / math.ceil(span / self._factor)
+        max_log = math.log1p(max(cell[1] for cell in self._cells.values()))
+        for (x, z), (_, size) in self._cells.items():
+            ratio = math.log1p(size) / max_log if max_log > 0 else 0
+            x0, z0 = x * self._cell_size, z * self._cell_size
+            self.canvas.create_rectangle(x0, z0, x0 + self._cell_size, z0 + self._cell_size,
+                                         fill=self._heat_color(ratio), outline="")
+        
+        # 标出预览的搜索范围
+        if preview and preview['dimension'] == dimension and preview['search_range'] is not None:
+            search_range = preview['search_range']
+            x0, z0 = self._chunk_to_canvas(-search_range, -search_range)
+            x1, z1 = self._chunk_to_canvas(search_range + 1, search_range + 1)
+            self.canvas.create_rectangle(x0, z0, x1, z1, outline="white", dash=(4, 2))
+    
+    def _chunk_to_canvas(self, cx, cz):
+        """区块坐标转换为画布坐标"""
+        region_size = self.census['region_size']
+        x = (cx / region_size - self._min_rx) / self._factor * self._cell_size
+        z = (cz / region_size - self._min_rz) / self._factor * self._cell_size
+        return x, z
+    
+    def _on_motion(self, event):
+        """显示鼠标所在格子的区域信息"""
+        if not self._cells:
+            return
+        key = (int(event.x // self._cell_size), int(event.y // self._cell_size))
+        cell = self._cells.get(key)
+        if cell is None:
+            self.info_label.config(text="")
+            return
+        region_size = self.census['region_size']
+        rx = self._min_rx + key[0] * self._factor
+        rz = self._min_rz + key[1] * self._factor
+        chunk_span = region_size * self._factor
+        self.info_label.config(
+            text=f"区块 ({rx * region_size}, {rz * region_size}) - "
+                 f"({rx * region_size + chunk_span - 1}, {rz * region_size + chunk_span - 1}): "
+                 f"{cell[0]} 个区块, {cell[1] / 1024 / 1024:.2f} MB"
+        )
+    
+    def _save_json(self):
+        """把统计结果保存为 JSON"""
+        path = filedialog.asksaveasfilename(
+            parent=self.window, title="保存统计结果", defaultextension=".json",
+            filetypes=[("JSON", "*.json"), ("所有文件", "*.*")]
+        )
+        if path:
+            save_census(self.census, path)
+
+
+class MarginSweepWindow:
+    """额外保护距离扫描曲线窗口（横轴为额外保护距离，每个搜索范围一条曲线）"""
+    
+    CANVAS_WIDTH = 640
+    CANVAS_HEIGHT = 360
+    MARGIN_LEFT = 70
+    MARGIN_RIGHT = 20
+    MARGIN_TOP = 20
+    MARGIN_BOTTOM = 40
+    LINE_COLORS = ("#4e79a7", "#59a14f", "#f28e2b", "#e15759", "#b07aa1", "#76b7b2")
+    METRICS = {"将重置的区块数量": 'reset_chunks', "可回收空间 (MB)": 'reset_bytes'}
+    
+    def __init__(self, parent, sweep, extra_protection=None):
+        self.sweep = sweep
+        self.extra_protection = extra_protection
+        self.window = tk.Toplevel(parent)
+        self.window.title("额外保护距离扫描")
+        self.window.resizable(False, False)
+        
+        top_frame = ttk.Frame(self.window, padding="10")
+        top_frame.grid(row=0, column=0, sticky=(tk.W, tk.E))
+        
+        ttk.Label(top_frame, text="指标:").grid(row=0, column=0, sticky=tk.W)
+        self.metric = tk.StringVar(value=next(iter(self.METRICS)))
+        metric_combo = ttk.Combobox(top_frame, textvariable=self.metric, values=list(self.METRICS),
+                                    state="readonly", width=18)
+        metric_combo.grid(row=0, column=1, padx=(5, 10))
+        metric_combo.bind("<<ComboboxSelected>>", lambda event: self._draw())
+        
+        ttk.Button(top_frame, text="保存 JSON", command=self._save_json).grid(row=0, column=2)
+        
+        self.canvas = tk.Canvas(self.window, width=self.CANVAS_WIDTH, height=self.CANVAS_HEIGHT, background="white")
+        self.canvas.grid(row=1, column=0, padx=10)
+        self.canvas.bind("<Motion>", self._on_motion)
+        
+        self.info_label = ttk.Label(self.window, text="将鼠标移到图上查看各额外保护距离的结果", padding="10")
+        self.info_label.grid(row=2, column=0, sticky=tk.W)
+        
+        self._draw()
+    
+    def _values(self):
+        """当前指标的数据 [搜索范围][额外保护距离]"""
+        key = self.METRICS[self.metric.get()]
+        if key == 'reset_bytes':
+            return [[value / 1024 / 1024 for value in row] for row in self.sweep[key]]
+        return self.sweep[key]
+    
+    def _margin_to_x(self, margin):
+        plot_width = self.CANVAS_WIDTH - self.MARGIN_LEFT - self.MARGIN_RIGHT
+        return self.MARGIN_LEFT + plot_width * margin / max(1, len(self.sweep['margins']) - 1)
+    
+    def _draw(self):
+        """绘制坐标轴和曲线"""
+        self.canvas.delete("all")
+        values = self._values()
+        max_value = max((max(row) for row in values if row), default=0) or 1
+        plot_bottom = self.CANVAS_HEIGHT - self.MARGIN_BOTTOM
+        plot_height = plot_bottom - self.MARGIN_TOP
+        
+        def value_to_y(value):
+            return plot_bottom - plot_height * value / max_value
+        
+        # 坐标轴和刻度
+        self.canvas.create_line(self.MARGIN_LEFT, self.MARGIN_TOP, self.MARGIN_LEFT, plot_bottom)
+        self.canvas.create_line(self.MARGIN_LEFT, plot_bottom, self.CANVAS_WIDTH - self.MARGIN_RIGHT, plot_bottom)
+        for step in range(5):
+            value = max_value * step / 4
+            y = value_to_y(value)
+            self.canvas.create_line(self.MARGIN_LEFT - 4, y, self.MARGIN_LEFT, y)
+            self.canvas.create_text(self.MARGIN_LEFT - 6, y, text=f"{value:.0f}" if max_value >= 10 else f"{value:.2f}",
+                                    anchor=tk.E)
+        margins = self.sweep['margins']
+        label_step = max(1, math.ceil(len(margins) / 16))
+        for margin in margins[::label_step]:
+            x = self._margin_to_x(margin)
+            self.canvas.create_line(x, plot_bottom, x, plot_bottom + 4)
+            self.canvas.create_text(x, plot_bottom + 6, text=str(margin), anchor=tk.N)
+        self.canvas.create_text((self.MARGIN_LEFT + self.CANVAS_WIDTH) / 2, self.CANVAS_HEIGHT - 4,
+                                text="额外保护距离（区块）", anchor=tk.S)
+        
+        # 当前设置的额外保护距离
+        if self.extra_protection is not None and self.extra_protection <= margins[-1]:
+            x = self._margin_to_x(self.extra_protection)
+            self.canvas.create_line(x, self.MARGIN_TOP, x, plot_bottom, fill="gray", dash=(4, 2))
+        
+        # 每个搜索范围一条曲线，图例在右上角
+        for column, (search_range, row) in enumerate(zip(self.sweep['search_ranges'], values)):
+            color = self.LINE_COLORS[column % len(self.LINE_COLORS)]
+            points = []
+            for margin, value in zip(margins, row):
+                points.extend((self._margin_to_x(margin), value_to_y(value)))
+            if len(points) >= 4:
+                self.canvas.create_line(*points, fill=color, width=2)
+            legend_y = self.MARGIN_TOP + 14 * column
+            self.canvas.create_line(self.CANVAS_WIDTH - 110, legend_y, self.CANVAS_WIDTH - 90, legend_y,
+                                    fill=color, width=2)
+            self.canvas.create_text(self.CANVAS_WIDTH - 86, legend_y, text=f"±{search_range}", anchor=tk.W)
+    
+    def _on_motion(self, event):
+        """显示鼠标所在额外保护距离下各搜索范围的结果"""
+        margins = self.sweep['margins']
+        plot_width = self.CANVAS_WIDTH - self.MARGIN_LEFT - self.MARGIN_RIGHT
+        margin = round((event.x - self.MARGIN_LEFT) / plot_width * max(1, len(margins) - 1))
+        if margin < 0 or margin > margins[-1]:
+            return
+        mb = 1024 * 1024
+        parts = [f"±{search_range}: {self.sweep['reset_chunks'][column][margin]} 个区块, "
+                 f"{self.sweep['reset_bytes'][column][margin] / mb:.2f} MB"
+                 for column, search_range in enumerate(self.sweep['search_ranges'])]
+        self.info_label.config(text=f"额外保护距离 {margin}: " + "; ".join(parts))
+    
+    def _save_json(self):
+        """把扫描结果保存为 JSON"""
+        path = filedialog.asksaveasfilename(
+            parent=self.window, title="保存扫描结果", defaultextension=".json",
+            filetypes=[("JSON", "*.json"), ("所有文件", "*.*")]
+        )
+        if path:
+            save_sweep(self.sweep, path)
+
+
 def main():
     """主函数"""
-    # 检查依赖
-    try:
-        import amulet
-    except ImportError:
-        messagebox.showerror("依赖错误", "请先安装 amulet-core:\npip install amulet-core")
-        return
-    
+    # amulet 在加载配置时才导入，缺少依赖时会在那时提示
     # 创建主窗口
     root = tk.Tk()
     app = ChunkResetterGUI(root)
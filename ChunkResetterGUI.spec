@@ -6,7 +6,7 @@ a = Analysis(
     pathex=[],
     binaries=[],
     datas=[],
-    hiddenimports=[],
+    hiddenimports=['ChunkAutoResetter'],
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
@@ -16,19 +16,19 @@ a = Analysis(
 )
 pyz = PYZ(a.pure)
 
+# 使用目录模式（onedir）：单文件模式每次启动都要把 amulet、PyMCTranslate 等全部依赖解压到临时目录，
+# 启动很慢；目录模式直接从安装目录加载。也不使用 UPX，避免加载时再解压动态库。
+# ChunkAutoResetter（及 amulet）在界面中延迟导入，仍需打包
 exe = EXE(
     pyz,
     a.scripts,
-    a.binaries,
-    a.datas,
     [],
+    exclude_binaries=True,
     name='ChunkResetterGUI',
     debug=False,
     bootloader_ignore_signals=False,
     strip=False,
-    upx=True,
-    upx_exclude=[],
-    runtime_tmpdir=None,
+    upx=False,
     console=False,
     disable_windowed_traceback=False,
     argv_emulation=False,
@@ -36,3 +36,12 @@ exe = EXE(
     codesign_identity=None,
     entitlements_file=None,
 )
+coll = COLLECT(
+    exe,
+    a.binaries,
+    a.datas,
+    strip=False,
+    upx=False,
+    upx_exclude=[],
+    name='ChunkResetterGUI',
+)
@@ -0,0 +1,468 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+多世界批量重置
+
+一个服务器网络通常有多个基岩版世界，每个世界有自己的 ARC Core 领地数据库。本工具读取一个
+清单文件，在独立的子进程中并发处理这些世界：
+    - 全局限制同时运行的世界数量（进程数）和预计内存总量，超出预算的世界排队等待；
+      每个世界的预计内存优先使用上次运行实测的内存峰值（见 get_measured_peak_mb）
+    - 每个世界的输出写入单独的日志文件，互不交错
+    - 一个世界失败（加载失败、异常、子进程崩溃）不影响其他世界
+    - 全部完成后生成一份汇总报告（JSON），并打印摘要
+
+清单格式（JSON）：
+    {
+        "max_workers": 3,
+        "max_memory_mb": 4096,
+        "defaults": {"search_range": 750, "extra_protection_distance": 2, "dry_run": true},
+        "worlds": [
+            {"name": "survival", "world": "servers/survival/worlds/level",
+             "land_db": "servers/survival/plugins/ARCCore/database.db"},
+            {"name": "resource", "world": "servers/resource/worlds/level",
+             "land_db": "servers/resource/plugins/ARCCore/database.db",
+             "dry_run": false, "archive_path": "backups/resource.cra", "compact": true}
+        ]
+    }
+
+每个世界可用的选项（未指定时使用 defaults，再使用下面的默认值）见 WORLD_OPTION_DEFAULTS。
+
+使用方法：
+    python batch_reset.py manifest.json --report batch_report.json
+    python batch_reset.py manifest.json --workers 2 --memory-mb 2048 --log-dir logs
+    python batch_reset.py manifest.json --history batch_report.json --report batch_report_new.json
+
+Author: DEVILENMO
+"""
+
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import sys
+import time
+import traceback
+from multiprocessing.connection import wait
+from typing import Any, Dict, List, Optional
+
+from memory_profile import read_process_memory
+
+# 每个世界的可选项及默认值
+WORLD_OPTION_DEFAULTS = {
+    'land_db': None,                    # 领地数据库路径，与 preserve_chunks 至少提供一个
+    'preserve_chunks': None,            # 不使用领地数据库时手动保留的区块 [[cx, cz], ...]
+    'dimension': "minecraft:overworld",
+    'search_range': 50,
+    'extra_protection_distance': 0,
+    'version_range': None,              # [最小版本, 最大版本]，null 表示不限
+    'dry_run': True,                    # 默认只试运行，需要在清单中显式设置为 false 才会修改世界
+    'archive_path': None,
+    'export_path': None,
+    'compact': False,                   # 保存后是否压缩数据库
+    'pipeline_max_queued_mb': 64,       # 流水线中预读记录的总大小上限（MB）
+    'memory_mb': None,                  # 预计内存占用（MB），None 时使用实测峰值，没有实测值时估算
+    'memory_report': None,              # 内存剖析报告路径（JSON），null 表示不剖析
+    'verify': False,                    # 实际执行时是否在保存后校验受保护区块和被重置区块
+}
+
+# 没有实测值时的粗略估算：进程和 amulet 的基础开销 + 流水线中预读记录的上限。
+# amulet 的区块缓存、领地保护表等不受流水线限制，大世界的实际占用可能远高于此值
+BASE_MEMORY_MB = 256
+
+# 使用实测内存峰值作为预计内存时预留的余量（领地和世界会随时间增长）
+MEASURED_MEMORY_HEADROOM = 1.25
+
+# 预计内存的来源
+MEMORY_SOURCE_MANIFEST = "manifest"    # 清单中的 memory_mb
+MEMORY_SOURCE_MEASURED = "measured"    # 上次运行实测的内存峰值
+MEMORY_SOURCE_ESTIMATED = "estimated"  # 按流水线预读上限粗略估算
+
+# 汇总报告中累加的统计字段
+SUMMED_STATS = ('found_chunks', 'preserved_chunks', 'reset_chunks', 'errors')
+
+
+def load_manifest(path: str, history_path: Optional[str] = None) -> Dict[str, Any]:
+    """
+    读取清单文件，并为每个世界补全选项
+
+    每个世界的预计内存（memory_mb）按以下顺序确定，来源记录在 memory_source 中：
+        1. 清单中显式设置的 memory_mb
+        2. 上次运行实测的内存峰值乘以 MEASURED_MEMORY_HEADROOM（见 get_measured_peak_mb）
+        3. 按流水线预读上限粗略估算（见 estimate_world_memory_mb），只作为第一次运行的参考
+
+    Args:
+        path (str): 清单文件路径
+        history_path (str): 上次运行的汇总报告（JSON），不存在时忽略
+
+    Returns:
+        dict: {'max_workers': int, 'max_memory_mb': int 或 None, 'worlds': [世界任务, ...]}
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+
+    defaults = dict(WORLD_OPTION_DEFAULTS)
+    defaults.update(manifest.get('defaults', {}))
+    history = load_peak_rss_history(history_path)
+
+    jobs = []
+    names = set()
+    for index, entry in enumerate(manifest.get('worlds', [])):
+        if 'world' not in entry:
+            raise ValueError(f"清单中第 {index + 1} 个世界缺少 world 字段")
+        job = dict(defaults)
+        job.update(entry)
+        name = job.get('name') or os.path.basename(os.path.normpath(job['world']))
+        # 名称用于日志文件名，重名时加上序号
+        if name in names:
+            name = f"{name}_{index + 1}"
+        names.add(name)
+        job['name'] = name
+        if job['memory_mb'] is not None:
+            job['memory_source'] = MEMORY_SOURCE_MANIFEST
+        else:
+            measured = get_measured_peak_mb(job, history)
+            if measured is not None:
+                job['memory_mb'] = int(math.ceil(measured * MEASURED_MEMORY_HEADROOM))
+                job['memory_source'] = MEMORY_SOURCE_MEASURED
+            else:
+                job['memory_mb'] = estimate_world_memory_mb(job['pipeline_max_queued_mb'])
+                job['memory_source'] = MEMORY_SOURCE_ESTIMATED
+        jobs.append(job)
+
+    return {
+        'max_workers': manifest.get('max_workers', os.cpu_count() or 1),
+        'max_memory_mb': manifest.get('max_memory_mb'),
+        'worlds': jobs,
+    }
+
+
+def estimate_world_memory_mb(pipeline_max_queued_mb: float) -> int:
+    """
+    按流水线预读记录的上限粗略估算处理一个世界的内存占用（MB）
+
+    流水线只限制预读记录的字节数，不限制 amulet 和领地保护表的内存，因此这只是下限意义上的估算，
+    没有实测值时使用。
+    """
+    return int(BASE_MEMORY_MB + pipeline_max_queued_mb)
+
+
+def load_peak_rss_history(path: Optional[str]) -> Dict[str, float]:
+    """
+    从上次运行的汇总报告中读取每个世界实测的内存峰值
+
+    Returns:
+        dict: {世界名称: 内存峰值 MB}，文件不存在或无法读取时为空
+    """
+    if not path or not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            report = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"警告: 无法读取上次运行的汇总报告 {path}: {e}")
+        return {}
+    return {result['name']: result['peak_rss_mb'] for result in report.get('results', [])
+            if result.get('name') and result.get('peak_rss_mb') is not None}
+
+
+def get_measured_peak_mb(job: Dict[str, Any], history: Dict[str, float]) -> Optional[float]:
+    """
+    世界上次运行实测的内存峰值（MB）
+
+    取上次汇总报告中该世界子进程的内存峰值，以及该世界内存剖析报告（memory_report）中的
+    最大值中较大的一个；都没有时返回 None。
+    """
+    peaks = []
+    if job['name'] in history:
+        peaks.append(history[job['name']])
+    if job['memory_report'] and os.path.exists(job['memory_report']):
+        try:
+            with open(job['memory_report'], "r", encoding="utf-8") as f:
+                max_rss = json.load(f).get('max_rss_mb')
+        except (OSError, ValueError):
+            max_rss = None
+        if max_rss is not None:
+            peaks.append(max_rss)
+    return max(peaks) if peaks else None
+
+
+def _get_peak_rss_mb() -> Optional[float]:
+    """当前进程的内存峰值（MB），平台不支持时返回 None"""
+    _, peak = read_process_memory()
+    return None if peak is None else round(peak / 1024 / 1024, 1)
+
+
+def run_world_job(job: Dict[str, Any], log_dir: str) -> Dict[str, Any]:
+    """
+    在子进程中处理一个世界（试运行或实际重置、保存、压缩）
+
+    输出重定向到 <log_dir>/<name>.log，异常不会向外抛出，而是记录在返回结果中。
+
+    Args:
+        job (dict): 世界任务（清单中补全后的一项）
+        log_dir (str): 日志目录
+
+    Returns:
+        dict: 处理结果，包含 status（ok / failed）、统计信息、耗时和内存峰值
+    """
+    start_time = time.time()
+    result = {
+        'name': job['name'],
+        'world': job['world'],
+        'dry_run': job['dry_run'],
+        'status': 'failed',
+        'stats': None,
+        'saved': False,
+        'compaction': None,
+        'error': None,
+        'log_path': os.path.join(log_dir, f"{job['name']}.log"),
+        'memory_mb': job['memory_mb'],
+        'memory_source': job.get('memory_source'),
+    }
+
+    with open(result['log_path'], "w", encoding="utf-8") as log_file:
+        stdout, stderr = sys.stdout, sys.stderr
+        sys.stdout = sys.stderr = log_file
+        resetter = None
+        try:
+            # 在子进程中才导入 amulet，主进程保持轻量
+            from ChunkAutoResetter import ChunkAutoResetter
+
+            if not job['land_db'] and job['preserve_chunks'] is None:
+                raise ValueError("未提供 land_db 或 preserve_chunks，拒绝在没有任何保护的情况下重置")
+
+            resetter = ChunkAutoResetter(job['world'], job['land_db'],
+                                         pipeline_max_queued_mb=job['pipeline_max_queued_mb'])
+            if job['memory_report']:
+                resetter.enable_memory_profiling(job['memory_report'])
+            if not resetter.load_world():
+                raise RuntimeError("加载世界失败")
+
+            options = {
+                'dimension': job['dimension'],
+                'search_range': job['search_range'],
+                'dry_run': job['dry_run'],
+                'archive_path': job['archive_path'],
+                'export_path': job['export_path'],
+                'version_range': tuple(job['version_range']) if job['version_range'] else None,
+            }
+            verify = job['verify'] and not job['dry_run']
+            if verify:
+                protected = None if job['land_db'] else {tuple(chunk) for chunk in job['preserve_chunks']}
+                resetter.begin_verification(os.path.join(log_dir, f"{job['name']}.dig"), job['dimension'],
+                                            job['extra_protection_distance'], protected)
+            if job['land_db']:
+                stats = resetter.reset_chunks_except_lands(
+                    extra_protection_distance=job['extra_protection_distance'], **options)
+            else:
+                stats = resetter.reset_chunks_with_preserve(
+                    [tuple(chunk) for chunk in job['preserve_chunks']], **options)
+            if stats is None:
+                raise RuntimeError("重置失败")
+            result['stats'] = stats
+
+            if not job['dry_run'] and stats['reset_chunks'] > 0:
+                if not resetter.save_world():
+                    raise RuntimeError("保存世界失败")
+                result['saved'] = True
+                if verify:
+                    verification = resetter.finish_verification(
+                        os.path.join(log_dir, f"{job['name']}_verification.json"))
+                    # 完整的区块列表在校验报告中，汇总结果只保留数量
+                    result['verification'] = {key: len(value) if isinstance(value, list) else value
+                                              for key, value in verification.items()}
+                    if not verification['ok']:
+                        raise RuntimeError("重置结果校验失败，详见校验报告")
+                if job['compact']:
+                    result['compaction'] = resetter.compact_world()
+
+            result['status'] = 'ok'
+        except Exception as e:
+            result['error'] = f"{type(e).__name__}: {e}"
+            traceback.print_exc()
+        finally:
+            if resetter is not None:
+                try:
+                    resetter.close_world()
+                except Exception:
+                    traceback.print_exc()
+            sys.stdout, sys.stderr = stdout, stderr
+
+    result['elapsed_seconds'] = round(time.time() - start_time, 1)
+    result['peak_rss_mb'] = _get_peak_rss_mb()
+    return result
+
+
+def _world_process(job: Dict[str, Any], log_dir: str, connection):
+    """子进程入口：处理一个世界并通过管道返回结果"""
+    try:
+        connection.send(run_world_job(job, log_dir))
+    finally:
+        connection.close()
+
+
+def _failed_result(job: Dict[str, Any], log_dir: str, error: str) -> Dict[str, Any]:
+    """子进程没有返回结果（崩溃或被系统终止）时的处理结果"""
+    return {
+        'name': job['name'], 'world': job['world'], 'dry_run': job['dry_run'],
+        'status': 'failed', 'stats': None, 'saved': False, 'compaction': None, 'error': error,
+        'log_path': os.path.join(log_dir, f"{job['name']}.log"),
+        'memory_mb': job['memory_mb'], 'memory_source': job.get('memory_source'),
+        'elapsed_seconds': None, 'peak_rss_mb': None,
+    }
+
+
+def run_batch(jobs: List[Dict[str, Any]], max_workers: int = 1, max_memory_mb: Optional[int] = None,
+              log_dir: str = "batch_logs", progress_callback=None) -> Dict[str, Any]:
+    """
+    在独立的子进程中并发处理多个世界
+
+    同时运行的世界数量不超过 max_workers，预计内存之和不超过 max_memory_mb
+    （单个世界超出预算时仍会在没有其他世界运行时单独处理）。预计内存只有来自实测峰值时
+    才反映真实占用，内存预算并不限制子进程实际使用的内存。每个世界在独立的子进程中处理，
+    处理完即退出，内存随进程一起释放。
+
+    Args:
+        jobs (list): 世界任务列表（load_manifest 返回的 worlds）
+        max_workers (int): 最多同时处理的世界数量
+        max_memory_mb (int): 预计内存总量上限（MB），None 表示不限制
+        log_dir (str): 每个世界日志文件的目录
+        progress_callback: 可选的进度回调函数，格式为 callback(current, total, message)
+
+    Returns:
+        dict: 汇总报告
+    """
+    os.makedirs(log_dir, exist_ok=True)
+    max_workers = max(1, max_workers)
+    start_time = time.time()
+    pending = list(jobs)
+    running = {}
+    results = []
+
+    print(f"开始批量处理 {len(jobs)} 个世界 (最多 {max_workers} 个并发"
+          f"{f', 内存预算 {max_memory_mb} MB' if max_memory_mb else ''})")
+    print(f"各世界日志目录: {log_dir}")
+    print("-" * 50)
+
+    # 每个世界使用独立的子进程：一个进程崩溃不会影响其他世界，进程退出时内存随之释放
+    context = multiprocessing.get_context("spawn")
+    while pending or running:
+        # 按清单顺序启动，直到进程数或内存预算用完
+        used_memory = sum(job['memory_mb'] for job, _ in running.values())
+        while pending and len(running) < max_workers:
+            job = pending[0]
+            if running and max_memory_mb and used_memory + job['memory_mb'] > max_memory_mb:
+                break
+            pending.pop(0)
+            used_memory += job['memory_mb']
+            receiver, sender = context.Pipe(duplex=False)
+            process = context.Process(target=_world_process, args=(job, log_dir, sender),
+                                      name=f"reset-{job['name']}")
+            process.start()
+            sender.close()
+            running[receiver] = (job, process)
+            print(f"开始处理世界: {job['name']} ({job['world']}, 预计内存 {job['memory_mb']} MB, "
+                  f"来源: {job.get('memory_source', MEMORY_SOURCE_MANIFEST)})")
+
+        # 等待管道可读：收到结果，或子进程退出后管道关闭
+        for receiver in wait(list(running)):
+            job, process = running.pop(receiver)
+            result = None
+            try:
+                result = receiver.recv()
+            except (EOFError, OSError):
+                pass
+            finally:
+                receiver.close()
+            process.join()
+            if result is None:
+                result = _failed_result(job, log_dir, f"子进程异常退出 (退出码 {process.exitcode})")
+            results.append(result)
+
+            if result['status'] == 'ok':
+                stats = result['stats']
+                print(f"世界 {result['name']} 完成: {'将重置' if result['dry_run'] else '已重置'} "
+                      f"{stats['reset_chunks']} 个区块, 耗时 {result['elapsed_seconds']} 秒")
+            else:
+                print(f"世界 {result['name']} 失败: {result['error']} (详见 {result['log_path']})")
+            if progress_callback:
+                progress_callback(len(results), len(jobs), f"已完成 {len(results)}/{len(jobs)} 个世界")
+
+    # 按清单顺序排列结果
+    order = {job['name']: index for index, job in enumerate(jobs)}
+    results.sort(key=lambda item: order[item['name']])
+    return build_report(results, time.time() - start_time, max_workers, max_memory_mb)
+
+
+def build_report(results: List[Dict[str, Any]], elapsed_seconds: float, max_workers: int,
+                 max_memory_mb: Optional[int]) -> Dict[str, Any]:
+    """汇总各世界的处理结果"""
+    totals = {field: 0 for field in SUMMED_STATS}
+    for result in results:
+        if result['stats']:
+            for field in SUMMED_STATS:
+                totals[field] += result['stats'].get(field, 0)
+    peaks = [result['peak_rss_mb'] for result in results if result.get('peak_rss_mb') is not None]
+    return {
+        'worlds': len(results),
+        'succeeded': sum(1 for result in results if result['status'] == 'ok'),
+        'failed': [result['name'] for result in results if result['status'] != 'ok'],
+        'elapsed_seconds': round(elapsed_seconds, 1),
+        'max_workers': max_workers,
+        'max_memory_mb': max_memory_mb,
+        'max_peak_rss_mb': max(peaks) if peaks else None,
+        'totals': totals,
+        'results': results,
+    }
+
+
+def print_batch_report(report: Dict[str, Any]):
+    """打印汇总报告"""
+    print("-" * 50)
+    print("批量处理完成统计:")
+    print(f"世界数量: {report['worlds']}, 成功 {report['succeeded']}, 失败 {len(report['failed'])}")
+    if report['failed']:
+        print(f"失败的世界: {', '.join(report['failed'])}")
+    totals = report['totals']
+    print(f"找到的区块数量: {totals['found_chunks']}")
+    print(f"保留的区块数量: {totals['preserved_chunks']}")
+    print(f"重置（或将重置）的区块数量: {totals['reset_chunks']}")
+    print(f"错误数量: {totals['errors']}")
+    if report['max_peak_rss_mb'] is not None:
+        print(f"单个世界的最大内存峰值: {report['max_peak_rss_mb']} MB")
+    print(f"总耗时: {report['elapsed_seconds']} 秒")
+
+
+def main():
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="多世界批量重置")
+    parser.add_argument("manifest", help="清单文件（JSON）")
+    parser.add_argument("--workers", type=int, help="最多同时处理的世界数量，覆盖清单中的 max_workers")
+    parser.add_argument("--memory-mb", type=int, help="预计内存总量上限（MB），覆盖清单中的 max_memory_mb")
+    parser.add_argument("--log-dir", default="batch_logs", help="每个世界日志文件的目录")
+    parser.add_argument("--report", help="把汇总报告保存为 JSON")
+    parser.add_argument("--history", help="上次运行的汇总报告，使用其中各世界实测的内存峰值作为预计内存，"
+                                          "默认使用 --report 指定的文件（存在时）")
+    args = parser.parse_args()
+
+    manifest = load_manifest(args.manifest, args.history or args.report)
+    report = run_batch(
+        manifest['worlds'],
+        max_workers=args.workers or manifest['max_workers'],
+        max_memory_mb=args.memory_mb or manifest['max_memory_mb'],
+        log_dir=args.log_dir,
+    )
+    print_batch_report(report)
+
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"汇总报告已保存到: {args.report}")
+
+    if report['failed']:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
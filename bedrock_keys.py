@@ -0,0 +1,526 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+基岩版 LevelDB 键工具
+
+基岩版世界的 db 目录是一个 LevelDB 数据库，区块、实体等数据按固定格式的键存储：
+    区块记录:   <cx:int32 LE><cz:int32 LE>[<dim:int32 LE>]<tag:byte>[<subchunk_y:byte>]
+    实体摘要:   b"digp" + <cx><cz>[<dim>]          值为若干个 8 字节的实体ID
+    实体记录:   b"actorprefix" + <实体ID:8字节>
+主世界的键不包含维度字段，下界和末地包含。
+
+本模块只做键的编码/解析和一些原始读取辅助，不依赖 amulet，可以单独使用。
+
+Author: DEVILENMO
+"""
+
+import bisect
+import struct
+from typing import Iterator, Optional, Tuple
+
+# Minecraft维度名 -> 基岩版维度ID
+DIMENSION_IDS = {
+    'minecraft:overworld': 0,
+    'minecraft:the_nether': 1,
+    'minecraft:the_end': 2,
+}
+
+# 基岩版维度ID -> Minecraft维度名
+DIMENSION_NAMES = {dim_id: name for name, dim_id in DIMENSION_IDS.items()}
+
+# 区块记录类型标签
+TAG_DATA_3D = 43
+TAG_VERSION = 44
+TAG_DATA_2D = 45
+TAG_DATA_2D_LEGACY = 46
+TAG_SUBCHUNK_PREFIX = 47
+TAG_LEGACY_TERRAIN = 48
+TAG_BLOCK_ENTITY = 49
+TAG_ENTITY = 50
+TAG_PENDING_TICKS = 51
+TAG_LEGACY_BLOCK_EXTRA_DATA = 52
+TAG_BIOME_STATE = 53
+TAG_FINALIZED_STATE = 54
+TAG_CONVERSION_DATA = 55
+TAG_BORDER_BLOCKS = 56
+TAG_HARDCODED_SPAWNERS = 57
+TAG_RANDOM_TICKS = 58
+TAG_CHECKSUMS = 59
+TAG_GENERATION_SEED = 60
+TAG_GENERATED_PRE_CAVES_AND_CLIFFS_BLENDING = 61
+TAG_BLENDING_BIOME_HEIGHT = 62
+TAG_META_DATA_HASH = 63
+TAG_BLENDING_DATA = 64
+TAG_ACTOR_DIGEST_VERSION = 65
+TAG_LEGACY_VERSION = 118
+
+# 所有合法的区块记录标签
+CHUNK_TAGS = frozenset(range(TAG_DATA_3D, TAG_ACTOR_DIGEST_VERSION + 1)) | {TAG_LEGACY_VERSION}
+
+# 标记区块存在的版本标签（与 amulet 判断区块是否存在的方式一致）
+VERSION_TAGS = (TAG_VERSION, TAG_LEGACY_VERSION)
+
+# 记录类型的可读名称
+TAG_NAMES = {
+    TAG_DATA_3D: 'Data3D',
+    TAG_VERSION: 'Version',
+    TAG_DATA_2D: 'Data2D',
+    TAG_DATA_2D_LEGACY: 'Data2DLegacy',
+    TAG_SUBCHUNK_PREFIX: 'SubChunkPrefix',
+    TAG_LEGACY_TERRAIN: 'LegacyTerrain',
+    TAG_BLOCK_ENTITY: 'BlockEntity',
+    TAG_ENTITY: 'Entity',
+    TAG_PENDING_TICKS: 'PendingTicks',
+    TAG_LEGACY_BLOCK_EXTRA_DATA: 'LegacyBlockExtraData',
+    TAG_BIOME_STATE: 'BiomeState',
+    TAG_FINALIZED_STATE: 'FinalizedState',
+    TAG_CONVERSION_DATA: 'ConversionData',
+    TAG_BORDER_BLOCKS: 'BorderBlocks',
+    TAG_HARDCODED_SPAWNERS: 'HardcodedSpawners',
+    TAG_RANDOM_TICKS: 'RandomTicks',
+    TAG_CHECKSUMS: 'CheckSums',
+    TAG_GENERATION_SEED: 'GenerationSeed',
+    TAG_GENERATED_PRE_CAVES_AND_CLIFFS_BLENDING: 'GeneratedPreCavesAndCliffsBlending',
+    TAG_BLENDING_BIOME_HEIGHT: 'BlendingBiomeHeight',
+    TAG_META_DATA_HASH: 'MetaDataHash',
+    TAG_BLENDING_DATA: 'BlendingData',
+    TAG_ACTOR_DIGEST_VERSION: 'ActorDigestVersion',
+    TAG_LEGACY_VERSION: 'LegacyVersion',
+}
+
+# 子区块的高度（方块）
+SUBCHUNK_HEIGHT = 16
+
+# 实体相关的键前缀
+DIGP_PREFIX = b"digp"
+ACTOR_PREFIX = b"actorprefix"
+ACTOR_ID_SIZE = 8
+
+
+def get_level_db(level):
+    """
+    从 amulet 世界对象中取出底层的 LevelDB 数据库
+
+    Args:
+        level: amulet.load_level 返回的世界对象
+
+    Returns:
+        LevelDB: 底层数据库对象，对它的修改会直接写入世界
+    """
+    return level.level_wrapper.level_db
+
+
+def chunk_prefix(cx: int, cz: int, dim_id: int = 0) -> bytes:
+    """
+    生成区块记录的键前缀（不含标签字节）
+
+    Args:
+        cx (int): 区块X坐标
+        cz (int): 区块Z坐标
+        dim_id (int): 基岩版维度ID，主世界为0
+
+    Returns:
+        bytes: 8字节（主世界）或12字节（其他维度）的前缀
+    """
+    if dim_id == 0:
+        return struct.pack("<ii", cx, cz)
+    return struct.pack("<iii", cx, cz, dim_id)
+
+
+def chunk_key(cx: int, cz: int, dim_id: int, tag: int, subchunk_y: Optional[int] = None) -> bytes:
+    """
+    生成完整的区块记录键
+
+    Args:
+        cx (int): 区块X坐标
+        cz (int): 区块Z坐标
+        dim_id (int): 基岩版维度ID
+        tag (int): 记录类型标签
+        subchunk_y (int): 子区块Y索引，仅 SubChunkPrefix 记录需要
+
+    Returns:
+        bytes: 区块记录键
+    """
+    key = chunk_prefix(cx, cz, dim_id) + bytes((tag,))
+    if subchunk_y is not None:
+        key += struct.pack("<b", subchunk_y)
+    return key
+
+
+def parse_chunk_key(key: bytes) -> Optional[Tuple[int, int, int, int, Optional[int]]]:
+    """
+    解析区块记录键
+
+    Args:
+        key (bytes): LevelDB 键
+
+    Returns:
+        Optional[tuple]: (cx, cz, dim_id, tag, subchunk_y)，不是区块记录时返回 None
+    """
+    length = len(key)
+    if length in (9, 10):
+        cx, cz = struct.unpack_from("<ii", key)
+        dim_id = 0
+        tag_offset = 8
+    elif length in (13, 14):
+        cx, cz, dim_id = struct.unpack_from("<iii", key)
+        if dim_id not in DIMENSION_NAMES:
+            return None
+        tag_offset = 12
+    else:
+        return None
+
+    tag = key[tag_offset]
+    if tag not in CHUNK_TAGS:
+        return None
+
+    subchunk_y = None
+    if length in (10, 14):
+        # 只有子区块记录带有额外的Y索引字节
+        if tag != TAG_SUBCHUNK_PREFIX:
+            return None
+        subchunk_y = struct.unpack_from("<b", key, tag_offset + 1)[0]
+    return cx, cz, dim_id, tag, subchunk_y
+
+
+def digp_key(cx: int, cz: int, dim_id: int = 0) -> bytes:
+    """生成区块实体摘要（digp）记录的键"""
+    return DIGP_PREFIX + chunk_prefix(cx, cz, dim_id)
+
+
+def parse_digp_key(key: bytes) -> Optional[Tuple[int, int, int]]:
+    """
+    解析实体摘要（digp）记录的键
+
+    Returns:
+        Optional[tuple]: (cx, cz, dim_id)，不是 digp 键时返回 None
+    """
+    if not key.startswith(DIGP_PREFIX):
+        return None
+    body = key[len(DIGP_PREFIX):]
+    if len(body) == 8:
+        cx, cz = struct.unpack("<ii", body)
+        return cx, cz, 0
+    if len(body) == 12:
+        cx, cz, dim_id = struct.unpack("<iii", body)
+        return cx, cz, dim_id
+    return None
+
+
+def split_actor_ids(digest_value: bytes) -> Iterator[bytes]:
+    """将 digp 记录的值拆分为8字节的实体ID"""
+    for offset in range(0, len(digest_value) - ACTOR_ID_SIZE + 1, ACTOR_ID_SIZE):
+        yield digest_value[offset:offset + ACTOR_ID_SIZE]
+
+
+def actor_key(actor_id: bytes) -> bytes:
+    """生成实体记录的键"""
+    return ACTOR_PREFIX + actor_id
+
+
+def prefix_upper_bound(prefix: bytes) -> Optional[bytes]:
+    """
+    计算前缀扫描的上界（不包含）
+
+    Returns:
+        Optional[bytes]: 第一个大于所有以 prefix 开头的键的键，前缀全为0xFF时返回 None
+    """
+    data = bytearray(prefix)
+    while data:
+        if data[-1] < 0xFF:
+            data[-1] += 1
+            return bytes(data)
+        data.pop()
+    return None
+
+
+def chunk_key_range(cx: int, cz: int, dim_id: int = 0) -> Tuple[bytes, bytes]:
+    """
+    一个区块所有记录所在的键范围 [start, end)
+
+    区块 (-1, -1) 的前缀全为 0xFF，prefix_upper_bound 没有结果，此时以前缀 + 0xFFFF 作为上界
+    （区块记录的键最多只在前缀后追加标签和子区块Y两个字节，且标签不会是 0xFF）。
+
+    Returns:
+        tuple: (start, end)
+    """
+    prefix = chunk_prefix(cx, cz, dim_id)
+    return prefix, prefix_upper_bound(prefix) or prefix + b"\xff\xff"
+
+
+def iter_prefix(db, prefix: bytes) -> Iterator[Tuple[bytes, bytes]]:
+    """
+    按键顺序流式遍历所有以 prefix 开头的记录
+
+    Args:
+        db: LevelDB 数据库对象
+        prefix (bytes): 键前缀
+
+    Yields:
+        tuple: (key, value)
+    """
+    for key, value in db.iterate(prefix, prefix_upper_bound(prefix)):
+        if not key.startswith(prefix):
+            break
+        yield key, value
+
+
+def db_has_key(db, key: bytes) -> bool:
+    """检查数据库中是否存在指定键"""
+    try:
+        db.get(key)
+        return True
+    except KeyError:
+        return False
+
+
+def chunk_exists(db, cx: int, cz: int, dim_id: int = 0) -> bool:
+    """通过版本记录判断区块是否存在于数据库中"""
+    return any(db_has_key(db, chunk_key(cx, cz, dim_id, tag)) for tag in VERSION_TAGS)
+
+
+def iter_chunk_records(db, cx: int, cz: int, dim_id: int = 0,
+                       include_actors: bool = True) -> Iterator[Tuple[bytes, bytes]]:
+    """
+    按键顺序读取一个区块的所有原始记录
+
+    主世界区块的8字节前缀同样是其他维度同坐标区块键的前缀，因此需要逐条解析过滤。
+
+    Args:
+        db: LevelDB 数据库对象
+        cx (int): 区块X坐标
+        cz (int): 区块Z坐标
+        dim_id (int): 基岩版维度ID
+        include_actors (bool): 是否同时读取该区块的 digp 摘要及其引用的实体记录
+
+    Yields:
+        tuple: (key, value)
+    """
+    for key, value in iter_prefix(db, chunk_prefix(cx, cz, dim_id)):
+        parsed = parse_chunk_key(key)
+        if parsed is not None and parsed[2] == dim_id:
+            yield key, value
+
+    if not include_actors:
+        return
+
+    key = digp_key(cx, cz, dim_id)
+    try:
+        digest_value = db.get(key)
+    except KeyError:
+        return
+    yield key, digest_value
+    for actor_id in split_actor_ids(digest_value):
+        try:
+            yield actor_key(actor_id), db.get(actor_key(actor_id))
+        except KeyError:
+            continue
+
+
+class _IterateSeeker:
+    """没有 new_iterator 的数据库对象上，用 iterate 提供 seek / valid / key / value"""
+
+    def __init__(self, db):
+        self._db = db
+        self._item = None
+
+    def seek(self, target: bytes):
+        self._item = next(iter(self._db.iterate(target, None)), None)
+
+    def valid(self) -> bool:
+        return self._item is not None
+
+    def key(self) -> bytes:
+        return self._item[0]
+
+    def value(self) -> bytes:
+        return self._item[1]
+
+
+def _iter_version_records_in_rect(db, dim_id: int, min_cx: int, max_cx: int,
+                                  min_cz: int, max_cz: int) -> Iterator[Tuple[int, int, bytes]]:
+    """
+    只在矩形范围内定位区块，按键顺序返回每个区块的版本记录值
+
+    键以小端序的 cx 开头，同一 cx 的所有记录在数据库中是连续的一段（一列），因此只需访问范围内的列。
+    列内按小端序的 cz 排序，范围内的 cz 并不连续，所以在列内按 cz 的键顺序跳转：
+    定位到下一个范围内坐标的 Version 记录，命中即得到该区块；落在同一坐标的其他记录上时再查
+    LegacyVersion；落在其他坐标上时直接跳到落点之后的下一个范围内坐标。每次定位至少前进一个坐标，
+    范围外的区块不会被读取，稀疏区域一次定位可以跳过许多空坐标。
+
+    Args:
+        min_cx, max_cx, min_cz, max_cz (int): 区块坐标范围，包含端点
+    """
+    columns = sorted(range(min_cx, max_cx + 1), key=lambda value: struct.pack("<i", value))
+    coords = sorted(range(min_cz, max_cz + 1), key=lambda value: struct.pack("<i", value))
+    encoded = [struct.pack("<i", value) for value in coords]
+    new_iterator = getattr(db, "new_iterator", None)
+    iterator = new_iterator() if new_iterator is not None else _IterateSeeker(db)
+    for cx in columns:
+        column = struct.pack("<i", cx)
+        position = 0
+        while position < len(coords):
+            cz = coords[position]
+            target = chunk_key(cx, cz, dim_id, TAG_VERSION)
+            iterator.seek(target)
+            if not iterator.valid():
+                return
+            key = iterator.key()
+            if key == target:
+                yield cx, cz, iterator.value()
+                position += 1
+                continue
+            if not key.startswith(column):
+                break
+            cz_bytes = key[4:8]
+            if cz_bytes == encoded[position]:
+                # 该坐标有记录但没有 Version 记录，旧世界的区块只有 LegacyVersion
+                try:
+                    yield cx, cz, db.get(chunk_key(cx, cz, dim_id, TAG_LEGACY_VERSION))
+                except KeyError:
+                    pass
+                position += 1
+                continue
+            # 落点已经越过当前坐标，跳到落点所在或之后的第一个范围内坐标
+            position = bisect.bisect_left(encoded, cz_bytes, position)
+
+
+def _iter_version_records(db, dim_id: int, search_range: Optional[int]) -> Iterator[Tuple[int, int, Optional[bytes]]]:
+    """
+    按键顺序返回每个区块的第一条版本记录（同时存在新旧两种版本记录时为 Version）
+
+    限定了搜索范围时只访问范围内的键（见 _iter_version_records_in_rect），值随定位一起读出；
+    否则顺序扫描整个数据库的键，返回的是版本记录的键而不是值（调用方需要时再读取）。
+
+    Yields:
+        tuple: (cx, cz, value)，整库扫描时为 (cx, cz, key)
+    """
+    if search_range is not None:
+        yield from _iter_version_records_in_rect(db, dim_id, -search_range, search_range, -search_range, search_range)
+        return
+
+    last = None
+    for key in db.keys():
+        parsed = parse_chunk_key(key)
+        if parsed is None or parsed[2] != dim_id or parsed[3] not in VERSION_TAGS:
+            continue
+        # 同一区块可能同时存在新旧两种版本记录，它们的键是相邻的
+        if (parsed[0], parsed[1]) == last:
+            continue
+        last = (parsed[0], parsed[1])
+        yield parsed[0], parsed[1], key
+
+
+def iter_chunk_coords(db, dim_id: int = 0, search_range: Optional[int] = None) -> Iterator[Tuple[int, int]]:
+    """
+    按数据库键顺序遍历指定维度中存在的区块坐标
+
+    只读取键，不读取区块数据。遍历顺序与 LevelDB 的存储顺序一致
+    （小端序的 x、z、维度、标签），后续按此顺序读取区块时可以顺序命中 SSTable 数据块。
+    限定搜索范围时只定位范围内的列和坐标，不会扫描整个数据库。
+
+    Args:
+        db: LevelDB 数据库对象
+        dim_id (int): 基岩版维度ID
+        search_range (int): 只返回 -search_range 到 search_range 范围内的区块，None表示不限制
+
+    Yields:
+        tuple: (cx, cz)
+    """
+    for cx, cz, _ in _iter_version_records(db, dim_id, search_range):
+        yield cx, cz
+
+
+def iter_chunk_versions(db, dim_id: int = 0,
+                        search_range: Optional[int] = None) -> Iterator[Tuple[int, int, Optional[int]]]:
+    """
+    与 iter_chunk_coords 相同的键顺序遍历，同时读取每个区块的版本号
+
+    版本号是版本记录（Version，旧世界为 LegacyVersion）值的第一个字节，表示生成或最后升级该区块的
+    游戏版本对应的区块格式版本。每个区块只额外读取一条一字节的记录，不读取区块数据。
+
+    Yields:
+        tuple: (cx, cz, version)，版本记录为空时 version 为 None
+    """
+    for cx, cz, value in _iter_version_records(db, dim_id, search_range):
+        if search_range is None:
+            try:
+                value = db.get(value)
+            except KeyError:
+                continue
+        yield cx, cz, (value[0] if value else None)
+
+
+def iter_chunk_versions_in_rect(db, dim_id: int, min_cx: int, max_cx: int,
+                                min_cz: int, max_cz: int) -> Iterator[Tuple[int, int, Optional[int]]]:
+    """
+    与 iter_chunk_versions 相同，但只定位矩形范围（包含端点）内的区块，例如一个区域或一列
+
+    Yields:
+        tuple: (cx, cz, version)，版本记录为空时 version 为 None
+    """
+    for cx, cz, value in _iter_version_records_in_rect(db, dim_id, min_cx, max_cx, min_cz, max_cz):
+        yield cx, cz, (value[0] if value else None)
+
+
+def version_bounds(version_range: Optional[Tuple[Optional[int], Optional[int]]]) -> Tuple[int, int]:
+    """
+    把版本范围换算为包含端点的整数区间，所有按版本过滤的代码（逐个区块或 numpy 数组）都使用它
+
+    版本号是版本记录的第一个字节（0~255），未知版本记为 -1。范围有任一端点时，未知版本视为不在范围内。
+
+    Args:
+        version_range (tuple): (最小版本, 最大版本)，包含端点，None 表示不限；整个参数为 None 时不限
+
+    Returns:
+        tuple: (下限, 上限)，版本号 v 满足 下限 <= v <= 上限 时在范围内
+    """
+    if version_range is None or (version_range[0] is None and version_range[1] is None):
+        return -1, 255
+    min_version, max_version = version_range
+    return (max(0, min_version) if min_version is not None else 0,
+            max_version if max_version is not None else 255)
+
+
+def version_in_range(version: Optional[int], version_range: Optional[Tuple[Optional[int], Optional[int]]]) -> bool:
+    """
+    判断区块版本号是否在版本范围内（规则见 version_bounds）
+
+    Args:
+        version (int): 区块版本号，-1 或 None 表示未知
+        version_range (tuple): (最小版本, 最大版本)，包含端点，None 表示不限
+    """
+    low, high = version_bounds(version_range)
+    return low <= (-1 if version is None else version) <= high
+
+
+def subchunk_indices_in_y_range(min_y: int, max_y: int) -> range:
+    """
+    计算完全位于方块Y范围内的子区块Y索引
+
+    子区块 i 覆盖方块Y [16i, 16i + 15]，只有整个子区块都在范围内时才会被选中。
+
+    Args:
+        min_y (int): 最小方块Y（包含）
+        max_y (int): 最大方块Y（包含）
+
+    Returns:
+        range: 子区块Y索引范围，范围内没有完整的子区块时为空
+    """
+    return range(-(-min_y // SUBCHUNK_HEIGHT), (max_y + 1) // SUBCHUNK_HEIGHT)
+
+
+def iter_subchunk_records(db, cx: int, cz: int, dim_id: int = 0) -> Iterator[Tuple[int, bytes, bytes]]:
+    """
+    按键顺序读取一个区块的所有子区块（SubChunkPrefix）记录
+
+    子区块记录的键是区块前缀 + 标签 + Y索引，同一区块的子区块记录在数据库中相邻，
+    只需一次前缀扫描。
+
+    Yields:
+        tuple: (subchunk_y, key, value)
+    """
+    for key, value in iter_prefix(db, chunk_key(cx, cz, dim_id, TAG_SUBCHUNK_PREFIX)):
+        parsed = parse_chunk_key(key)
+        if parsed is not None and parsed[2] == dim_id and parsed[4] is not None:
+            yield parsed[4], key, value
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+区块重置器性能基准测试
+
+在真实世界上测量不同实现的耗时，用于评估优化效果。每项测试都会重新打开世界，
+避免 amulet 的区块缓存影响结果；操作系统的文件缓存无法清除，因此各项测试交替重复执行，
+取最好成绩。启动耗时在新的解释器进程中测量，不需要世界。
+
+使用方法：
+    python benchmark.py                  # 只测量启动耗时
+    python benchmark.py path/to/world --range 300 --repeat 3
+    python benchmark.py path/to/world --dimension minecraft:the_nether > bench_output.txt
+    python benchmark.py path/to/world --discovery-ranges 50 200 1000   # 只对比区块定位方式，不需要 amulet
+
+Author: DEVILENMO
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+from bedrock_keys import (
+    DIMENSION_IDS, VERSION_TAGS, chunk_exists, get_level_db, iter_chunk_coords, parse_chunk_key
+)
+
+# 启动耗时测试的模块：(模块名, 说明)
+STARTUP_MODULES = (
+    ("ChunkResetterGUI", "界面模块（窗口显示前）"),
+    ("land_data_reader", "领地读取器"),
+    ("ChunkAutoResetter", "世界编辑组件 (amulet)"),
+)
+
+
+def bench_import(module_name):
+    """
+    在新的解释器进程中测量导入一个模块的耗时
+
+    Returns:
+        Optional[dict]: 导入耗时和进程总耗时（含解释器启动），导入失败时返回 None
+    """
+    code = ("import time; start = time.perf_counter(); "
+            f"import {module_name}; print(time.perf_counter() - start)")
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True,
+                            cwd=os.path.dirname(os.path.abspath(__file__)))
+    process_seconds = time.perf_counter() - start
+    if result.returncode != 0:
+        return None
+    return {'seconds': float(result.stdout.strip().splitlines()[-1]), 'process_seconds': process_seconds}
+
+
+def run_startup_benchmark(repeat):
+    """测量界面和各组件的导入耗时（界面模块的耗时即窗口出现前的等待时间）"""
+    print("== 启动耗时 (新进程中导入模块) ==")
+    best = {}
+    for module_name, label in STARTUP_MODULES:
+        for _ in range(repeat):
+            result = bench_import(module_name)
+            if result is None:
+                break
+            if module_name not in best or result['seconds'] < best[module_name]['seconds']:
+                best[module_name] = result
+        if module_name in best:
+            print(f"  {label} ({module_name}): 导入 {best[module_name]['seconds']:.3f} 秒, "
+                  f"进程总耗时 {best[module_name]['process_seconds']:.3f} 秒")
+        else:
+            print(f"  {label} ({module_name}): 导入失败（缺少依赖？）")
+    return best
+
+
+def _load_level(world_path):
+    """打开世界（每项测试独立打开，避免区块缓存互相影响）"""
+    import amulet
+    return amulet.load_level(world_path)
+
+
+def bench_row_major_probe(world_path, dimension, search_range):
+    """
+    旧实现：按 cx/cz 行列顺序逐个坐标调用 get_chunk 探测区块
+
+    Returns:
+        dict: 耗时与找到的区块数
+    """
+    from amulet.api.errors import ChunkDoesNotExist, ChunkLoadError
+
+    level = _load_level(world_path)
+    try:
+        found = 0
+        start = time.perf_counter()
+        for cx in range(-search_range, search_range + 1):
+            for cz in range(-search_range, search_range + 1):
+                try:
+                    level.get_chunk(cx, cz, dimension)
+                    found += 1
+                except (ChunkDoesNotExist, ChunkLoadError):
+                    continue
+        elapsed = time.perf_counter() - start
+    finally:
+        level.close()
+    return {'seconds': elapsed, 'chunks': found}
+
+
+def bench_key_order_traversal(world_path, dimension, search_range):
+    """
+    新实现：顺序扫描数据库键得到区块坐标，再按键顺序调用 get_chunk
+
+    Returns:
+        dict: 耗时与找到的区块数
+    """
+    from amulet.api.errors import ChunkDoesNotExist, ChunkLoadError
+
+    level = _load_level(world_path)
+    try:
+        found = 0
+        start = time.perf_counter()
+        coords = list(iter_chunk_coords(get_level_db(level), DIMENSION_IDS[dimension], search_range))
+        scan_elapsed = time.perf_counter() - start
+        for cx, cz in coords:
+            try:
+                level.get_chunk(cx, cz, dimension)
+                found += 1
+            except (ChunkDoesNotExist, ChunkLoadError):
+                continue
+        elapsed = time.perf_counter() - start
+    finally:
+        level.close()
+    return {'seconds': elapsed, 'chunks': found, 'key_scan_seconds': scan_elapsed}
+
+
+def run_traversal_benchmark(world_path, dimension, search_range, repeat):
+    """交替运行两种遍历方式并输出对比结果"""
+    print(f"== 区块遍历: 行列探测 vs 键顺序遍历 (范围 ±{search_range}, {dimension}) ==")
+    best = {}
+    for round_index in range(1, repeat + 1):
+        for name, bench in (("row_major_probe", bench_row_major_probe),
+                            ("key_order_traversal", bench_key_order_traversal)):
+            result = bench(world_path, dimension, search_range)
+            print(f"  第{round_index}轮 {name}: {result['seconds']:.2f} 秒, {result['chunks']} 个区块")
+            if name not in best or result['seconds'] < best[name]['seconds']:
+                best[name] = result
+
+    probe = best['row_major_probe']
+    ordered = best['key_order_traversal']
+    print(f"  行列探测最好成绩:   {probe['seconds']:.2f} 秒 "
+          f"({probe['chunks'] / max(probe['seconds'], 1e-9):.0f} 区块/秒)")
+    print(f"  键顺序遍历最好成绩: {ordered['seconds']:.2f} 秒 "
+          f"({ordered['chunks'] / max(ordered['seconds'], 1e-9):.0f} 区块/秒, "
+          f"其中键扫描 {ordered['key_scan_seconds']:.2f} 秒)")
+    print(f"  加速比: {probe['seconds'] / max(ordered['seconds'], 1e-9):.2f}x")
+    if probe['chunks'] != ordered['chunks']:
+        print(f"  警告: 两种方式找到的区块数不一致 ({probe['chunks']} / {ordered['chunks']})")
+    return best
+
+
+def _discover_full_scan(db, dim_id, search_range):
+    """顺序扫描整个数据库的键，再按搜索范围过滤"""
+    found = set()
+    for key in db.keys():
+        parsed = parse_chunk_key(key)
+        if (parsed is not None and parsed[2] == dim_id and parsed[3] in VERSION_TAGS
+                and abs(parsed[0]) <= search_range and abs(parsed[1]) <= search_range):
+            found.add((parsed[0], parsed[1]))
+    return len(found)
+
+
+def _discover_point_probe(db, dim_id, search_range):
+    """对范围内的每个坐标点查询版本记录"""
+    return sum(1 for cx in range(-search_range, search_range + 1) for cz in range(-search_range, search_range + 1)
+               if chunk_exists(db, cx, cz, dim_id))
+
+
+def _discover_range_seek(db, dim_id, search_range):
+    """iter_chunk_coords 的范围定位"""
+    return sum(1 for _ in iter_chunk_coords(db, dim_id, search_range))
+
+
+def run_discovery_benchmark(world_path, dimension, search_ranges, repeat):
+    """
+    直接在 LevelDB 上对比三种定位范围内区块的方式（不需要 amulet）：
+    整库键扫描、逐坐标点查询、按列和坐标跳转的范围定位
+    """
+    from leveldb import LevelDB
+    from world_compaction import get_db_directory
+
+    methods = (("full_scan", _discover_full_scan), ("point_probe", _discover_point_probe),
+               ("range_seek", _discover_range_seek))
+    dim_id = DIMENSION_IDS[dimension]
+    db = LevelDB(get_db_directory(world_path))
+    results = {}
+    try:
+        total_keys = sum(1 for _ in db.keys())
+        print(f"== 区块定位: 整库扫描 vs 点查询 vs 范围定位 ({dimension}, 数据库共 {total_keys} 个键) ==")
+        for search_range in search_ranges:
+            best = {}
+            for _ in range(repeat):
+                for name, method in methods:
+                    start = time.perf_counter()
+                    chunks = method(db, dim_id, search_range)
+                    elapsed = time.perf_counter() - start
+                    if name not in best or elapsed < best[name]['seconds']:
+                        best[name] = {'seconds': elapsed, 'chunks': chunks}
+            counts = {result['chunks'] for result in best.values()}
+            print(f"  ±{search_range} ({(search_range * 2 + 1) ** 2} 个坐标, 找到 {best['range_seek']['chunks']} 个区块): "
+                  + ", ".join(f"{name} {result['seconds']:.3f} 秒" for name, result in best.items()))
+            if len(counts) != 1:
+                print(f"  警告: 几种方式找到的区块数不一致 {best}")
+            results[search_range] = best
+    finally:
+        db.close()
+    return results
+
+
+def main():
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="区块重置器性能基准测试")
+    parser.add_argument("world", nargs="?", help="Minecraft世界路径（建议使用副本），不提供时只测量启动耗时")
+    parser.add_argument("--range", type=int, default=200, dest="search_range", help="搜索范围（区块）")
+    parser.add_argument("--dimension", default="minecraft:overworld", choices=sorted(DIMENSION_IDS))
+    parser.add_argument("--repeat", type=int, default=2, help="每项测试的重复轮数")
+    parser.add_argument("--discovery-ranges", type=int, nargs="+",
+                        help="只对比区块定位方式（整库扫描/点查询/范围定位）的搜索范围列表")
+    args = parser.parse_args()
+
+    if args.world and args.discovery_ranges:
+        run_discovery_benchmark(args.world, args.dimension, args.discovery_ranges, args.repeat)
+        return
+    run_startup_benchmark(args.repeat)
+    if args.world:
+        run_traversal_benchmark(args.world, args.dimension, args.search_range, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,410 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+区块前像存档（撤销存档）
+
+在重置区块之前，把即将删除的区块的原始 LevelDB 记录流式写入一个压缩的存档文件，
+之后可以恢复全部区块或只恢复指定区域，代替每次重置前复制整个世界。
+
+存档文件格式：
+    文件头:   MAGIC(8) + 压缩算法名长度(1) + 压缩算法名
+    数据帧:   若干个压缩帧，每帧包含多个区块的记录，
+              记录格式为 key_len(u16) + value_len(u32) + key + value
+    坐标索引: 每个区块一项 dim(i8) cx(i32) cz(i32) 帧偏移(u64) 帧长度(u32)
+              区块数据在帧内的偏移(u32) 区块数据长度(u32) 记录数(u32)
+    文件尾:   索引偏移(u64) + 索引项数(u64) + MAGIC(8)
+
+恢复某个区域时只需读取并解压包含该区域区块的帧。
+
+使用方法：
+    # 恢复存档中的全部区块（服务器需关闭）
+    python chunk_archive.py restore path/to/world reset_backup.cra
+
+    # 只恢复下界中 (-10, -10) 到 (10, 10) 区块范围
+    python chunk_archive.py restore path/to/world reset_backup.cra --dimension minecraft:the_nether --region -10 -10 10 10
+
+    # 查看存档内容
+    python chunk_archive.py list reset_backup.cra
+
+Author: DEVILENMO
+"""
+
+import argparse
+import os
+import struct
+import zlib
+from typing import Dict, Iterator, List, Optional, Tuple, Any
+
+from bedrock_keys import DIMENSION_IDS, DIMENSION_NAMES, digp_key, iter_chunk_records
+
+try:
+    import lz4.frame as lz4_frame
+except ImportError:
+    lz4_frame = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+MAGIC = b"CRARCH01"
+FOOTER_FORMAT = "<QQ8s"
+INDEX_ENTRY_FORMAT = "<biiQIIII"
+RECORD_HEADER_FORMAT = "<HI"
+INDEX_ENTRY_SIZE = struct.calcsize(INDEX_ENTRY_FORMAT)
+FOOTER_SIZE = struct.calcsize(FOOTER_FORMAT)
+RECORD_HEADER_SIZE = struct.calcsize(RECORD_HEADER_FORMAT)
+
+
+def _default_codec() -> str:
+    """选择可用的压缩算法，优先 lz4（requirements.txt 已包含），其次 zstd，最后 zlib"""
+    if lz4_frame is not None:
+        return "lz4"
+    if zstandard is not None:
+        return "zstd"
+    return "zlib"
+
+
+def _compress(codec: str, data: bytes) -> bytes:
+    """按指定算法压缩一帧数据"""
+    if codec == "lz4":
+        return lz4_frame.compress(data)
+    if codec == "zstd":
+        return zstandard.ZstdCompressor().compress(data)
+    return zlib.compress(data)
+
+
+def _decompress(codec: str, data: bytes) -> bytes:
+    """按指定算法解压一帧数据"""
+    if codec == "lz4":
+        if lz4_frame is None:
+            raise RuntimeError("存档使用 lz4 压缩，请先安装: pip install lz4")
+        return lz4_frame.decompress(data)
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("存档使用 zstd 压缩，请先安装: pip install zstandard")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return zlib.decompress(data)
+
+
+class ChunkArchiveWriter:
+    """区块前像存档写入器"""
+
+    def __init__(self, path: str, codec: Optional[str] = None, chunks_per_frame: int = 64):
+        """
+        创建存档文件
+
+        Args:
+            path (str): 存档文件路径
+            codec (str): 压缩算法 lz4 / zstd / zlib，默认自动选择
+            chunks_per_frame (int): 每个压缩帧包含的区块数量
+        """
+        self.path = path
+        self.codec = codec or _default_codec()
+        if self.codec == "lz4" and lz4_frame is None:
+            raise RuntimeError("未安装 lz4，请先安装: pip install lz4")
+        if self.codec == "zstd" and zstandard is None:
+            raise RuntimeError("未安装 zstandard，请先安装: pip install zstandard")
+        self.chunks_per_frame = chunks_per_frame
+
+        self._file = open(path, "wb")
+        codec_name = self.codec.encode("ascii")
+        self._file.write(MAGIC + struct.pack("<B", len(codec_name)) + codec_name)
+
+        self._index = bytearray()
+        self._frame_buffer = bytearray()
+        self._frame_entries = []
+        self.chunk_count = 0
+        self.record_count = 0
+        self.raw_bytes = 0
+
+    def add_chunk(self, dim_id: int, cx: int, cz: int, records: List[Tuple[bytes, bytes]]):
+        """
+        写入一个区块的全部原始记录
+
+        Args:
+            dim_id (int): 基岩版维度ID
+            cx (int): 区块X坐标
+            cz (int): 区块Z坐标
+            records (list): 原始记录列表 [(key, value), ...]
+        """
+        start = len(self._frame_buffer)
+        for key, value in records:
+            self._frame_buffer += struct.pack(RECORD_HEADER_FORMAT, len(key), len(value))
+            self._frame_buffer += key
+            self._frame_buffer += value
+        length = len(self._frame_buffer) - start
+
+        self._frame_entries.append((dim_id, cx, cz, start, length, len(records)))
+        self.chunk_count += 1
+        self.record_count += len(records)
+        self.raw_bytes += length
+
+        if len(self._frame_entries) >= self.chunks_per_frame:
+            self._flush_frame()
+
+    def _flush_frame(self):
+        """压缩并写出当前帧，同时生成索引项"""
+        if not self._frame_entries:
+            return
+        frame = _compress(self.codec, bytes(self._frame_buffer))
+        frame_offset = self._file.tell()
+        self._file.write(frame)
+
+        for dim_id, cx, cz, start, length, record_count in self._frame_entries:
+            self._index += struct.pack(INDEX_ENTRY_FORMAT, dim_id, cx, cz,
+                                       frame_offset, len(frame), start, length, record_count)
+        self._frame_buffer.clear()
+        self._frame_entries.clear()
+
+    def close(self):
+        """写出剩余数据、坐标索引和文件尾"""
+        if self._file.closed:
+            return
+        self._flush_frame()
+        index_offset = self._file.tell()
+        self._file.write(self._index)
+        self._file.write(struct.pack(FOOTER_FORMAT, index_offset, self.chunk_count, MAGIC))
+        self._file.close()
+
+    @property
+    def archive_bytes(self) -> int:
+        """已写入的存档字节数"""
+        if self._file.closed:
+            return os.path.getsize(self.path)
+        return self._file.tell()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class ChunkArchiveReader:
+    """区块前像存档读取器"""
+
+    def __init__(self, path: str):
+        """
+        打开存档文件并读取坐标索引
+
+        Args:
+            path (str): 存档文件路径
+        """
+        self.path = path
+        with open(path, "rb") as f:
+            header = f.read(len(MAGIC) + 1)
+            if header[:len(MAGIC)] != MAGIC:
+                raise ValueError(f"不是有效的区块存档文件: {path}")
+            self.codec = f.read(header[-1]).decode("ascii")
+
+            f.seek(-FOOTER_SIZE, os.SEEK_END)
+            index_offset, chunk_count, magic = struct.unpack(FOOTER_FORMAT, f.read(FOOTER_SIZE))
+            if magic != MAGIC:
+                raise ValueError(f"存档文件不完整（缺少索引）: {path}")
+
+            f.seek(index_offset)
+            index_data = f.read(chunk_count * INDEX_ENTRY_SIZE)
+
+        self.entries = [
+            struct.unpack_from(INDEX_ENTRY_FORMAT, index_data, i * INDEX_ENTRY_SIZE)
+            for i in range(chunk_count)
+        ]
+
+    def select(self, dimension: Optional[str] = None,
+               region: Optional[Tuple[int, int, int, int]] = None) -> List[tuple]:
+        """
+        按维度和区块范围筛选索引项
+
+        Args:
+            dimension (str): Minecraft维度名称，None表示全部维度
+            region (tuple): 区块范围 (min_cx, min_cz, max_cx, max_cz)，包含端点，None表示全部
+
+        Returns:
+            list: 符合条件的索引项
+        """
+        dim_id = DIMENSION_IDS[dimension] if dimension else None
+        selected = []
+        for entry in self.entries:
+            entry_dim, cx, cz = entry[0], entry[1], entry[2]
+            if dim_id is not None and entry_dim != dim_id:
+                continue
+            if region is not None:
+                min_cx, min_cz, max_cx, max_cz = region
+                if not (min_cx <= cx <= max_cx and min_cz <= cz <= max_cz):
+                    continue
+            selected.append(entry)
+        return selected
+
+    def iter_chunks(self, dimension: Optional[str] = None,
+                    region: Optional[Tuple[int, int, int, int]] = None
+                    ) -> Iterator[Tuple[int, int, int, List[Tuple[bytes, bytes]]]]:
+        """
+        读取符合条件的区块记录，每个压缩帧最多解压一次
+
+        Yields:
+            tuple: (dim_id, cx, cz, [(key, value), ...])
+        """
+        selected = self.select(dimension, region)
+        # 按帧偏移排序，顺序读取文件
+        selected.sort(key=lambda entry: (entry[3], entry[5]))
+
+        with open(self.path, "rb") as f:
+            current_offset = None
+            frame = b""
+            for dim_id, cx, cz, frame_offset, frame_length, start, length, record_count in selected:
+                if frame_offset != current_offset:
+                    f.seek(frame_offset)
+                    frame = _decompress(self.codec, f.read(frame_length))
+                    current_offset = frame_offset
+
+                records = []
+                position = start
+                for _ in range(record_count):
+                    key_length, value_length = struct.unpack_from(RECORD_HEADER_FORMAT, frame, position)
+                    position += RECORD_HEADER_SIZE
+                    key = frame[position:position + key_length]
+                    position += key_length
+                    records.append((key, frame[position:position + value_length]))
+                    position += value_length
+                yield dim_id, cx, cz, records
+
+
+def archive_chunk(writer: ChunkArchiveWriter, db, cx: int, cz: int, dim_id: int) -> int:
+    """
+    把一个区块（含实体数据）的原始记录写入存档
+
+    Returns:
+        int: 写入的记录数量
+    """
+    records = list(iter_chunk_records(db, cx, cz, dim_id))
+    writer.add_chunk(dim_id, cx, cz, records)
+    return len(records)
+
+
+def restore_archive(db, archive_path: str, dimension: Optional[str] = None,
+                    region: Optional[Tuple[int, int, int, int]] = None,
+                    progress_callback=None) -> Dict[str, Any]:
+    """
+    把存档中的区块写回数据库
+
+    恢复前会先删除该区块当前存在的记录（例如服务器在重置后重新生成的区块），
+    避免新旧记录混合。
+
+    Args:
+        db: LevelDB 数据库对象
+        archive_path (str): 存档文件路径
+        dimension (str): 只恢复指定维度，None表示全部
+        region (tuple): 只恢复指定区块范围 (min_cx, min_cz, max_cx, max_cz)，None表示全部
+        progress_callback: 可选的进度回调函数，格式为 callback(current, total, message)
+
+    Returns:
+        dict: 恢复统计信息
+    """
+    reader = ChunkArchiveReader(archive_path)
+    total = len(reader.select(dimension, region))
+    stats = {
+        'archived_chunks': len(reader.entries),
+        'restored_chunks': 0,
+        'restored_records': 0,
+        'restored_bytes': 0,
+        'errors': 0
+    }
+
+    print(f"开始从存档恢复区块: {archive_path}")
+    print(f"存档区块总数: {stats['archived_chunks']}，本次恢复: {total}")
+    print("-" * 50)
+
+    for dim_id, cx, cz, records in reader.iter_chunks(dimension, region):
+        try:
+            # 清除区块当前的记录（不含实体，实体记录按ID恢复覆盖）
+            for key, _ in list(iter_chunk_records(db, cx, cz, dim_id, include_actors=False)):
+                db.delete(key)
+            db.delete(digp_key(cx, cz, dim_id))
+
+            db.putBatch(dict(records))
+            stats['restored_chunks'] += 1
+            stats['restored_records'] += len(records)
+            stats['restored_bytes'] += sum(len(key) + len(value) for key, value in records)
+        except Exception as e:
+            stats['errors'] += 1
+            print(f"恢复区块 ({cx}, {cz}) [{DIMENSION_NAMES.get(dim_id, dim_id)}] 时发生错误: {e}")
+            continue
+
+        if progress_callback and stats['restored_chunks'] % 100 == 0:
+            progress_callback(stats['restored_chunks'], total,
+                              f"恢复区块 {stats['restored_chunks']}/{total}")
+
+    print("-" * 50)
+    print("恢复完成统计:")
+    print(f"恢复的区块数量: {stats['restored_chunks']}")
+    print(f"恢复的记录数量: {stats['restored_records']}")
+    print(f"恢复的数据量: {stats['restored_bytes'] / 1024 / 1024:.2f} MB")
+    print(f"错误数量: {stats['errors']}")
+    return stats
+
+
+def restore_world_archive(world_path: str, archive_path: str, dimension: Optional[str] = None,
+                          region: Optional[Tuple[int, int, int, int]] = None,
+                          progress_callback=None) -> Optional[Dict[str, Any]]:
+    """
+    打开一个未被占用的世界并从存档恢复区块
+
+    Args:
+        world_path (str): Minecraft世界路径（包含 db 目录）
+        archive_path (str): 存档文件路径
+        dimension (str): 只恢复指定维度
+        region (tuple): 只恢复指定区块范围 (min_cx, min_cz, max_cx, max_cz)
+        progress_callback: 可选的进度回调函数
+
+    Returns:
+        Optional[dict]: 恢复统计信息，失败时返回 None
+    """
+    from leveldb import LevelDB
+
+    db_dir = os.path.join(world_path, "db")
+    try:
+        db = LevelDB(db_dir)
+    except Exception as e:
+        print(f"打开数据库失败（请确认服务器已关闭）: {e}")
+        return None
+
+    try:
+        return restore_archive(db, archive_path, dimension, region, progress_callback)
+    finally:
+        db.close()
+
+
+def main():
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="区块前像存档工具")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    restore_parser = subparsers.add_parser("restore", help="从存档恢复区块")
+    restore_parser.add_argument("world", help="Minecraft世界路径")
+    restore_parser.add_argument("archive", help="存档文件路径")
+    restore_parser.add_argument("--dimension", choices=sorted(DIMENSION_IDS), help="只恢复指定维度")
+    restore_parser.add_argument("--region", type=int, nargs=4, metavar=("MIN_CX", "MIN_CZ", "MAX_CX", "MAX_CZ"),
+                                help="只恢复指定区块范围（包含端点）")
+
+    list_parser = subparsers.add_parser("list", help="查看存档内容")
+    list_parser.add_argument("archive", help="存档文件路径")
+
+    args = parser.parse_args()
+
+    if args.command == "restore":
+        restore_world_archive(args.world, args.archive, args.dimension,
+                              tuple(args.region) if args.region else None)
+    elif args.command == "list":
+        reader = ChunkArchiveReader(args.archive)
+        counts = {}
+        for entry in reader.entries:
+            counts[entry[0]] = counts.get(entry[0], 0) + 1
+        print(f"存档: {args.archive} (压缩算法: {reader.codec}, 大小: "
+              f"{os.path.getsize(args.archive) / 1024 / 1024:.2f} MB)")
+        for dim_id, count in sorted(counts.items()):
+            print(f"  {DIMENSION_NAMES.get(dim_id, dim_id)}: {count} 个区块")
+
+
+if __name__ == "__main__":
+    main()
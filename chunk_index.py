@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+区块索引：一次顺序遍历数据库，得到每个维度所有区块的坐标、存储字节数和版本号
+
+索引以按坐标升序的 numpy 数组保存（区块键见 protection_snapshot.pack_coord），
+可以对整个维度做向量化计算（预览、保护距离扫描），也可以二分查找单个区块。
+常驻守护进程和保护距离扫描共用；区块到领地距离的计算（land_distances）也由滚动重置共用。
+
+Author: DEVILENMO
+"""
+
+from array import array
+from typing import Callable, Dict, List, Optional, Tuple
+
+from bedrock_keys import VERSION_TAGS, parse_chunk_key, version_bounds
+from protection_snapshot import pack_coord, pack_coords, unpack_coords
+
+
+class ChunkIndex:
+    """一个维度中所有区块的坐标、存储字节数和版本号（按坐标升序的 numpy 数组）"""
+
+    def __init__(self, keys: array, sizes: array, versions: array):
+        """
+        Args:
+            keys (array): 区块键（见 protection_snapshot.pack_coord），顺序任意
+            sizes (array): 与 keys 对应的区块记录字节数
+            versions (array): 与 keys 对应的版本号，未知为 -1
+        """
+        import numpy as np
+
+        keys = np.frombuffer(keys, dtype=np.uint64) if len(keys) else np.zeros(0, dtype=np.uint64)
+        order = np.argsort(keys, kind="stable")
+        self.keys = keys[order]
+        self.sizes = (np.frombuffer(sizes, dtype=np.int64) if len(sizes) else np.zeros(0, dtype=np.int64))[order]
+        self.versions = (np.frombuffer(versions, dtype=np.int16) if len(versions)
+                         else np.zeros(0, dtype=np.int16))[order]
+        self.cx, self.cz = unpack_coords(self.keys)
+
+    @classmethod
+    def empty(cls) -> "ChunkIndex":
+        """没有任何区块的索引"""
+        return cls(array('Q'), array('q'), array('h'))
+
+    def __len__(self):
+        return len(self.keys)
+
+    def find(self, cx: int, cz: int) -> int:
+        """区块在索引中的位置，不存在时返回 -1"""
+        import numpy as np
+
+        key = np.uint64(pack_coord(cx, cz))
+        index = int(np.searchsorted(self.keys, key))
+        return index if index < len(self.keys) and self.keys[index] == key else -1
+
+
+def build_chunk_index(db, dim_id: Optional[int] = None, search_range: Optional[int] = None,
+                      progress_callback: Optional[Callable[[int, int, str], None]] = None) -> Dict[int, ChunkIndex]:
+    """
+    一次顺序遍历数据库，构建区块索引
+
+    同一区块的记录在键顺序上相邻，遍历时累加当前区块的字节数，遇到新区块时换到下一项。
+    与 iter_chunk_coords 一致，只有带版本记录的区块才算存在。
+
+    Args:
+        db: LevelDB 数据库对象
+        dim_id (int): 只索引这个维度，None 表示所有维度
+        search_range (int): 只索引 -search_range 到 search_range 范围内的区块，None 表示不限制
+        progress_callback: 可选的进度回调函数，格式为 callback(current, total, message)，total 为 0
+
+    Returns:
+        dict: {维度ID: ChunkIndex}
+    """
+    columns = {}
+    current = None
+    entry = None
+    records = 0
+    for key, value in db.iterate():
+        parsed = parse_chunk_key(key)
+        if parsed is None:
+            continue
+        records += 1
+        if progress_callback and records % 100000 == 0:
+            progress_callback(records, 0, f"构建区块索引: 已读取 {records} 条区块记录")
+        cx, cz, chunk_dim, tag = parsed[0], parsed[1], parsed[2], parsed[3]
+        if dim_id is not None and chunk_dim != dim_id:
+            continue
+        if search_range is not None and (abs(cx) > search_range or abs(cz) > search_range):
+            continue
+        if (chunk_dim, cx, cz) != current:
+            current = (chunk_dim, cx, cz)
+            entry = columns.setdefault(chunk_dim, (array('Q'), array('q'), array('h'), array('b')))
+            entry[0].append(pack_coord(cx, cz))
+            entry[1].append(0)
+            entry[2].append(-1)
+            entry[3].append(0)
+        entry[1][-1] += len(key) + len(value)
+        if tag in VERSION_TAGS:
+            entry[3][-1] = 1
+            if entry[2][-1] < 0 and value:
+                entry[2][-1] = value[0]
+
+    index = {}
+    for chunk_dim, (keys, sizes, versions, has_version) in columns.items():
+        # 没有版本记录的残留记录不算作存在的区块
+        if not all(has_version):
+            kept = [position for position, flag in enumerate(has_version) if flag]
+            keys = array('Q', (keys[position] for position in kept))
+            sizes = array('q', (sizes[position] for position in kept))
+            versions = array('h', (versions[position] for position in kept))
+        index[chunk_dim] = ChunkIndex(keys, sizes, versions)
+    return index
+
+
+def version_mask(versions, version_range):
+    """
+    版本号数组中在版本范围内的位置（bedrock_keys.version_in_range 的向量化形式，规则见 version_bounds）
+
+    Args:
+        versions: 版本号的 numpy 数组，未知为 -1
+        version_range (tuple): (最小版本, 最大版本)，包含端点，None 表示不限；整个参数为 None 时全部在范围内
+
+    Returns:
+        numpy.ndarray: 布尔数组；范围有任一端点时，未知版本视为不在范围内
+    """
+    low, high = version_bounds(version_range)
+    return (versions >= low) & (versions <= high)
+
+
+def land_distances(cx, cz, rects: List[Tuple[int, int, int, int, int]], max_distance: Optional[int] = None):
+    """
+    计算每个区块到最近领地的切比雪夫距离（以区块为单位）
+
+    与保护模型逐圈扩展的规则相同：额外保护距离为 m 时，距离不超过 m 的区块受保护。
+    区块按 (cx, cz) 排序后，每个领地外扩范围内的每一列是键数组中连续的一段，
+    因此每个领地只访问其外扩范围内的区块。
+
+    Args:
+        cx, cz: 区块坐标的 numpy 数组（int64），顺序任意
+        rects (list): 领地区块矩形 [(land_id, start_cx, start_cz, end_cx, end_cz), ...]
+        max_distance (int): 只计算到这个距离，更远的区块距离记为 max_distance + 1；
+                            None 表示计算准确距离（每个领地的外扩范围覆盖所有区块）
+
+    Returns:
+        numpy.ndarray: 与 cx, cz 对应的距离（int64），领地范围内为 0；
+                       不限制距离且没有领地时全部为 0
+    """
+    import numpy as np
+
+    cx = np.asarray(cx, dtype=np.int64)
+    cz = np.asarray(cz, dtype=np.int64)
+    if max_distance is None and not rects:
+        return np.zeros(len(cx), dtype=np.int64)
+    fill = np.iinfo(np.int64).max if max_distance is None else max_distance + 1
+    distances = np.full(len(cx), fill, dtype=np.int64)
+    if not len(cx):
+        return distances
+
+    keys = pack_coords(cx, cz)
+    order = np.argsort(keys, kind="stable")
+    keys, xs, zs = keys[order], cx[order], cz[order]
+    min_x, max_x, min_z, max_z = int(xs[0]), int(xs[-1]), int(zs.min()), int(zs.max())
+    sorted_distances = np.full(len(keys), fill, dtype=np.int64)
+    for _, start_cx, start_cz, end_cx, end_cz in rects:
+        reach = max_distance
+        if reach is None:
+            reach = max(start_cx - min_x, max_x - end_cx, start_cz - min_z, max_z - end_cz, 0)
+        first_column, last_column = max(start_cx - reach, min_x), min(end_cx + reach, max_x)
+        if first_column > last_column:
+            continue
+        if (first_column == min_x and last_column == max_x
+                and start_cz - reach <= min_z and end_cz + reach >= max_z):
+            # 外扩范围覆盖所有区块（不限制距离时总是如此），直接对整个数组计算
+            dx = np.maximum(np.maximum(start_cx - xs, xs - end_cx), 0)
+            dz = np.maximum(np.maximum(start_cz - zs, zs - end_cz), 0)
+            np.minimum(sorted_distances, np.maximum(dx, dz), out=sorted_distances)
+            continue
+        columns = np.arange(first_column, last_column + 1, dtype=np.int64)
+        starts = np.searchsorted(keys, pack_coords(columns, np.full(len(columns), start_cz - reach)), "left")
+        ends = np.searchsorted(keys, pack_coords(columns, np.full(len(columns), end_cz + reach)), "right")
+        lengths = ends - starts
+        used = lengths > 0
+        if not used.any():
+            continue
+        starts, lengths = starts[used], lengths[used]
+        offsets = np.repeat(starts - np.concatenate(([0], np.cumsum(lengths)[:-1])), lengths)
+        positions = offsets + np.arange(lengths.sum())
+
+        dx = np.maximum(np.maximum(start_cx - xs[positions], xs[positions] - end_cx), 0)
+        dz = np.maximum(np.maximum(start_cz - zs[positions], zs[positions] - end_cz), 0)
+        sorted_distances[positions] = np.minimum(sorted_distances[positions], np.maximum(dx, dz))
+    distances[order] = sorted_distances
+    return distances
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+区块决策列表流式导出
+
+在预览或执行重置时，把每个区块的处理决策（坐标、维度、保留/重置、原因、存储大小）
+边扫描边写入文件，内存占用与世界大小无关。支持三种格式：
+    .csv    表格，便于用 Excel 等工具审阅
+    .jsonl  每行一个 JSON 对象，便于脚本处理
+    .bin    紧凑二进制，每条记录固定 23 字节
+
+二进制格式：
+    文件头: MAGIC(8)
+    记录:   cx(i32) cz(i32) dim(i8) 决策(u8) 原因(u8) 领地ID(i64) 存储字节数(u32)，
+            领地ID为 -1 表示与领地无关
+
+Author: DEVILENMO
+"""
+
+import csv
+import json
+import os
+import struct
+from typing import Iterator, NamedTuple, Optional, Dict, Any
+
+from bedrock_keys import DIMENSION_IDS, DIMENSION_NAMES
+
+MAGIC = b"CRDEC01\n"
+RECORD_FORMAT = "<iibBBqI"
+RECORD_SIZE = struct.calcsize(RECORD_FORMAT)
+
+# 决策类型
+DECISION_PRESERVE = "preserve"
+DECISION_RESET = "reset"
+DECISION_ERROR = "error"
+
+# 决策原因
+REASON_LAND = "land"                  # 位于领地范围内
+REASON_MARGIN = "margin"              # 位于领地的额外保护距离内
+REASON_PRESERVE_LIST = "preserve_list"  # 位于手动指定的保留列表中
+REASON_UNPROTECTED = "unprotected"    # 不受任何保护
+REASON_LOAD_ERROR = "load_error"      # 区块加载失败
+REASON_DELETE_ERROR = "delete_error"  # 区块删除失败
+REASON_VERSION_FILTER = "version_filter"  # 区块版本不在要重置的版本范围内
+
+DECISION_CODES = {DECISION_PRESERVE: 0, DECISION_RESET: 1, DECISION_ERROR: 2}
+REASON_CODES = {
+    REASON_LAND: 0,
+    REASON_MARGIN: 1,
+    REASON_PRESERVE_LIST: 2,
+    REASON_UNPROTECTED: 3,
+    REASON_LOAD_ERROR: 4,
+    REASON_DELETE_ERROR: 5,
+    REASON_VERSION_FILTER: 6,
+}
+DECISION_NAMES = {code: name for name, code in DECISION_CODES.items()}
+REASON_NAMES = {code: name for name, code in REASON_CODES.items()}
+
+FIELDS = ("cx", "cz", "dimension", "decision", "reason", "land_id", "stored_bytes")
+FORMATS = ("csv", "jsonl", "bin")
+
+
+class ChunkDecision(NamedTuple):
+    """一个区块的处理决策，字段与导出格式相同，可直接 DecisionWriter.write(*decision)"""
+    cx: int
+    cz: int
+    dimension: str
+    decision: str
+    reason: str
+    land_id: Optional[int] = None
+    stored_bytes: Optional[int] = None
+
+
+def detect_format(path: str) -> str:
+    """根据文件扩展名判断导出格式，无法识别时使用 csv"""
+    extension = os.path.splitext(path)[1].lower().lstrip(".")
+    if extension in ("jsonl", "json", "ndjson"):
+        return "jsonl"
+    if extension in ("bin", "dat"):
+        return "bin"
+    return "csv"
+
+
+class DecisionWriter:
+    """区块决策流式写入器"""
+
+    def __init__(self, path: str, export_format: Optional[str] = None):
+        """
+        创建导出文件
+
+        Args:
+            path (str): 导出文件路径
+            export_format (str): csv / jsonl / bin，默认按扩展名判断
+        """
+        self.path = path
+        self.format = export_format or detect_format(path)
+        if self.format not in FORMATS:
+            raise ValueError(f"不支持的导出格式: {self.format}")
+        self.count = 0
+
+        if self.format == "bin":
+            self._file = open(path, "wb")
+            self._file.write(MAGIC)
+        else:
+            self._file = open(path, "w", encoding="utf-8", newline="")
+            if self.format == "csv":
+                self._csv = csv.writer(self._file)
+                self._csv.writerow(FIELDS)
+
+    def write(self, cx: int, cz: int, dimension: str, decision: str, reason: str,
+              land_id: Optional[int] = None, stored_bytes: int = 0):
+        """
+        写入一条决策记录
+
+        Args:
+            cx (int): 区块X坐标
+            cz (int): 区块Z坐标
+            dimension (str): Minecraft维度名称
+            decision (str): preserve / reset / error
+            reason (str): land / margin / preserve_list / unprotected / load_error / delete_error /
+                          version_filter
+            land_id (int): 相关的领地ID，没有时为 None
+            stored_bytes (int): 区块在数据库中占用的字节数
+        """
+        if self.format == "bin":
+            self._file.write(struct.pack(
+                RECORD_FORMAT, cx, cz, DIMENSION_IDS.get(dimension, -1),
+                DECISION_CODES[decision], REASON_CODES[reason],
+                -1 if land_id is None else land_id, stored_bytes
+            ))
+        elif self.format == "jsonl":
+            self._file.write(json.dumps({
+                "cx": cx, "cz": cz, "dimension": dimension, "decision": decision,
+                "reason": reason, "land_id": land_id, "stored_bytes": stored_bytes
+            }, ensure_ascii=False))
+            self._file.write("\n")
+        else:
+            self._csv.writerow((cx, cz, dimension, decision, reason,
+                                "" if land_id is None else land_id, stored_bytes))
+        self.count += 1
+
+    def close(self):
+        """关闭导出文件"""
+        if not self._file.closed:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def read_binary_decisions(path: str) -> Iterator[Dict[str, Any]]:
+    """
+    流式读取二进制格式的决策文件
+
+    Yields:
+        dict: 与 jsonl 格式字段相同的决策记录
+    """
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"不是有效的决策导出文件: {path}")
+        while True:
+            data = f.read(RECORD_SIZE)
+            if len(data) < RECORD_SIZE:
+                break
+            cx, cz, dim_id, decision, reason, land_id, stored_bytes = struct.unpack(RECORD_FORMAT, data)
+            yield {
+                "cx": cx, "cz": cz, "dimension": DIMENSION_NAMES.get(dim_id, str(dim_id)),
+                "decision": DECISION_NAMES[decision], "reason": REASON_NAMES[reason],
+                "land_id": None if land_id == -1 else land_id, "stored_bytes": stored_bytes
+            }
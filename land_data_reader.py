@@ -30,6 +30,10 @@ from typing import List, Dict, Optional, Any
 from pathlib import Path
 
 
+class LandDataError(Exception):
+    """读取领地数据失败（数据库被锁定、表不存在等）"""
+
+
 class LandDataReader:
     """领地数据读取器"""
     
@@ -75,6 +79,23 @@ class LandDataReader:
             print(f"查询数据库时发生错误: {str(e)}")
             return []
     
+    def _execute_query_strict(self, sql: str, params: tuple = ()) -> List[Dict[str, Any]]:
+        """
+        执行查询SQL语句，失败时抛出异常而不是返回空结果
+
+        用于保护范围的计算：把查询失败当作“没有领地”会让所有领地的保护被移除。
+
+        Raises:
+            LandDataError: 查询失败
+        """
+        try:
+            with self._get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(sql, params)
+                return [dict(row) for row in cursor.fetchall()]
+        except sqlite3.Error as e:
+            raise LandDataError(f"查询领地数据库失败: {e}") from e
+    
     def _execute_query_one(self, sql: str, params: tuple = ()) -> Optional[Dict[str, Any]]:
         """
         执行查询SQL语句并返回单条记录
@@ -249,6 +270,89 @@ class LandDataReader:
             print(f"获取统计信息时发生错误: {str(e)}")
             return {}
     
+    def get_data_version(self) -> tuple:
+        """
+        获取领地数据的版本标识
+
+        由数据库文件（以及 SQLite 的 WAL 文件）的修改时间和大小组成，
+        领地数据发生变化时版本标识随之改变，可用作缓存的失效依据。
+
+        Returns:
+            tuple: 版本标识
+        """
+        version = []
+        for path in (self.db_path, self.db_path + "-wal"):
+            try:
+                stat = Path(path).stat()
+                version.append((stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                version.append(None)
+        return tuple(version)
+    
+    def get_land_snapshot(self) -> Dict[int, tuple]:
+        """
+        获取领地表的轻量快照，用于检测领地变化
+
+        只读取影响保护范围的字段。land_id 是 INTEGER PRIMARY KEY（即 SQLite 的 rowid），
+        可以直接用于比较新增和删除的领地。
+
+        Returns:
+            Dict[int, tuple]: {land_id: (dimension, min_x, min_z, max_x, max_z)}
+
+        Raises:
+            LandDataError: 查询失败（不会返回空快照）
+        """
+        results = self._execute_query_strict("SELECT land_id, dimension, min_x, min_z, max_x, max_z FROM lands")
+        return {
+            row['land_id']: (row['dimension'], row['min_x'], row['min_z'], row['max_x'], row['max_z'])
+            for row in results
+        }
+    
+    def get_lands_by_ids(self, land_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        """
+        读取多个领地的完整信息
+
+        Args:
+            land_ids (List[int]): 领地ID列表
+
+        Returns:
+            Dict[int, Dict[str, Any]]: {land_id: 领地信息}，不存在的领地不在结果中
+
+        Raises:
+            LandDataError: 查询失败
+        """
+        lands = {}
+        land_ids = list(land_ids)
+        # SQLite 默认最多 999 个参数，分批查询
+        for start in range(0, len(land_ids), 500):
+            chunk = land_ids[start:start + 500]
+            rows = self._execute_query_strict(
+                f"SELECT * FROM lands WHERE land_id IN ({', '.join('?' * len(chunk))})", tuple(chunk))
+            for row in rows:
+                lands[row['land_id']] = self._process_land_data(row)
+        return lands
+    
+    @staticmethod
+    def diff_land_snapshots(old_snapshot: Dict[int, tuple], new_snapshot: Dict[int, tuple]) -> Dict[str, List[int]]:
+        """
+        比较两个领地快照
+
+        Args:
+            old_snapshot (Dict[int, tuple]): 旧快照
+            new_snapshot (Dict[int, tuple]): 新快照
+
+        Returns:
+            Dict[str, List[int]]: {'added': [...], 'removed': [...], 'changed': [...]}，值为领地ID列表
+        """
+        return {
+            'added': sorted(land_id for land_id in new_snapshot if land_id not in old_snapshot),
+            'removed': sorted(land_id for land_id in old_snapshot if land_id not in new_snapshot),
+            'changed': sorted(
+                land_id for land_id, row in new_snapshot.items()
+                if land_id in old_snapshot and old_snapshot[land_id] != row
+            )
+        }
+    
     def _process_land_data(self, land_data: Dict[str, Any]) -> Dict[str, Any]:
         """
         处理原始领地数据，进行格式化和解析
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+额外保护距离扫描：一次计算所有额外保护距离下的重置结果
+
+调整额外保护距离时，原来需要对每个取值各做一次完整预览。本模块一次顺序遍历数据库建立区块索引，
+再计算每个区块到最近领地的切比雪夫距离（与保护模型逐圈扩展的规则相同：额外保护距离为 m 时，
+距离不超过 m 的区块受保护）。距离只需计算到最大额外保护距离，每个领地只访问其外扩范围内的区块。
+之后按距离和搜索范围分组累加，得到每个额外保护距离（0 到 N）、每个搜索范围下将被重置的区块数量和字节数，
+GUI 中以曲线显示。
+
+区块字节数为区块自身记录的大小（不含 digp 引用的实体记录）。
+
+使用方法：
+    python margin_sweep.py path/to/world --land-db plugins/ARCCore/database.db --range 1000 2000 3000 --max-margin 16
+
+Author: DEVILENMO
+"""
+
+import argparse
+import json
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from bedrock_keys import DIMENSION_IDS
+from chunk_index import ChunkIndex, build_chunk_index, land_distances, version_mask
+
+# 默认扫描的最大额外保护距离
+DEFAULT_MAX_MARGIN = 16
+
+
+def sweep_margins(index: ChunkIndex, rects: List[Tuple[int, int, int, int, int]], search_ranges: Iterable[int],
+                  max_margin: int = DEFAULT_MAX_MARGIN,
+                  version_range: Optional[Tuple[Optional[int], Optional[int]]] = None,
+                  dimension: Optional[str] = None) -> Dict[str, Any]:
+    """
+    计算每个搜索范围、每个额外保护距离（0 到 max_margin）下的重置结果
+
+    Args:
+        index (ChunkIndex): 维度的区块索引（至少覆盖最大的搜索范围）
+        rects (list): 领地区块矩形 [(land_id, start_cx, start_cz, end_cx, end_cz), ...]
+        search_ranges (iterable): 搜索范围（区块）
+        max_margin (int): 最大额外保护距离
+        version_range (tuple): 可选的区块版本范围，版本不在范围内的区块始终保留
+        dimension (str): 维度名称，只写入结果
+
+    Returns:
+        dict: {'dimension', 'margins', 'search_ranges', 'version_range', 'found_chunks', 'found_bytes',
+               'land_chunks', 'reset_chunks', 'reset_bytes', 'elapsed_seconds'}，
+              found_chunks / found_bytes / land_chunks 每个搜索范围一个值，
+              reset_chunks / reset_bytes 为 [搜索范围][额外保护距离] 的二维列表
+    """
+    import numpy as np
+
+    start = time.perf_counter()
+    search_ranges = sorted(set(search_ranges))
+    if not search_ranges:
+        raise ValueError("至少需要一个搜索范围")
+    max_margin = max(0, max_margin)
+    bins = max_margin + 2
+
+    distances = land_distances(index.cx, index.cz, rects, max_margin)
+    ring = np.maximum(np.abs(index.cx), np.abs(index.cz))
+    in_range = ring <= search_ranges[-1]
+    distances, ring = distances[in_range], ring[in_range]
+    sizes = index.sizes[in_range]
+    resettable = version_mask(index.versions[in_range], version_range)
+
+    # 每个区块归入包含它的最小搜索范围，按 (搜索范围, 距离) 分组后沿搜索范围累加
+    slots = np.searchsorted(np.array(search_ranges, dtype=np.int64), ring, "left") * bins + distances
+    shape = (len(search_ranges), bins)
+    length = shape[0] * bins
+    counts = np.bincount(slots, minlength=length).reshape(shape).cumsum(axis=0)
+    byte_counts = np.bincount(slots, weights=sizes, minlength=length).reshape(shape).cumsum(axis=0)
+    reset_counts = np.bincount(slots[resettable], minlength=length).reshape(shape).cumsum(axis=0)
+    reset_byte_counts = np.bincount(slots[resettable], weights=sizes[resettable],
+                                    minlength=length).reshape(shape).cumsum(axis=0)
+
+    # 额外保护距离为 m 时，距离大于 m 的区块被重置
+    reset_chunks = reset_counts[:, ::-1].cumsum(axis=1)[:, ::-1][:, 1:]
+    reset_bytes = reset_byte_counts[:, ::-1].cumsum(axis=1)[:, ::-1][:, 1:]
+    return {
+        'dimension': dimension,
+        'margins': list(range(max_margin + 1)),
+        'search_ranges': search_ranges,
+        'version_range': list(version_range) if version_range is not None else None,
+        'found_chunks': counts.sum(axis=1).astype(int).tolist(),
+        'found_bytes': byte_counts.sum(axis=1).astype(int).tolist(),
+        'land_chunks': counts[:, 0].astype(int).tolist(),
+        'reset_chunks': reset_chunks.astype(int).tolist(),
+        'reset_bytes': reset_bytes.astype(int).tolist(),
+        'elapsed_seconds': round(time.perf_counter() - start, 3),
+    }
+
+
+def print_sweep(sweep: Dict[str, Any]):
+    """以表格打印扫描结果（每行一个额外保护距离，每列一个搜索范围）"""
+    mb = 1024 * 1024
+    print(f"额外保护距离扫描 ({sweep['dimension']}, 耗时 {sweep['elapsed_seconds']:.2f} 秒):")
+    for column, search_range in enumerate(sweep['search_ranges']):
+        print(f"  ±{search_range}: 共 {sweep['found_chunks'][column]} 个区块, "
+              f"{sweep['found_bytes'][column] / mb:.2f} MB, 领地内 {sweep['land_chunks'][column]} 个")
+    print("  距离  " + "".join(f"{f'±{search_range}':>24}" for search_range in sweep['search_ranges']))
+    for margin in sweep['margins']:
+        cells = "".join(f"{chunks:>10} / {size / mb:>8.2f} MB"
+                        for chunks, size in zip((row[margin] for row in sweep['reset_chunks']),
+                                                (row[margin] for row in sweep['reset_bytes'])))
+        print(f"  {margin:>4}  {cells}")
+
+
+def save_sweep(sweep: Dict[str, Any], path: str):
+    """把扫描结果保存为 JSON"""
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(sweep, f, ensure_ascii=False, indent=2)
+
+
+def main():
+    """命令行入口"""
+    from leveldb import LevelDB
+    from land_data_reader import LandDataReader
+    from protection_model import ProtectionModel
+    from world_compaction import get_db_directory
+
+    parser = argparse.ArgumentParser(description="额外保护距离扫描")
+    parser.add_argument("world", help="Minecraft世界路径（服务器需关闭）")
+    parser.add_argument("--land-db", required=True, help="领地数据库路径")
+    parser.add_argument("--dimension", default="minecraft:overworld", choices=sorted(DIMENSION_IDS))
+    parser.add_argument("--range", type=int, nargs="+", dest="search_ranges", required=True,
+                        help="一个或多个搜索范围（区块）")
+    parser.add_argument("--max-margin", type=int, default=DEFAULT_MAX_MARGIN, help="最大额外保护距离（区块）")
+    parser.add_argument("--min-version", type=int, help="只重置版本不低于此值的区块")
+    parser.add_argument("--max-version", type=int, help="只重置版本不高于此值的区块")
+    parser.add_argument("--json", dest="json_path", help="把扫描结果保存为 JSON")
+    args = parser.parse_args()
+
+    version_range = None
+    if args.min_version is not None or args.max_version is not None:
+        version_range = (args.min_version, args.max_version)
+
+    rects = ProtectionModel(LandDataReader(args.land_db)).get_land_rects(args.dimension)
+    dim_id = DIMENSION_IDS[args.dimension]
+    db = LevelDB(get_db_directory(args.world))
+    try:
+        index = build_chunk_index(db, dim_id, max(args.search_ranges),
+                                  progress_callback=lambda current, total, message: print(message))
+    finally:
+        db.close()
+
+    sweep = sweep_margins(index.get(dim_id) or ChunkIndex.empty(), rects, args.search_ranges,
+                          args.max_margin, version_range, args.dimension)
+    print_sweep(sweep)
+    if args.json_path:
+        save_sweep(sweep, args.json_path)
+        print(f"扫描结果已保存到: {args.json_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+重置各阶段的内存剖析
+
+大范围重置在内存不足时会被系统直接杀死，无法得知是哪个阶段占用了内存。开启剖析后，
+重置引擎在每个阶段结束时（读取领地、构建保护区域、扫描、删除、预保存、保存）记录一个检查点：
+    - 进程当前内存（RSS）和进程内存峰值
+    - tracemalloc 统计的 Python 对象当前占用、本阶段内的峰值，以及占用最多的分配位置
+每个检查点都会立即写入报告文件（JSON），进程被杀死时报告中最后一个检查点之后的阶段即为出问题的阶段。
+
+未开启剖析时引擎不会创建本模块的对象，也不会启动 tracemalloc，没有任何额外开销。
+
+Author: DEVILENMO
+"""
+
+import json
+import os
+import sys
+import time
+import tracemalloc
+from typing import Any, Dict, List, Optional, Tuple
+
+# 阶段名称
+CHECKPOINT_LAND_LOAD = "land_load"
+CHECKPOINT_PROTECTION_BUILD = "protection_build"
+CHECKPOINT_SCAN = "scan"
+CHECKPOINT_DELETE = "delete"
+CHECKPOINT_PRE_SAVE = "pre_save"
+CHECKPOINT_SAVE = "save"
+
+CHECKPOINT_LABELS = {
+    CHECKPOINT_LAND_LOAD: "读取领地",
+    CHECKPOINT_PROTECTION_BUILD: "构建保护区域",
+    CHECKPOINT_SCAN: "扫描区块",
+    CHECKPOINT_DELETE: "删除区块",
+    CHECKPOINT_PRE_SAVE: "预保存",
+    CHECKPOINT_SAVE: "保存世界",
+}
+
+# 每个检查点记录的分配位置数量
+DEFAULT_TOP_ALLOCATIONS = 10
+
+# tracemalloc 为每次分配保存的调用栈深度（越深越慢）
+DEFAULT_TRACE_FRAMES = 1
+
+
+def read_process_memory() -> Tuple[Optional[int], Optional[int]]:
+    """
+    读取当前进程的内存占用
+
+    Returns:
+        tuple: (当前 RSS 字节数, 峰值 RSS 字节数)，平台不支持的项为 None
+    """
+    current = peak = None
+    if sys.platform == "win32":
+        # pywin32 已在 requirements.txt 中
+        try:
+            import win32api
+            import win32process
+            info = win32process.GetProcessMemoryInfo(win32api.GetCurrentProcess())
+            return info['WorkingSetSize'], info['PeakWorkingSetSize']
+        except ImportError:
+            return None, None
+
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # macOS 以字节为单位，Linux 以 KB 为单位
+        peak = peak if sys.platform == "darwin" else peak * 1024
+    except ImportError:
+        pass
+    try:
+        with open("/proc/self/statm", "r") as f:
+            current = int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    return current, peak
+
+
+def _to_mb(value: Optional[int]) -> Optional[float]:
+    return None if value is None else round(value / 1024 / 1024, 1)
+
+
+class MemoryProfiler:
+    """在重置的阶段边界记录内存检查点，并写入报告文件"""
+
+    def __init__(self, report_path: Optional[str] = None, trace_allocations: bool = True,
+                 top_n: int = DEFAULT_TOP_ALLOCATIONS, trace_frames: int = DEFAULT_TRACE_FRAMES):
+        """
+        Args:
+            report_path (str): 报告文件路径（JSON），每个检查点后都会重写；None 表示不写文件
+            trace_allocations (bool): 是否用 tracemalloc 跟踪分配位置（会明显降低速度），
+                                      False 时只记录 RSS
+            top_n (int): 每个检查点记录的分配位置数量
+            trace_frames (int): tracemalloc 保存的调用栈深度
+        """
+        self.report_path = report_path
+        self.trace_allocations = trace_allocations
+        self.top_n = top_n
+        self.trace_frames = trace_frames
+        self.checkpoints: List[Dict[str, Any]] = []
+        self._started_tracing = False
+        self._last_time = None
+
+    def start(self):
+        """开始剖析（启动 tracemalloc），重复调用无影响"""
+        if self.trace_allocations and not tracemalloc.is_tracing():
+            tracemalloc.start(self.trace_frames)
+            self._started_tracing = True
+        if self._last_time is None:
+            self._last_time = time.perf_counter()
+        return self
+
+    def stop(self):
+        """停止剖析，只停止由本对象启动的 tracemalloc"""
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def checkpoint(self, phase: str, **details) -> Dict[str, Any]:
+        """
+        在一个阶段结束时记录检查点
+
+        Args:
+            phase (str): 阶段名称，见 CHECKPOINT_LABELS
+            **details: 附加信息（例如本阶段处理的区块数量），原样写入检查点
+
+        Returns:
+            dict: 检查点 {'phase', 'label', 'time', 'elapsed_seconds', 'rss_mb', 'peak_rss_mb',
+                  'traced_mb', 'traced_peak_mb', 'top_allocations', 'details'}
+        """
+        now = time.perf_counter()
+        rss, peak_rss = read_process_memory()
+        entry = {
+            'phase': phase,
+            'label': CHECKPOINT_LABELS.get(phase, phase),
+            'time': time.strftime("%Y-%m-%d %H:%M:%S"),
+            'elapsed_seconds': round(now - self._last_time, 3) if self._last_time is not None else None,
+            'rss_mb': _to_mb(rss),
+            'peak_rss_mb': _to_mb(peak_rss),
+            'traced_mb': None,
+            'traced_peak_mb': None,
+            'top_allocations': [],
+            'details': details,
+        }
+        if tracemalloc.is_tracing():
+            traced, traced_peak = tracemalloc.get_traced_memory()
+            entry['traced_mb'] = _to_mb(traced)
+            entry['traced_peak_mb'] = _to_mb(traced_peak)
+            entry['top_allocations'] = self._top_allocations()
+            # 下一个检查点的峰值只统计下一个阶段（Python 3.9+）
+            if hasattr(tracemalloc, "reset_peak"):
+                tracemalloc.reset_peak()
+        self._last_time = time.perf_counter()
+        self.checkpoints.append(entry)
+        if self.report_path:
+            self.write_report(self.report_path)
+        return entry
+
+    def _top_allocations(self) -> List[Dict[str, Any]]:
+        """当前占用内存最多的分配位置"""
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<unknown>"),
+        ))
+        allocations = []
+        for stat in snapshot.statistics("lineno")[:self.top_n]:
+            frame = stat.traceback[0]
+            allocations.append({
+                'location': f"{frame.filename}:{frame.lineno}",
+                'size_mb': round(stat.size / 1024 / 1024, 3),
+                'count': stat.count,
+            })
+        return allocations
+
+    def report(self) -> Dict[str, Any]:
+        """
+        返回剖析报告
+
+        Returns:
+            dict: {'trace_allocations', 'max_rss_mb', 'max_phase', 'checkpoints'}，
+                  max_phase 为进程内存峰值首次达到最大值的阶段
+        """
+        max_rss = max_phase = None
+        for entry in self.checkpoints:
+            peak = entry['peak_rss_mb'] if entry['peak_rss_mb'] is not None else entry['rss_mb']
+            if peak is not None and (max_rss is None or peak > max_rss):
+                max_rss, max_phase = peak, entry['phase']
+        return {
+            'trace_allocations': self.trace_allocations,
+            'max_rss_mb': max_rss,
+            'max_phase': max_phase,
+            'checkpoints': [dict(entry) for entry in self.checkpoints],
+        }
+
+    def write_report(self, path: str):
+        """把报告写入 JSON 文件（先写临时文件再替换，进程被杀死时不会留下半个文件）"""
+        temp_path = path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(self.report(), f, ensure_ascii=False, indent=2)
+        os.replace(temp_path, path)
+
+
+def print_memory_report(report: Dict[str, Any], top_n: int = 3):
+    """打印各检查点的内存占用和占用最多的分配位置"""
+    print("内存剖析:")
+    for entry in report['checkpoints']:
+        line = f"  {entry['label']}: RSS {entry['rss_mb']} MB, 峰值 {entry['peak_rss_mb']} MB"
+        if entry['traced_mb'] is not None:
+            line += f", Python 对象 {entry['traced_mb']} MB (阶段峰值 {entry['traced_peak_mb']} MB)"
+        print(line)
+        for allocation in entry['top_allocations'][:top_n]:
+            print(f"      {allocation['size_mb']:.2f} MB  {allocation['count']} 个  {allocation['location']}")
+    if report['max_phase'] is not None:
+        print(f"内存峰值 {report['max_rss_mb']} MB 出现在: "
+              f"{CHECKPOINT_LABELS.get(report['max_phase'], report['max_phase'])}")
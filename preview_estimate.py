@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+基于抽样的快速预览估算
+
+完整预览需要按键顺序扫描搜索范围内的所有区块，范围很大时每调整一次参数都要等待很久。
+快速估算把搜索范围按区域（32×32 区块）边界划分为若干层（分层抽样），层内再按区域划分为
+列段（同一 cx、同一区域内的最多 32 个坐标，记录在数据库中是连续的一段），不放回地随机抽取列段，
+对抽中的列段按键定位存在的区块（见 bedrock_keys.iter_chunk_versions_in_rect），空坐标不消耗读取：
+    - 是否受保护、版本是否在范围内（与完整预览的分类规则相同）
+    - 将被重置的区块占用的存储字节数
+先在每层抽少量列段估计各层的区块密度，再按同一抽样比例为各层补抽，使访问的区块数接近抽样数量。
+最后按各层列段数加权（整群抽样），估算找到、保留、重置的区块数量和可回收的字节数，并给出置信区间。
+抽样数量不少于范围内的区块数时所有列段都会被访问，结果是精确值（区间宽度为 0）。
+
+估算只用于选择参数，确定参数后仍应执行一次完整预览。
+
+使用方法：
+    python preview_estimate.py path/to/world --range 3000 --land-db plugins/ARCCore/database.db --extra 2
+
+Author: DEVILENMO
+"""
+
+import argparse
+import math
+import random
+import time
+from typing import Any, Container, Dict, List, Optional, Tuple
+
+from bedrock_keys import DIMENSION_IDS, iter_chunk_records, iter_chunk_versions_in_rect, version_in_range
+from world_census import REGION_SHIFT, REGION_SIZE
+
+# 默认抽样数量（访问的区块数），普通磁盘上约一秒
+DEFAULT_SAMPLES = 4000
+
+# 每层先抽取的列段数，用于估计各层的区块密度（至少 2 个才能估计方差）
+PILOT_SEGMENTS = 4
+
+# 每个坐标轴方向上的层数
+DEFAULT_STRATA_PER_AXIS = 8
+
+# 置信水平对应的正态分布分位数
+Z_SCORES = {0.8: 1.282, 0.9: 1.645, 0.95: 1.96, 0.99: 2.576}
+
+# 估算的统计量
+ESTIMATE_FIELDS = ("found_chunks", "preserved_chunks", "version_filtered_chunks", "reset_chunks", "reset_bytes")
+
+
+def build_strata(search_range: int, strata_per_axis: int = DEFAULT_STRATA_PER_AXIS) -> List[Tuple[int, int, int, int]]:
+    """
+    把搜索范围按区域边界划分为矩形层
+
+    Args:
+        search_range (int): 搜索范围（区块）
+        strata_per_axis (int): 每个坐标轴方向上最多的层数
+
+    Returns:
+        list: [(min_cx, max_cx, min_cz, max_cz), ...]，包含端点，覆盖整个搜索范围且互不重叠
+    """
+    first_region = -search_range >> REGION_SHIFT
+    last_region = search_range >> REGION_SHIFT
+    regions = last_region - first_region + 1
+    bands = max(1, min(strata_per_axis, regions))
+    edges = []
+    for band in range(bands):
+        start = first_region + regions * band // bands
+        end = first_region + regions * (band + 1) // bands - 1
+        edges.append((max(-search_range, start * REGION_SIZE), min(search_range, (end + 1) * REGION_SIZE - 1)))
+    return [(min_cx, max_cx, min_cz, max_cz) for min_cx, max_cx in edges for min_cz, max_cz in edges]
+
+
+class _LazyShuffle:
+    """按需生成 range(size) 的随机排列（稀疏的 Fisher-Yates），只为取出的元素占用内存"""
+
+    def __init__(self, size: int, rng: random.Random):
+        self.size = size
+        self.taken = 0
+        self._rng = rng
+        self._swapped = {}
+
+    def take(self, count: int) -> List[int]:
+        """再取出最多 count 个尚未取出的元素"""
+        items = []
+        while len(items) < count and self.taken < self.size:
+            position = self._rng.randrange(self.taken, self.size)
+            items.append(self._swapped.get(position, position))
+            self._swapped[position] = self._swapped.pop(self.taken, self.taken)
+            self.taken += 1
+        return items
+
+
+def _sample_segment(db, dim_id: int, cx: int, min_cz: int, max_cz: int, protected_chunks,
+                    version_range) -> Dict[str, int]:
+    """统计一个列段（cx 固定，cz 在 min_cz 到 max_cz 之间）中存在的区块，只按键定位存在的区块"""
+    values = dict.fromkeys(ESTIMATE_FIELDS, 0)
+    for _, cz, version in iter_chunk_versions_in_rect(db, dim_id, cx, cx, min_cz, max_cz):
+        values['found_chunks'] += 1
+        if (cx, cz) in protected_chunks:
+            values['preserved_chunks'] += 1
+        elif not version_in_range(version, version_range):
+            values['preserved_chunks'] += 1
+            values['version_filtered_chunks'] += 1
+        else:
+            values['reset_chunks'] += 1
+            values['reset_bytes'] += sum(len(key) + len(value)
+                                         for key, value in iter_chunk_records(db, cx, cz, dim_id))
+    return values
+
+
+def estimate_reset(db, dimension: str = "minecraft:overworld", search_range: int = 50,
+                   protected_chunks: Optional[Container[Tuple[int, int]]] = None,
+                   version_range: Optional[Tuple[Optional[int], Optional[int]]] = None,
+                   samples: int = DEFAULT_SAMPLES, strata_per_axis: int = DEFAULT_STRATA_PER_AXIS,
+                   confidence: float = 0.95, seed: Optional[int] = None,
+                   progress_callback=None) -> Dict[str, Any]:
+    """
+    分层整群抽样估算按给定参数重置的结果
+
+    Args:
+        db: LevelDB 数据库对象
+        dimension (str): Minecraft维度名称
+        search_range (int): 搜索范围（区块）
+        protected_chunks: 受保护的区块坐标（支持 in 运算的容器，例如 get_land_protection_map 的结果）
+        version_range (tuple): 可选的区块版本范围 (最小版本, 最大版本)，含义与重置时相同
+        samples (int): 抽样数量（大约访问的区块数），按各层估计的区块数分配
+        strata_per_axis (int): 每个坐标轴方向上最多的层数
+        confidence (float): 置信水平，见 Z_SCORES
+        seed (int): 随机数种子，相同的种子得到相同的抽样
+        progress_callback: 可选的进度回调函数，格式为 callback(current, total, message)
+
+    Returns:
+        dict: {'dimension', 'search_range', 'total_checked', 'samples', 'sampled_segments', 'total_segments',
+               'strata', 'confidence', 'exact', 'estimates': {统计量: {'value', 'low', 'high'}}, 'elapsed_seconds'}，
+              samples 为访问的区块数，统计量见 ESTIMATE_FIELDS
+    """
+    if dimension not in DIMENSION_IDS:
+        raise ValueError(f"不支持的维度: {dimension}")
+    if confidence not in Z_SCORES:
+        raise ValueError(f"不支持的置信水平: {confidence}，可选 {sorted(Z_SCORES)}")
+    start = time.perf_counter()
+    dim_id = DIMENSION_IDS[dimension]
+    protected_chunks = protected_chunks if protected_chunks is not None else ()
+    rng = random.Random(seed)
+    strata = build_strata(search_range, strata_per_axis)
+    samples = max(1, samples)
+
+    # 层内按区域划分列段，列段编号为 列序号 * 区域行数 + 区域行序号
+    rows = []
+    for _, _, min_cz, max_cz in strata:
+        first_row = min_cz >> REGION_SHIFT
+        rows.append([(max(min_cz, row * REGION_SIZE), min(max_cz, (row + 1) * REGION_SIZE - 1))
+                     for row in range(first_row, (max_cz >> REGION_SHIFT) + 1)])
+    orders = [_LazyShuffle((max_cx - min_cx + 1) * len(stratum_rows), rng)
+              for (min_cx, max_cx, _, _), stratum_rows in zip(strata, rows)]
+    results = [[] for _ in strata]
+
+    def visit(stratum_index, count):
+        min_cx = strata[stratum_index][0]
+        stratum_rows = rows[stratum_index]
+        for segment in orders[stratum_index].take(count - orders[stratum_index].taken):
+            min_cz, max_cz = stratum_rows[segment % len(stratum_rows)]
+            results[stratum_index].append(_sample_segment(db, dim_id, min_cx + segment // len(stratum_rows),
+                                                          min_cz, max_cz, protected_chunks, version_range))
+
+    # 1. 每层先抽少量列段，估计整个范围内的区块数
+    for stratum_index in range(len(strata)):
+        visit(stratum_index, PILOT_SEGMENTS)
+        if progress_callback:
+            progress_callback(stratum_index + 1, len(strata) * 2,
+                              f"抽样估算: 估计区块密度 ({stratum_index + 1}/{len(strata)} 层)")
+    estimated_chunks = sum(order.size * sum(values['found_chunks'] for values in segment_values) / len(segment_values)
+                           for order, segment_values in zip(orders, results))
+
+    # 2. 按同一抽样比例补抽，访问的区块数约为 samples；估计的区块数不超过 samples 时访问所有列段
+    fraction = 1.0 if estimated_chunks <= samples else samples / estimated_chunks
+    for stratum_index in range(len(strata)):
+        visit(stratum_index, math.ceil(fraction * orders[stratum_index].size))
+        if progress_callback:
+            progress_callback(len(strata) + stratum_index + 1, len(strata) * 2,
+                              f"抽样估算: {sum(len(segment_values) for segment_values in results)} 个列段")
+
+    # 整群估计：层内总量为列段数乘以列段的均值，方差带有限总体校正
+    totals = dict.fromkeys(ESTIMATE_FIELDS, 0.0)
+    variances = dict.fromkeys(ESTIMATE_FIELDS, 0.0)
+    for order, segment_values in zip(orders, results):
+        size, count = order.size, len(segment_values)
+        for field in ESTIMATE_FIELDS:
+            segment_totals = [values[field] for values in segment_values]
+            mean = sum(segment_totals) / count
+            totals[field] += size * mean
+            if 1 < count < size:
+                sample_variance = sum((value - mean) ** 2 for value in segment_totals) / (count - 1)
+                variances[field] += size * size * (1 - count / size) * sample_variance / count
+
+    z = Z_SCORES[confidence]
+    estimates = {}
+    for field in ESTIMATE_FIELDS:
+        margin = z * math.sqrt(variances[field])
+        estimates[field] = {
+            'value': round(totals[field]),
+            'low': max(0, round(totals[field] - margin)),
+            'high': round(totals[field] + margin),
+        }
+    sampled_segments = sum(len(segment_values) for segment_values in results)
+    total_segments = sum(order.size for order in orders)
+    return {
+        'dimension': dimension,
+        'search_range': search_range,
+        'version_range': list(version_range) if version_range is not None else None,
+        'total_checked': (search_range * 2 + 1) ** 2,
+        'samples': sum(values['found_chunks'] for segment_values in results for values in segment_values),
+        'sampled_segments': sampled_segments,
+        'total_segments': total_segments,
+        'strata': len(strata),
+        'confidence': confidence,
+        'exact': sampled_segments >= total_segments,
+        'estimates': estimates,
+        'elapsed_seconds': round(time.perf_counter() - start, 3),
+    }
+
+
+def format_estimate(estimate: Dict[str, Any], field: str) -> str:
+    """把一个统计量格式化为 “值 (下限 ~ 上限)”，字节数以 MB 显示"""
+    entry = estimate['estimates'][field]
+    if field.endswith("_bytes"):
+        mb = 1024 * 1024
+        text = f"{entry['value'] / mb:.2f} MB"
+        interval = f"{entry['low'] / mb:.2f} ~ {entry['high'] / mb:.2f} MB"
+    else:
+        text = f"{entry['value']}"
+        interval = f"{entry['low']} ~ {entry['high']}"
+    return text if estimate['exact'] else f"{text} ({interval})"
+
+
+def print_estimate(estimate: Dict[str, Any]):
+    """打印估算结果"""
+    if estimate['exact']:
+        print(f"快速估算 ({estimate['dimension']}, ±{estimate['search_range']}): 已访问全部 {estimate['samples']} "
+              f"个区块，结果为精确值，耗时 {estimate['elapsed_seconds']:.2f} 秒")
+    else:
+        print(f"快速估算 ({estimate['dimension']}, ±{estimate['search_range']}): 抽样 {estimate['sampled_segments']}/"
+              f"{estimate['total_segments']} 个列段（访问 {estimate['samples']} 个区块），{estimate['strata']} 层，"
+              f"{estimate['confidence']:.0%} 置信区间，耗时 {estimate['elapsed_seconds']:.2f} 秒")
+    print(f"  找到的区块数量: {format_estimate(estimate, 'found_chunks')}")
+    print(f"  保留的区块数量: {format_estimate(estimate, 'preserved_chunks')}")
+    if estimate['version_range'] is not None:
+        print(f"  因版本过滤保留: {format_estimate(estimate, 'version_filtered_chunks')}")
+    print(f"  将重置的区块数量: {format_estimate(estimate, 'reset_chunks')}")
+    print(f"  可回收空间: {format_estimate(estimate, 'reset_bytes')}")
+
+
+def main():
+    """命令行入口"""
+    from leveldb import LevelDB
+    from world_compaction import get_db_directory
+
+    parser = argparse.ArgumentParser(description="基于抽样的快速预览估算")
+    parser.add_argument("world", help="Minecraft世界路径（服务器需关闭）")
+    parser.add_argument("--dimension", default="minecraft:overworld", choices=sorted(DIMENSION_IDS))
+    parser.add_argument("--range", type=int, dest="search_range", required=True, help="搜索范围（区块）")
+    parser.add_argument("--land-db", help="领地数据库路径")
+    parser.add_argument("--extra", type=int, default=0, help="额外保护距离（区块）")
+    parser.add_argument("--min-version", type=int, help="只重置版本不低于此值的区块")
+    parser.add_argument("--max-version", type=int, help="只重置版本不高于此值的区块")
+    parser.add_argument("--samples", type=int, default=DEFAULT_SAMPLES, help="抽样数量（大约访问的区块数）")
+    parser.add_argument("--confidence", type=float, default=0.95, choices=sorted(Z_SCORES), help="置信水平")
+    parser.add_argument("--seed", type=int, help="随机数种子")
+    args = parser.parse_args()
+
+    protected_chunks = set()
+    if args.land_db:
+        from land_data_reader import LandDataReader
+        from protection_model import ProtectionModel
+        from protection_snapshot import DEFAULT_SNAPSHOT_DIR
+        model = ProtectionModel(LandDataReader(args.land_db), snapshot_dir=DEFAULT_SNAPSHOT_DIR)
+        protected_chunks = model.get_protection_map(args.dimension, args.extra)
+
+    version_range = None
+    if args.min_version is not None or args.max_version is not None:
+        version_range = (args.min_version, args.max_version)
+
+    db = LevelDB(get_db_directory(args.world))
+    try:
+        estimate = estimate_reset(db, args.dimension, args.search_range, protected_chunks, version_range,
+                                  args.samples, confidence=args.confidence, seed=args.seed)
+    finally:
+        db.close()
+    print_estimate(estimate)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,394 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+领地保护模型
+
+GUI 的领地统计和重置引擎共用同一个保护模型：
+    - 每个维度的领地只从数据库读取一次，并预先换算为区块矩形
+    - 保护区块表按 (维度, 额外保护距离, 领地数据版本) 缓存
+    - 修改额外保护距离时，从已缓存的较小距离的结果向外逐圈扩展，不再重新读取和遍历全部领地
+领地数据版本变化（数据库文件被修改）时，通过比较领地表快照找出变化的领地，
+只把这些变化增量应用到已缓存的结果上。
+提供快照目录时，计算出的保护区块表还会编译为磁盘上的保护快照（见 protection_snapshot.py），
+其他进程以内存映射方式直接打开，领地数据变化后自动重新编译。
+
+Author: DEVILENMO
+"""
+
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple, Any
+
+from decision_export import REASON_LAND, REASON_MARGIN
+from land_data_reader import LandDataError
+from protection_snapshot import (
+    land_fingerprint, load_protection_snapshot, snapshot_file_path, write_protection_snapshot
+)
+
+# 领地数据库维度名 -> Minecraft维度名
+DB_TO_MINECRAFT_DIMENSION = {
+    'Overworld': 'minecraft:overworld',      # 首字母大写
+    'Nether': 'minecraft:the_nether',        # 首字母大写
+    'TheEnd': 'minecraft:the_end',           # 驼峰命名
+    # 兼容小写格式（如果有的话）
+    'overworld': 'minecraft:overworld',
+    'nether': 'minecraft:the_nether',
+    'the_end': 'minecraft:the_end'
+}
+
+# Minecraft维度名 -> 领地数据库维度名（ARC Core 使用的写法）
+MINECRAFT_TO_DB_DIMENSION = {
+    'minecraft:overworld': 'Overworld',
+    'minecraft:the_nether': 'Nether',
+    'minecraft:the_end': 'TheEnd'
+}
+
+
+def land_chunk_bounds(land: Dict[str, Any]) -> Tuple[int, int, int, int]:
+    """
+    计算领地覆盖的区块范围
+
+    Returns:
+        tuple: (start_cx, start_cz, end_cx, end_cz)，包含端点
+    """
+    return land['min_x'] // 16, land['min_z'] // 16, land['max_x'] // 16, land['max_z'] // 16
+
+
+class ProtectionModel:
+    """可缓存的领地保护模型"""
+
+    def __init__(self, land_reader, max_cached_maps=4, snapshot_dir=None):
+        """
+        Args:
+            land_reader (LandDataReader): 领地数据读取器
+            max_cached_maps (int): 最多缓存的保护区块表数量
+            snapshot_dir (str): 编译后的保护快照目录（相对路径相对于领地数据库所在目录），None 表示不使用磁盘快照
+        """
+        self.land_reader = land_reader
+        self.max_cached_maps = max_cached_maps
+        self.snapshot_dir = snapshot_dir
+        self._version = None
+        # 每次应用领地变化后加一，调用方可据此判断之前的计算结果是否已过期
+        self.revision = 0
+        # 上次读取时的领地表快照 {land_id: (dimension, min_x, min_z, max_x, max_z)}
+        self._snapshot = None
+        # 领地数据库维度名 -> 领地列表
+        self._lands = {}
+        # 领地数据库维度名 -> [(land_id, start_cx, start_cz, end_cx, end_cz), ...]
+        self._rects = {}
+        # (维度, 额外保护距离) -> {(cx, cz): (原因, 领地ID)}，从快照加载的为只读的 CompiledProtectionMap
+        self._maps = OrderedDict()
+
+    @staticmethod
+    def get_db_dimension(dimension: str) -> Optional[str]:
+        """将Minecraft维度名转换为领地数据库维度名，不支持时返回 None"""
+        return MINECRAFT_TO_DB_DIMENSION.get(dimension)
+
+    def _check_version(self):
+        """领地数据版本变化时增量更新缓存"""
+        self.refresh()
+
+    def refresh(self) -> Optional[Dict[str, Any]]:
+        """
+        检查领地数据是否变化，并只把变化的领地应用到已缓存的保护区块表
+
+        通过比较领地表快照找出新增、删除和修改的领地，只重新计算这些领地（含额外保护距离）
+        覆盖范围内的区块，不会重建整个保护区块表。
+
+        读取失败（数据库被锁定、表不存在、变化的领地读取不到等）时抛出 LandDataError，
+        数据版本、领地快照和缓存的保护区块表都保持不变，下次调用时重新尝试。
+
+        Returns:
+            Optional[dict]: 没有变化时返回 None，否则返回
+                {'added': [...], 'removed': [...], 'changed': [...],
+                 'class_changes': {(维度, 额外保护距离): [(cx, cz), ...]}}，
+                class_changes 为各缓存表中保护状态（保护/不保护）发生变化的区块
+
+        Raises:
+            LandDataError: 读取领地数据失败
+        """
+        version = self.land_reader.get_data_version()
+        if version == self._version:
+            return None
+
+        new_snapshot = self.land_reader.get_land_snapshot()
+        if self._snapshot is None:
+            # 首次读取，没有需要更新的缓存
+            self._snapshot = new_snapshot
+            self._version = version
+            return None
+
+        changes = self.land_reader.diff_land_snapshots(self._snapshot, new_snapshot)
+        changes['class_changes'] = {}
+        if not (changes['added'] or changes['removed'] or changes['changed']):
+            self._snapshot = new_snapshot
+            self._version = version
+            return None
+
+        # 先读取所有新增和修改的领地，全部读到后才开始修改缓存，避免只应用了一部分变化
+        needed_ids = [land_id for land_id in changes['added'] + changes['changed']
+                      if new_snapshot[land_id][0] in self._rects]
+        new_lands = self.land_reader.get_lands_by_ids(needed_ids)
+        missing = [land_id for land_id in needed_ids if land_id not in new_lands]
+        if missing:
+            raise LandDataError(f"读取变化的领地失败（可能正在被修改）: {missing}")
+
+        print(f"领地数据已变化: 新增 {len(changes['added'])} 个，删除 {len(changes['removed'])} 个，"
+              f"修改 {len(changes['changed'])} 个，增量更新保护区块")
+
+        touched_ids = set(changes['added']) | set(changes['removed']) | set(changes['changed'])
+        for db_dimension in list(self._rects):
+            old_ids = {land_id for land_id in touched_ids
+                       if land_id in self._snapshot and self._snapshot[land_id][0] == db_dimension}
+            new_ids = {land_id for land_id in touched_ids
+                       if land_id in new_snapshot and new_snapshot[land_id][0] == db_dimension}
+            if old_ids or new_ids:
+                self._apply_land_changes(db_dimension, old_ids, [new_lands[land_id] for land_id in new_ids],
+                                         changes['class_changes'])
+
+        self._snapshot = new_snapshot
+        self._version = version
+        self.revision += 1
+        return changes
+
+    def _apply_land_changes(self, db_dimension, old_ids, new_lands, class_changes):
+        """把一个维度中变化的领地（new_lands 为新增和修改后的领地信息）应用到领地列表、区块矩形和缓存的保护区块表"""
+        old_rects = [rect for rect in self._rects[db_dimension] if rect[0] in old_ids]
+        new_ids = {land['land_id'] for land in new_lands}
+
+        # 更新领地列表与区块矩形，保持按 land_id 排序
+        lands = [land for land in self._lands[db_dimension] if land['land_id'] not in old_ids]
+        lands.extend(new_lands)
+        lands.sort(key=lambda land: land['land_id'])
+        self._lands[db_dimension] = lands
+        rects = [(land['land_id'],) + land_chunk_bounds(land) for land in lands]
+        self._rects[db_dimension] = rects
+        new_rects = [rect for rect in rects if rect[0] in new_ids]
+
+        dimension = DB_TO_MINECRAFT_DIMENSION[db_dimension]
+        for map_key in list(self._maps):
+            map_dimension, extra = map_key
+            if map_dimension != dimension:
+                continue
+            covered = self._maps[map_key]
+            if not isinstance(covered, dict):
+                # 从快照加载的保护表是只读的，先转换为字典再增量更新（快照在下次加载时重新编译）
+                covered = self._maps[map_key] = dict(covered)
+            changed_cells = self._patch_map(covered, rects, old_rects + new_rects, extra)
+            class_changes.setdefault((map_dimension, extra), []).extend(changed_cells)
+
+    @staticmethod
+    def _patch_map(covered, rects, delta_rects, extra):
+        """
+        重新计算 delta_rects（按 extra 扩展后）覆盖范围内每个区块的保护原因
+
+        计算规则与完整构建一致：领地范围优先；否则取距离最近的领地，距离相同时取 land_id 较小者。
+
+        Returns:
+            list: 保护状态发生变化的区块坐标
+        """
+        affected = set()
+        for _, start_cx, start_cz, end_cx, end_cz in delta_rects:
+            for cx in range(start_cx - extra, end_cx + extra + 1):
+                for cz in range(start_cz - extra, end_cz + extra + 1):
+                    affected.add((cx, cz))
+        if not affected:
+            return []
+
+        min_cx = min(cx for cx, _ in affected)
+        max_cx = max(cx for cx, _ in affected)
+        min_cz = min(cz for _, cz in affected)
+        max_cz = max(cz for _, cz in affected)
+        candidates = [
+            rect for rect in rects
+            if rect[1] - extra <= max_cx and rect[3] + extra >= min_cx
+            and rect[2] - extra <= max_cz and rect[4] + extra >= min_cz
+        ]
+
+        changed_cells = []
+        for cx, cz in affected:
+            best = None
+            for land_id, start_cx, start_cz, end_cx, end_cz in candidates:
+                distance = max(start_cx - cx, cx - end_cx, start_cz - cz, cz - end_cz, 0)
+                if distance <= extra and (best is None or distance < best[0]):
+                    best = (distance, land_id)
+
+            was_protected = (cx, cz) in covered
+            if best is None:
+                covered.pop((cx, cz), None)
+            else:
+                covered[(cx, cz)] = (REASON_LAND if best[0] == 0 else REASON_MARGIN, best[1])
+            if was_protected != (best is not None):
+                changed_cells.append((cx, cz))
+        return changed_cells
+
+    def get_lands(self, dimension: str) -> List[Dict[str, Any]]:
+        """
+        获取指定维度的所有领地（按数据版本缓存）
+
+        Args:
+            dimension (str): Minecraft维度名称
+
+        Returns:
+            list: 领地信息列表
+
+        Raises:
+            LandDataError: 读取领地数据失败
+        """
+        self._check_version()
+        db_dimension = self.get_db_dimension(dimension)
+        if db_dimension is None:
+            return []
+        if db_dimension not in self._lands:
+            # 按领地快照读取，查询失败时抛出异常而不是得到空的领地列表
+            land_ids = sorted(land_id for land_id, row in self._snapshot.items() if row[0] == db_dimension)
+            found = self.land_reader.get_lands_by_ids(land_ids)
+            missing = [land_id for land_id in land_ids if land_id not in found]
+            if missing:
+                raise LandDataError(f"读取领地失败（可能正在被修改）: {missing}")
+            lands = [found[land_id] for land_id in land_ids]
+            self._lands[db_dimension] = lands
+            self._rects[db_dimension] = [(land['land_id'],) + land_chunk_bounds(land) for land in lands]
+        return self._lands[db_dimension]
+
+    def get_protection_map(self, dimension: str, extra_protection_distance: int = 0) -> Dict[Tuple[int, int], Tuple[str, int]]:
+        """
+        获取被领地覆盖的区块及其保护原因
+
+        返回的字典由模型缓存并共享，调用方不应修改。使用快照目录时，可能返回从快照
+        内存映射的只读映射（接口与字典相同）；快照不存在或领地数据已变化时计算后重新编译快照。
+
+        Args:
+            dimension (str): Minecraft维度名称
+            extra_protection_distance (int): 额外保护距离（区块单位）
+
+        Returns:
+            dict: {(cx, cz): (原因, 领地ID)}，原因为 'land' 或 'margin'；
+                  同一区块被多个领地覆盖时，领地范围优先于额外保护距离
+        """
+        extra = max(0, extra_protection_distance)
+        self.get_lands(dimension)
+        key = (dimension, extra)
+        if key in self._maps:
+            self._maps.move_to_end(key)
+            return self._maps[key]
+
+        db_dimension = self.get_db_dimension(dimension)
+        rects = self._rects.get(db_dimension, [])
+
+        snapshot_path = fingerprint = None
+        if self.snapshot_dir and rects and self._snapshot is not None:
+            snapshot_path = snapshot_file_path(self.snapshot_dir, self.land_reader.db_path, db_dimension, extra)
+            fingerprint = land_fingerprint(self._snapshot, db_dimension)
+            compiled = load_protection_snapshot(snapshot_path, fingerprint)
+            if compiled is not None:
+                print(f"从保护快照加载 {len(compiled)} 个受保护区块: {snapshot_path}")
+                self._store_map(key, compiled)
+                return compiled
+
+        # 从已缓存的、距离最接近且更小的结果开始向外扩展
+        base_extra = None
+        for cached_dimension, cached_extra in self._maps:
+            if cached_dimension == dimension and cached_extra < extra:
+                if base_extra is None or cached_extra > base_extra:
+                    base_extra = cached_extra
+
+        if base_extra is None:
+            covered = self._build_core(rects)
+            base_extra = 0
+        else:
+            covered = dict(self._maps[(dimension, base_extra)])
+
+        for ring in range(base_extra + 1, extra + 1):
+            self._add_ring(covered, rects, ring)
+
+        if snapshot_path:
+            self._write_snapshot(snapshot_path, db_dimension, extra, fingerprint, rects, covered)
+        self._store_map(key, covered)
+        return covered
+
+    def _store_map(self, key, covered):
+        """缓存一个保护区块表，超过数量上限时淘汰最早使用的"""
+        self._maps[key] = covered
+        while len(self._maps) > self.max_cached_maps:
+            self._maps.popitem(last=False)
+
+    @staticmethod
+    def _write_snapshot(path, db_dimension, extra, fingerprint, rects, covered):
+        """把保护区块表编译为磁盘快照，失败时只输出警告（例如文件正被其他进程映射）"""
+        try:
+            size = write_protection_snapshot(path, covered, {
+                'db_dimension': db_dimension,
+                'margin': extra,
+                'fingerprint': fingerprint,
+                'rects': [list(rect) for rect in rects],
+            })
+            print(f"已编译保护快照: {path} ({len(covered)} 个区块, {size / 1024:.1f} KB)")
+        except OSError as e:
+            print(f"警告: 无法写入保护快照 {path}: {e}")
+
+    @staticmethod
+    def _build_core(rects) -> Dict[Tuple[int, int], Tuple[str, int]]:
+        """计算领地本身覆盖的区块"""
+        covered = {}
+        for land_id, start_cx, start_cz, end_cx, end_cz in rects:
+            for cx in range(start_cx, end_cx + 1):
+                for cz in range(start_cz, end_cz + 1):
+                    covered.setdefault((cx, cz), (REASON_LAND, land_id))
+        return covered
+
+    @staticmethod
+    def _add_ring(covered, rects, ring):
+        """添加距离领地边界恰好 ring 个区块的一圈额外保护区块"""
+        for land_id, start_cx, start_cz, end_cx, end_cz in rects:
+            x0, z0 = start_cx - ring, start_cz - ring
+            x1, z1 = end_cx + ring, end_cz + ring
+            for cx in range(x0, x1 + 1):
+                covered.setdefault((cx, z0), (REASON_MARGIN, land_id))
+                covered.setdefault((cx, z1), (REASON_MARGIN, land_id))
+            for cz in range(z0 + 1, z1):
+                covered.setdefault((x0, cz), (REASON_MARGIN, land_id))
+                covered.setdefault((x1, cz), (REASON_MARGIN, land_id))
+
+    def get_land_rects(self, dimension: str) -> List[Tuple[int, int, int, int, int]]:
+        """
+        获取指定维度所有领地的区块矩形
+
+        Returns:
+            list: [(land_id, start_cx, start_cz, end_cx, end_cz), ...]
+        """
+        self.get_lands(dimension)
+        return self._rects.get(self.get_db_dimension(dimension), [])
+
+    def get_claimed_y_ranges(self, dimension: str,
+                             extra_protection_distance: int = 0) -> Dict[Tuple[int, int], Optional[Tuple[int, int]]]:
+        """
+        获取受保护区块中领地声明的方块Y范围
+
+        领地表带有可选的 min_y / max_y 字段时，领地只保护这一高度范围；没有这两个字段的领地保护整列。
+        一个区块被多个领地（含额外保护距离）覆盖时取各领地Y范围的并集（最小值到最大值）。
+
+        Args:
+            dimension (str): Minecraft维度名称
+            extra_protection_distance (int): 额外保护距离（区块单位）
+
+        Returns:
+            dict: {(cx, cz): (min_y, max_y)}，覆盖该区块的任一领地没有Y范围时值为 None（整列保护）
+        """
+        extra = max(0, extra_protection_distance)
+        claimed = {}
+        for land in self.get_lands(dimension):
+            min_y, max_y = land.get('min_y'), land.get('max_y')
+            y_range = None if min_y is None or max_y is None else (min(min_y, max_y), max(min_y, max_y))
+            start_cx, start_cz, end_cx, end_cz = land_chunk_bounds(land)
+            for cx in range(start_cx - extra, end_cx + extra + 1):
+                for cz in range(start_cz - extra, end_cz + extra + 1):
+                    key = (cx, cz)
+                    if key not in claimed:
+                        claimed[key] = y_range
+                        continue
+                    current = claimed[key]
+                    if current is None or y_range is None:
+                        claimed[key] = None
+                    else:
+                        claimed[key] = (min(current[0], y_range[0]), max(current[1], y_range[1]))
+        return claimed
@@ -0,0 +1,345 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+编译后的领地保护快照
+
+每个进程（GUI、命令行、批量重置、统计工具）都要从领地表重新计算区块级的保护表，
+领地多、额外保护距离大时这一步需要较长时间。本模块把某个维度、某个额外保护距离的保护表
+编译成一个带版本的二进制文件，之后的进程直接以内存映射方式打开，不再逐个区块构建字典：
+
+    文件头:   MAGIC(8) + 元数据长度(u32) + 元数据(JSON) + 对齐填充
+    区块键:   count 个 u64，按 (cx, cz) 升序，键为 (cx + 2^31) << 32 | (cz + 2^31)
+    领地ID:   count 个 i32
+    原因:     count 个 u8（0 = 领地范围内，1 = 额外保护距离内）
+
+元数据记录格式版本、维度、额外保护距离、各领地的区块矩形，以及领地数据指纹
+（该维度所有领地的 ID 和范围的哈希）。领地数据变化后指纹不再匹配，快照会被自动重新编译；
+数据库中与领地范围无关的修改（例如成员、权限）不会使快照失效。
+
+查询时在映射的有序键数组上二分查找，内存占用只取决于实际访问的页面。
+
+使用方法：
+    # 查看快照内容（默认保存在领地数据库所在目录下的 protection_cache 中）
+    python protection_snapshot.py plugins/ARCCore/protection_cache/1a2b3c4d5e6f_Overworld_m2.crp
+
+Author: DEVILENMO
+"""
+
+import argparse
+import bisect
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import time
+from array import array
+from collections.abc import Mapping
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from decision_export import REASON_LAND, REASON_MARGIN
+
+MAGIC = b"CRPROT01"
+FORMAT_VERSION = 1
+HEADER_FORMAT = "<8sI"
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+
+# 快照文件默认保存目录（相对路径相对于领地数据库所在目录，见 snapshot_file_path）
+DEFAULT_SNAPSHOT_DIR = "protection_cache"
+SNAPSHOT_SUFFIX = ".crp"
+
+REASON_CODES = {REASON_LAND: 0, REASON_MARGIN: 1}
+REASON_NAMES = {code: reason for reason, code in REASON_CODES.items()}
+
+_KEY_OFFSET = 1 << 31
+
+
+def pack_coord(cx: int, cz: int) -> int:
+    """把区块坐标打包为可按 (cx, cz) 顺序比较的无符号整数"""
+    return ((cx + _KEY_OFFSET) << 32) | (cz + _KEY_OFFSET)
+
+
+def unpack_coord(key: int) -> Tuple[int, int]:
+    """pack_coord 的逆运算"""
+    return (key >> 32) - _KEY_OFFSET, (key & 0xFFFFFFFF) - _KEY_OFFSET
+
+
+def pack_coords(cx, cz):
+    """pack_coord 的 numpy 向量化形式：坐标数组 -> uint64 区块键数组"""
+    import numpy as np
+
+    high = (np.asarray(cx, dtype=np.int64) + _KEY_OFFSET).astype(np.uint64) << np.uint64(32)
+    return high | (np.asarray(cz, dtype=np.int64) + _KEY_OFFSET).astype(np.uint64)
+
+
+def unpack_coords(keys):
+    """unpack_coord 的 numpy 向量化形式：uint64 区块键数组 -> (cx 数组, cz 数组)，均为 int64"""
+    import numpy as np
+
+    return ((keys >> np.uint64(32)).astype(np.int64) - _KEY_OFFSET,
+            (keys & np.uint64(0xFFFFFFFF)).astype(np.int64) - _KEY_OFFSET)
+
+
+def land_fingerprint(land_snapshot: Dict[int, tuple], db_dimension: str) -> str:
+    """
+    计算一个维度中领地范围的指纹
+
+    Args:
+        land_snapshot (dict): LandDataReader.get_land_snapshot() 的结果
+        db_dimension (str): 领地数据库维度名
+
+    Returns:
+        str: 十六进制哈希，领地的新增、删除或范围修改都会改变指纹
+    """
+    digest = hashlib.sha1()
+    for land_id in sorted(land_snapshot):
+        row = land_snapshot[land_id]
+        if row[0] == db_dimension:
+            digest.update(repr((land_id,) + tuple(row[1:])).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def snapshot_file_path(snapshot_dir: str, land_db_path: str, db_dimension: str, margin: int) -> str:
+    """
+    快照文件路径：不同领地数据库（按绝对路径区分）、维度和额外保护距离各自一个文件
+
+    snapshot_dir 为相对路径时相对于领地数据库所在目录，与当前工作目录无关，
+    从不同目录启动的 GUI、命令行和守护进程共用同一份快照。
+
+    Returns:
+        str: <snapshot_dir>/<数据库路径哈希>_<维度>_m<额外保护距离>.crp
+    """
+    land_db_path = os.path.abspath(land_db_path)
+    if not os.path.isabs(snapshot_dir):
+        snapshot_dir = os.path.join(os.path.dirname(land_db_path), snapshot_dir)
+    db_hash = hashlib.sha1(land_db_path.encode("utf-8")).hexdigest()[:12]
+    return os.path.join(snapshot_dir, f"{db_hash}_{db_dimension}_m{margin}{SNAPSHOT_SUFFIX}")
+
+
+def packed_protection_arrays(covered: Mapping) -> Tuple[Any, Any]:
+    """
+    把保护表转换为按坐标升序的紧凑数组
+
+    Args:
+        covered: {(cx, cz): (原因, 领地ID)}，字典或 CompiledProtectionMap
+
+    Returns:
+        tuple: (区块键, 原因代码)，区块键见 pack_coord，可直接交给 numpy.frombuffer
+    """
+    if isinstance(covered, CompiledProtectionMap):
+        return covered.packed_keys, covered.reason_codes
+    coords = sorted(covered)
+    return (array('Q', (pack_coord(cx, cz) for cx, cz in coords)),
+            bytes(REASON_CODES[covered[coord][0]] for coord in coords))
+
+
+def write_protection_snapshot(path: str, covered: Dict[Tuple[int, int], Tuple[str, int]],
+                              metadata: Dict[str, Any]) -> int:
+    """
+    把保护表编译为快照文件（先写临时文件再替换）
+
+    Args:
+        path (str): 快照文件路径
+        covered (dict): {(cx, cz): (原因, 领地ID)}
+        metadata (dict): 写入文件头的元数据（维度、额外保护距离、指纹、区块矩形等）
+
+    Returns:
+        int: 写入的字节数
+    """
+    coords = sorted(covered)
+    keys = array('Q', (pack_coord(cx, cz) for cx, cz in coords))
+    land_ids = array('i', (covered[coord][1] for coord in coords))
+    reasons = bytes(REASON_CODES[covered[coord][0]] for coord in coords)
+    if sys.byteorder != "little":
+        keys.byteswap()
+        land_ids.byteswap()
+
+    metadata = dict(metadata)
+    metadata.update({
+        'format_version': FORMAT_VERSION,
+        'count': len(coords),
+        'bounds': [coords[0][0], coords[-1][0], min(cz for _, cz in coords), max(cz for _, cz in coords)]
+        if coords else None,
+        'created': time.strftime("%Y-%m-%d %H:%M:%S"),
+    })
+    meta_bytes = json.dumps(metadata, ensure_ascii=False).encode("utf-8")
+    padding = -(HEADER_SIZE + len(meta_bytes)) % 8
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    # 每个写入者使用独立的临时文件，多个进程同时编译同一个快照时不会互相覆盖
+    fd, temp_path = tempfile.mkstemp(prefix=os.path.basename(path) + ".", suffix=".tmp", dir=directory or None)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(struct.pack(HEADER_FORMAT, MAGIC, len(meta_bytes)))
+            f.write(meta_bytes)
+            f.write(b"\0" * padding)
+            f.write(keys.tobytes())
+            f.write(land_ids.tobytes())
+            f.write(reasons)
+            size = f.tell()
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+    return size
+
+
+def read_snapshot_metadata(path: str) -> Dict[str, Any]:
+    """
+    读取快照文件头的元数据
+
+    Raises:
+        ValueError: 不是快照文件
+    """
+    with open(path, "rb") as f:
+        magic, meta_length = struct.unpack(HEADER_FORMAT, f.read(HEADER_SIZE))
+        if magic != MAGIC:
+            raise ValueError(f"不是保护快照文件: {path}")
+        return json.loads(f.read(meta_length).decode("utf-8"))
+
+
+class CompiledProtectionMap(Mapping):
+    """
+    内存映射的只读保护表，与 ProtectionModel.get_protection_map 返回的字典接口相同：
+    {(cx, cz): (原因, 领地ID)}
+    """
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path (str): 快照文件路径
+
+        Raises:
+            ValueError: 文件格式不正确或版本不支持
+        """
+        self.path = path
+        self.metadata = read_snapshot_metadata(path)
+        if self.metadata.get('format_version') != FORMAT_VERSION:
+            raise ValueError(f"不支持的保护快照版本: {self.metadata.get('format_version')}")
+        if sys.byteorder != "little":
+            # 映射的数组按本机字节序解释，大端平台直接重新编译
+            raise ValueError("保护快照只支持小端平台")
+
+        count = self.metadata['count']
+        bounds = self.metadata['bounds']
+        self._min_cx, self._max_cx, self._min_cz, self._max_cz = bounds if bounds else (0, -1, 0, -1)
+        with open(path, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            file_size = f.tell()
+            if count == 0:
+                self._mmap = None
+                self._keys = self._land_ids = self._reasons = ()
+                return
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        data_start = file_size - count * 13
+        if data_start < HEADER_SIZE:
+            self._mmap.close()
+            raise ValueError(f"保护快照文件不完整: {path}")
+        view = memoryview(self._mmap)
+        self._keys = view[data_start:data_start + count * 8].cast('Q')
+        self._land_ids = view[data_start + count * 8:data_start + count * 12].cast('i')
+        self._reasons = view[data_start + count * 12:data_start + count * 13]
+
+    def _index(self, coord) -> int:
+        """区块在键数组中的位置，不存在时返回 -1"""
+        try:
+            cx, cz = coord
+        except (TypeError, ValueError):
+            return -1
+        if not (self._min_cx <= cx <= self._max_cx and self._min_cz <= cz <= self._max_cz):
+            return -1
+        key = pack_coord(cx, cz)
+        index = bisect.bisect_left(self._keys, key)
+        if index < len(self._keys) and self._keys[index] == key:
+            return index
+        return -1
+
+    def __getitem__(self, coord) -> Tuple[str, int]:
+        index = self._index(coord)
+        if index < 0:
+            raise KeyError(coord)
+        return REASON_NAMES[self._reasons[index]], self._land_ids[index]
+
+    def get(self, coord, default=None):
+        index = self._index(coord)
+        if index < 0:
+            return default
+        return REASON_NAMES[self._reasons[index]], self._land_ids[index]
+
+    def __contains__(self, coord) -> bool:
+        return self._index(coord) >= 0
+
+    def __iter__(self) -> Iterator[Tuple[int, int]]:
+        for key in self._keys:
+            yield unpack_coord(key)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    @property
+    def packed_keys(self):
+        """按坐标升序的区块键（见 pack_coord），映射在文件上的 u64 数组"""
+        return self._keys if self._mmap is not None else array('Q')
+
+    @property
+    def reason_codes(self):
+        """与 packed_keys 对应的原因代码（见 REASON_CODES）"""
+        return self._reasons if self._mmap is not None else b""
+
+    def close(self):
+        """关闭内存映射（之后不能再访问本对象）"""
+        if self._mmap is not None:
+            for view in (self._keys, self._land_ids, self._reasons):
+                view.release()
+            self._mmap.close()
+            self._mmap = None
+
+
+def load_protection_snapshot(path: str, fingerprint: str) -> Optional[CompiledProtectionMap]:
+    """
+    打开快照文件，文件不存在、格式不正确或指纹不匹配（领地数据已变化）时返回 None
+
+    Args:
+        path (str): 快照文件路径
+        fingerprint (str): 当前领地数据的指纹，见 land_fingerprint
+
+    Returns:
+        Optional[CompiledProtectionMap]: 内存映射的保护表
+    """
+    if not os.path.exists(path):
+        return None
+    try:
+        metadata = read_snapshot_metadata(path)
+        if metadata.get('fingerprint') != fingerprint:
+            return None
+        return CompiledProtectionMap(path)
+    except (OSError, ValueError, KeyError, struct.error) as e:
+        print(f"警告: 无法读取保护快照 {path}: {e}")
+        return None
+
+
+def main():
+    """命令行入口：查看快照内容"""
+    parser = argparse.ArgumentParser(description="查看编译后的领地保护快照")
+    parser.add_argument("paths", nargs="+", help="快照文件路径")
+    args = parser.parse_args()
+
+    for path in args.paths:
+        metadata = read_snapshot_metadata(path)
+        print(f"{path}:")
+        print(f"  维度: {metadata.get('db_dimension')}, 额外保护距离: {metadata.get('margin')}")
+        print(f"  领地: {len(metadata.get('rects', []))} 个, 受保护区块: {metadata['count']} 个")
+        print(f"  区块范围: {metadata['bounds']}")
+        print(f"  领地数据指纹: {metadata.get('fingerprint')}")
+        print(f"  编译时间: {metadata['created']}, 文件大小: {os.path.getsize(path) / 1024:.1f} KB")
+
+
+if __name__ == "__main__":
+    main()
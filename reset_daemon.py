@@ -0,0 +1,518 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+常驻守护进程：保持世界和索引处于已加载状态，通过本地 HTTP 接口提供预览、统计和区块查询
+
+每次打开 GUI 或运行脚本都要重新打开世界、初始化 amulet 的版本转换器、读取领地并计算保护区块，
+大世界上一次预览往往需要几分钟。守护进程启动时完成这些工作并一直保持：
+    - 打开的世界（ChunkAutoResetter）
+    - 领地数据和保护模型（使用编译后的保护快照，领地数据变化时增量更新）
+    - 区块索引：一次顺序遍历数据库，记录每个维度所有区块的坐标、存储字节数和版本号（numpy 数组）
+之后的“如果这样设置会重置多少区块”预览只是在内存中的数组上做向量化计算，毫秒级返回。
+
+接口（只监听 127.0.0.1，请求和响应均为 JSON）：
+    GET  /status    世界、索引和领地数据的状态
+    POST /preview   {"dimension", "search_range", "extra_protection_distance", "version_range"}
+    POST /census    {"dimension", "search_range", "extra_protection_distance"}，存储空间统计
+    POST /sweep     {"dimension", "search_ranges", "max_margin", "version_range"}，额外保护距离扫描
+    POST /chunk     {"cx", "cz", "dimension", "detail"}，单个区块的索引信息和保护状态，
+                    detail 为 true 时还通过 amulet 读取实体数量
+    POST /reload    重新构建区块索引（世界被其他工具修改后）
+    POST /shutdown  关闭守护进程
+
+守护进程持有世界数据库的锁，实际重置前需要先关闭守护进程（python reset_daemon.py stop）。
+
+使用方法：
+    python reset_daemon.py serve path/to/world --land-db plugins/ARCCore/database.db
+    python reset_daemon.py preview --range 3000 --extra 2
+    python reset_daemon.py chunk 10 -4 --detail
+    python reset_daemon.py stop
+
+Author: DEVILENMO
+"""
+
+import argparse
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional, Tuple
+
+from bedrock_keys import DIMENSION_IDS, get_level_db
+from chunk_index import ChunkIndex, build_chunk_index, version_mask
+from margin_sweep import DEFAULT_MAX_MARGIN, print_sweep, sweep_margins
+from protection_snapshot import REASON_CODES, packed_protection_arrays
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+# 客户端默认超时（秒），统计整个世界可能需要较长时间
+DEFAULT_CLIENT_TIMEOUT = 600
+
+
+class DaemonError(Exception):
+    """守护进程返回错误或无法连接"""
+
+
+class WarmWorld:
+    """守护进程持有的已加载世界、保护模型和区块索引"""
+
+    def __init__(self, world_path: str, land_db_path: Optional[str] = None, protection_cache_dir: Optional[str] = None):
+        """
+        Args:
+            world_path (str): Minecraft世界路径
+            land_db_path (str): 领地数据库路径
+            protection_cache_dir (str): 编译后的保护快照目录，None 时使用默认目录
+        """
+        from ChunkAutoResetter import ChunkAutoResetter
+        from protection_snapshot import DEFAULT_SNAPSHOT_DIR
+
+        self.resetter = ChunkAutoResetter(world_path, land_db_path,
+                                          protection_cache_dir=protection_cache_dir or DEFAULT_SNAPSHOT_DIR)
+        self.started = time.time()
+        self.index = {}
+        self.index_seconds = None
+        self.index_built = None
+        # amulet 的世界对象和保护模型都不是线程安全的，所有请求串行处理
+        self.lock = threading.Lock()
+        # 最近一次使用的 (缓存键, 保护表, 区块键, 原因代码)，缓存键见 _get_protection
+        self._protection_arrays = None
+
+    def load(self) -> bool:
+        """打开世界并构建区块索引"""
+        if not self.resetter.load_world():
+            return False
+        self.reload_index()
+        return True
+
+    def close(self):
+        """关闭世界"""
+        self.resetter.close_world()
+
+    def reload_index(self):
+        """重新构建区块索引"""
+        print("正在构建区块索引...")
+        start = time.perf_counter()
+        self.index = build_chunk_index(get_level_db(self.resetter.level),
+                                       progress_callback=lambda current, total, message: print(message))
+        self.index_seconds = round(time.perf_counter() - start, 3)
+        self.index_built = time.strftime("%Y-%m-%d %H:%M:%S")
+        counts = ", ".join(f"维度 {dim_id}: {len(index)} 个区块" for dim_id, index in sorted(self.index.items()))
+        print(f"区块索引构建完成 ({counts})，耗时 {self.index_seconds:.1f} 秒")
+
+    def _get_protection(self, dimension: str, extra_protection_distance: int):
+        """
+        当前的保护表，以及它的 numpy 形式（按维度、额外保护距离、保护模型的修订号和保护表对象缓存）
+
+        领地数据库读取失败时抛出 LandDataError（见 ChunkAutoResetter.get_land_protection_map），
+        不会缓存空的保护表，数据库恢复可读后下次调用重新读取。
+        """
+        import numpy as np
+
+        if not self.resetter.land_reader and not self.resetter.land_db_path:
+            return {}, np.zeros(0, dtype=np.uint64), np.zeros(0, dtype=np.uint8)
+        covered = self.resetter.get_land_protection_map(dimension, extra_protection_distance)
+        # 领地变化会就地修改缓存的保护表并增加修订号，因此除了保护表对象还要比较修订号
+        model = self.resetter.protection_model
+        cache_key = (model, dimension, extra_protection_distance, model.revision if model is not None else None)
+        cached = self._protection_arrays
+        if cached is None or cached[0] != cache_key or cached[1] is not covered:
+            keys, reasons = packed_protection_arrays(covered)
+            keys = np.frombuffer(keys, dtype=np.uint64) if len(keys) else np.zeros(0, dtype=np.uint64)
+            reasons = np.frombuffer(reasons, dtype=np.uint8) if len(reasons) else np.zeros(0, dtype=np.uint8)
+            cached = self._protection_arrays = (cache_key, covered, keys, reasons)
+        return cached[1:]
+
+    def status(self) -> Dict[str, Any]:
+        """守护进程状态"""
+        land_reader = self.resetter.land_reader
+        return {
+            'world': self.resetter.world_path,
+            'land_db': self.resetter.land_db_path if land_reader else None,
+            'land_data_version': str(land_reader.get_data_version()) if land_reader else None,
+            'uptime_seconds': round(time.time() - self.started, 1),
+            'index_built': self.index_built,
+            'index_seconds': self.index_seconds,
+            'chunks': {str(dim_id): len(index) for dim_id, index in self.index.items()},
+        }
+
+    def preview(self, dimension: str = "minecraft:overworld", search_range: int = 50,
+                extra_protection_distance: int = 0, version_range=None) -> Dict[str, Any]:
+        """
+        预览按给定参数重置的结果（与 reset_chunks_except_lands 的分类规则相同，不修改世界）
+
+        Returns:
+            dict: {'found_chunks', 'preserved_chunks', 'land_chunks', 'margin_chunks', 'version_filtered_chunks',
+                   'reset_chunks', 'reset_bytes', 'preserved_bytes', 'chunk_versions', 'elapsed_ms', ...}
+        """
+        import numpy as np
+
+        start = time.perf_counter()
+        if dimension not in DIMENSION_IDS:
+            raise ValueError(f"不支持的维度: {dimension}")
+        if self.resetter.protection_model is not None:
+            self.resetter.protection_model.refresh()
+        index = self.index.get(DIMENSION_IDS[dimension])
+        _, protected_keys, reason_codes = self._get_protection(dimension, extra_protection_distance)
+
+        if index is None or not len(index):
+            in_range = np.zeros(0, dtype=bool)
+            keys = np.zeros(0, dtype=np.uint64)
+            sizes = np.zeros(0, dtype=np.int64)
+            versions = np.zeros(0, dtype=np.int16)
+        else:
+            in_range = (np.abs(index.cx) <= search_range) & (np.abs(index.cz) <= search_range)
+            keys, sizes, versions = index.keys[in_range], index.sizes[in_range], index.versions[in_range]
+
+        # 在有序的保护区块键中查找每个区块
+        positions = np.searchsorted(protected_keys, keys)
+        found = positions < len(protected_keys)
+        protected = np.zeros(len(keys), dtype=bool)
+        protected[found] = protected_keys[positions[found]] == keys[found]
+        reasons = np.full(len(keys), 255, dtype=np.uint8)
+        reasons[protected] = reason_codes[positions[protected]]
+
+        version_filtered = ~protected & ~version_mask(versions, version_range)
+        reset = ~protected & ~version_filtered
+
+        unique_versions, version_counts = np.unique(versions, return_counts=True)
+        return {
+            'dimension': dimension,
+            'search_range': search_range,
+            'extra_protection_distance': extra_protection_distance,
+            'version_range': list(version_range) if version_range is not None else None,
+            'total_checked': (search_range * 2 + 1) ** 2,
+            'found_chunks': int(len(keys)),
+            'preserved_chunks': int(protected.sum() + version_filtered.sum()),
+            'land_protected_chunks': int(len(protected_keys)),
+            'land_chunks': int((reasons == REASON_CODES['land']).sum()),
+            'margin_chunks': int((reasons == REASON_CODES['margin']).sum()),
+            'version_filtered_chunks': int(version_filtered.sum()),
+            'reset_chunks': int(reset.sum()),
+            'reset_bytes': int(sizes[reset].sum()),
+            'preserved_bytes': int(sizes[~reset].sum()),
+            'chunk_versions': {int(version): int(count) for version, count in zip(unique_versions, version_counts)},
+            'elapsed_ms': round((time.perf_counter() - start) * 1000, 2),
+        }
+
+    def census(self, dimension: Optional[str] = None, search_range: Optional[int] = None,
+               extra_protection_distance: int = 0) -> Dict[str, Any]:
+        """存储空间统计（格式见 world_census.run_census）"""
+        from world_census import run_census
+
+        protected = set()
+        if dimension and (self.resetter.land_reader or self.resetter.land_db_path):
+            protected = self.resetter.get_land_protection_map(dimension, extra_protection_distance)
+        return run_census(get_level_db(self.resetter.level), dimension, search_range, protected)
+
+    def sweep(self, dimension: str = "minecraft:overworld", search_ranges=(50,), max_margin: int = DEFAULT_MAX_MARGIN,
+              version_range=None) -> Dict[str, Any]:
+        """额外保护距离扫描（格式见 margin_sweep.sweep_margins），直接使用已建立的区块索引"""
+        if dimension not in DIMENSION_IDS:
+            raise ValueError(f"不支持的维度: {dimension}")
+        land_rects = []
+        if self.resetter.land_reader or self.resetter.land_db_path:
+            if self.resetter.protection_model is not None:
+                self.resetter.protection_model.refresh()
+            # 保护模型在第一次获取保护表时创建
+            self._get_protection(dimension, 0)
+            model = self.resetter.protection_model
+            land_rects = model.get_land_rects(dimension) if model else []
+        index = self.index.get(DIMENSION_IDS[dimension]) or ChunkIndex.empty()
+        return sweep_margins(index, land_rects, search_ranges, max_margin, version_range, dimension)
+
+    def chunk_info(self, cx: int, cz: int, dimension: str = "minecraft:overworld", detail: bool = False,
+                   extra_protection_distance: int = 0) -> Dict[str, Any]:
+        """单个区块的索引信息和保护状态，detail 为 True 时还通过 amulet 读取区块"""
+        if dimension not in DIMENSION_IDS:
+            raise ValueError(f"不支持的维度: {dimension}")
+        index = self.index.get(DIMENSION_IDS[dimension])
+        position = index.find(cx, cz) if index is not None else -1
+        covered, _, _ = self._get_protection(dimension, extra_protection_distance)
+        protection = covered.get((cx, cz))
+        info = {
+            'coordinates': [cx, cz],
+            'dimension': dimension,
+            'indexed': position >= 0,
+            'stored_bytes': int(index.sizes[position]) if position >= 0 else 0,
+            'version': int(index.versions[position]) if position >= 0 else None,
+            'protection': protection[0] if protection else None,
+            'land_id': protection[1] if protection else None,
+        }
+        if detail:
+            chunk = self.resetter.get_chunk_info(cx, cz, dimension)
+            info['chunk'] = {key: list(value) if isinstance(value, tuple) else value for key, value in chunk.items()}
+        return info
+
+
+class _DaemonRequestHandler(BaseHTTPRequestHandler):
+    """把 HTTP 请求转发给 WarmWorld"""
+
+    server_version = "ChunkResetterDaemon/1.0"
+
+    def _send_json(self, status: int, payload: Dict[str, Any]):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self) -> Dict[str, Any]:
+        length = int(self.headers.get("Content-Length") or 0)
+        if not length:
+            return {}
+        return json.loads(self.rfile.read(length).decode("utf-8"))
+
+    def do_GET(self):
+        if self.path != "/status":
+            self._send_json(404, {'error': f"未知的接口: {self.path}"})
+            return
+        self._send_json(200, self.server.warm_world.status())
+
+    def do_POST(self):
+        warm_world = self.server.warm_world
+        try:
+            params = self._read_json()
+            with warm_world.lock:
+                if self.path == "/preview":
+                    version_range = params.get('version_range')
+                    result = warm_world.preview(
+                        params.get('dimension', "minecraft:overworld"), int(params.get('search_range', 50)),
+                        int(params.get('extra_protection_distance', 0)),
+                        tuple(version_range) if version_range is not None else None)
+                elif self.path == "/census":
+                    search_range = params.get('search_range')
+                    result = warm_world.census(params.get('dimension'),
+                                               int(search_range) if search_range is not None else None,
+                                               int(params.get('extra_protection_distance', 0)))
+                elif self.path == "/sweep":
+                    version_range = params.get('version_range')
+                    result = warm_world.sweep(
+                        params.get('dimension', "minecraft:overworld"),
+                        [int(search_range) for search_range in params.get('search_ranges', [50])],
+                        int(params.get('max_margin', DEFAULT_MAX_MARGIN)),
+                        tuple(version_range) if version_range is not None else None)
+                elif self.path == "/chunk":
+                    result = warm_world.chunk_info(int(params['cx']), int(params['cz']),
+                                                   params.get('dimension', "minecraft:overworld"),
+                                                   bool(params.get('detail', False)),
+                                                   int(params.get('extra_protection_distance', 0)))
+                elif self.path == "/reload":
+                    warm_world.reload_index()
+                    result = warm_world.status()
+                elif self.path == "/shutdown":
+                    result = {'stopping': True}
+                    # shutdown() 会等待 serve_forever 返回，不能在处理请求的线程中直接调用
+                    threading.Thread(target=self.server.shutdown, daemon=True).start()
+                else:
+                    self._send_json(404, {'error': f"未知的接口: {self.path}"})
+                    return
+        except (KeyError, ValueError, TypeError) as e:
+            self._send_json(400, {'error': f"请求参数错误: {e}"})
+            return
+        except Exception as e:
+            self._send_json(500, {'error': f"{type(e).__name__}: {e}"})
+            return
+        self._send_json(200, result)
+
+    def log_message(self, format, *args):
+        print(f"[守护进程] {self.address_string()} {format % args}")
+
+
+def serve(warm_world: WarmWorld, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT):
+    """
+    在当前线程中运行守护进程，直到收到 /shutdown 请求或 Ctrl+C
+
+    Args:
+        warm_world (WarmWorld): 已加载的世界
+        host (str): 监听地址，默认只允许本机访问
+        port (int): 监听端口
+    """
+    server = ThreadingHTTPServer((host, port), _DaemonRequestHandler)
+    server.warm_world = warm_world
+    print(f"守护进程已启动: http://{host}:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print("守护进程已停止")
+
+
+class DaemonClient:
+    """守护进程的客户端"""
+
+    def __init__(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, timeout: float = DEFAULT_CLIENT_TIMEOUT):
+        """
+        Args:
+            host (str): 守护进程地址
+            port (int): 守护进程端口
+            timeout (float): 请求超时（秒）
+        """
+        self.base_url = f"http://{host}:{port}"
+        self.timeout = timeout
+
+    def _request(self, path: str, payload: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        data = json.dumps(payload).encode("utf-8") if payload is not None else None
+        request = urllib.request.Request(self.base_url + path, data=data,
+                                         headers={"Content-Type": "application/json"})
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return json.loads(response.read().decode("utf-8"))
+        except urllib.error.HTTPError as e:
+            try:
+                message = json.loads(e.read().decode("utf-8")).get('error')
+            except ValueError:
+                message = str(e)
+            raise DaemonError(message) from e
+        except (urllib.error.URLError, OSError) as e:
+            raise DaemonError(f"无法连接守护进程 {self.base_url}: {e}") from e
+
+    def is_running(self) -> bool:
+        """守护进程是否可以连接"""
+        try:
+            self.status()
+            return True
+        except DaemonError:
+            return False
+
+    def status(self) -> Dict[str, Any]:
+        return self._request("/status")
+
+    def preview(self, dimension: str = "minecraft:overworld", search_range: int = 50,
+                extra_protection_distance: int = 0, version_range: Optional[Tuple] = None) -> Dict[str, Any]:
+        return self._request("/preview", {
+            'dimension': dimension, 'search_range': search_range,
+            'extra_protection_distance': extra_protection_distance,
+            'version_range': list(version_range) if version_range is not None else None,
+        })
+
+    def census(self, dimension: Optional[str] = None, search_range: Optional[int] = None,
+               extra_protection_distance: int = 0) -> Dict[str, Any]:
+        return self._request("/census", {
+            'dimension': dimension, 'search_range': search_range,
+            'extra_protection_distance': extra_protection_distance,
+        })
+
+    def chunk_info(self, cx: int, cz: int, dimension: str = "minecraft:overworld", detail: bool = False,
+                   extra_protection_distance: int = 0) -> Dict[str, Any]:
+        return self._request("/chunk", {
+            'cx': cx, 'cz': cz, 'dimension': dimension, 'detail': detail,
+            'extra_protection_distance': extra_protection_distance,
+        })
+
+    def sweep(self, dimension: str = "minecraft:overworld", search_ranges=(50,), max_margin: int = DEFAULT_MAX_MARGIN,
+              version_range: Optional[Tuple] = None) -> Dict[str, Any]:
+        return self._request("/sweep", {
+            'dimension': dimension, 'search_ranges': list(search_ranges), 'max_margin': max_margin,
+            'version_range': list(version_range) if version_range is not None else None,
+        })
+
+    def reload(self) -> Dict[str, Any]:
+        return self._request("/reload", {})
+
+    def shutdown(self) -> Dict[str, Any]:
+        return self._request("/shutdown", {})
+
+
+def print_preview(preview: Dict[str, Any]):
+    """打印预览结果"""
+    print(f"预览 ({preview['dimension']}, 范围 {preview['search_range']}, "
+          f"额外保护距离 {preview['extra_protection_distance']}):")
+    print(f"  找到的区块数量: {preview['found_chunks']}")
+    print(f"  保留的区块数量: {preview['preserved_chunks']} (领地 {preview['land_chunks']}, "
+          f"额外保护 {preview['margin_chunks']}, 版本过滤 {preview['version_filtered_chunks']})")
+    print(f"  将重置的区块数量: {preview['reset_chunks']}, {preview['reset_bytes'] / 1024 / 1024:.2f} MB")
+    print(f"  耗时 {preview['elapsed_ms']:.1f} 毫秒")
+
+
+def main():
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="常驻守护进程：保持世界和索引已加载，提供预览、统计和区块查询")
+    parser.add_argument("--host", default=DEFAULT_HOST, help="守护进程地址")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="守护进程端口")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    serve_parser = subparsers.add_parser("serve", help="启动守护进程")
+    serve_parser.add_argument("world", help="Minecraft世界路径（服务器需关闭）")
+    serve_parser.add_argument("--land-db", help="领地数据库路径")
+    serve_parser.add_argument("--cache-dir", help="保护快照目录")
+
+    preview_parser = subparsers.add_parser("preview", help="预览重置结果")
+    preview_parser.add_argument("--dimension", default="minecraft:overworld", choices=sorted(DIMENSION_IDS))
+    preview_parser.add_argument("--range", type=int, dest="search_range", default=50, help="搜索范围（区块）")
+    preview_parser.add_argument("--extra", type=int, default=0, help="额外保护距离（区块）")
+    preview_parser.add_argument("--min-version", type=int, help="只重置版本不低于此值的区块")
+    preview_parser.add_argument("--max-version", type=int, help="只重置版本不高于此值的区块")
+    preview_parser.add_argument("--json", action="store_true", help="输出 JSON")
+
+    census_parser = subparsers.add_parser("census", help="存储空间统计")
+    census_parser.add_argument("--dimension", choices=sorted(DIMENSION_IDS), help="预览的维度")
+    census_parser.add_argument("--range", type=int, dest="search_range", help="预览的搜索范围（区块）")
+    census_parser.add_argument("--extra", type=int, default=0, help="额外保护距离（区块）")
+
+    sweep_parser = subparsers.add_parser("sweep", help="额外保护距离扫描")
+    sweep_parser.add_argument("--dimension", default="minecraft:overworld", choices=sorted(DIMENSION_IDS))
+    sweep_parser.add_argument("--range", type=int, nargs="+", dest="search_ranges", default=[50],
+                              help="一个或多个搜索范围（区块）")
+    sweep_parser.add_argument("--max-margin", type=int, default=DEFAULT_MAX_MARGIN, help="最大额外保护距离（区块）")
+
+    chunk_parser = subparsers.add_parser("chunk", help="查询单个区块")
+    chunk_parser.add_argument("cx", type=int)
+    chunk_parser.add_argument("cz", type=int)
+    chunk_parser.add_argument("--dimension", default="minecraft:overworld", choices=sorted(DIMENSION_IDS))
+    chunk_parser.add_argument("--extra", type=int, default=0, help="额外保护距离（区块）")
+    chunk_parser.add_argument("--detail", action="store_true", help="通过 amulet 读取区块的实体数量")
+
+    subparsers.add_parser("status", help="查看守护进程状态")
+    subparsers.add_parser("reload", help="重新构建区块索引")
+    subparsers.add_parser("stop", help="关闭守护进程")
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        warm_world = WarmWorld(args.world, args.land_db, args.cache_dir)
+        if not warm_world.load():
+            return
+        try:
+            serve(warm_world, args.host, args.port)
+        finally:
+            warm_world.close()
+        return
+
+    client = DaemonClient(args.host, args.port)
+    try:
+        if args.command == "preview":
+            version_range = None
+            if args.min_version is not None or args.max_version is not None:
+                version_range = (args.min_version, args.max_version)
+            preview = client.preview(args.dimension, args.search_range, args.extra, version_range)
+            if args.json:
+                print(json.dumps(preview, ensure_ascii=False, indent=2))
+            else:
+                print_preview(preview)
+        elif args.command == "census":
+            from world_census import print_census
+            print_census(client.census(args.dimension, args.search_range, args.extra))
+        elif args.command == "sweep":
+            print_sweep(client.sweep(args.dimension, args.search_ranges, args.max_margin))
+        elif args.command == "chunk":
+            print(json.dumps(client.chunk_info(args.cx, args.cz, args.dimension, args.detail, args.extra),
+                             ensure_ascii=False, indent=2))
+        elif args.command == "status":
+            print(json.dumps(client.status(), ensure_ascii=False, indent=2))
+        elif args.command == "reload":
+            print(json.dumps(client.reload(), ensure_ascii=False, indent=2))
+        elif args.command == "stop":
+            client.shutdown()
+            print("已通知守护进程关闭")
+    except DaemonError as e:
+        print(f"错误: {e}")
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+区块重置流水线
+
+原来的重置循环是严格串行的：读取一个区块、判断、删除，再处理下一个，磁盘 I/O 与计算从不重叠。
+本模块把一次重置拆成由有界队列连接的三个阶段：
+    读取线程  按数据库键顺序预读区块的原始记录（LevelDB 的读取与解压）
+    分类线程  按保护规则为每个区块做出保留/重置决策，并统计存储大小
+    提交阶段  在调用线程中按批取出决策，执行删除、写入存档和导出决策
+              （amulet 的世界对象不是线程安全的，只在这一阶段访问）
+队列满时上游阶段阻塞等待（背压）。预读的原始记录是流水线中主要的内存占用，除了队列长度，
+还可以限制尚未提交的预读记录的总字节数：超过上限时读取阶段等待提交阶段处理完一批。
+每个阶段的处理数量、等待输入和等待输出的时间、各队列的深度以及预读字节数的峰值都会被记录，
+便于在慢速磁盘上调整队列长度和批大小。
+
+Author: DEVILENMO
+"""
+
+import queue
+import threading
+import time
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+
+from bedrock_keys import iter_chunk_records
+from decision_export import DECISION_ERROR, REASON_LOAD_ERROR
+
+# 阶段结束标记
+_END = object()
+
+# 阻塞等待队列时检查取消标志的间隔（秒）
+_POLL_INTERVAL = 0.1
+
+
+class PipelineCancelled(Exception):
+    """流水线被提前结束（提交阶段出错或调用方停止迭代）"""
+
+
+class StageTimer:
+    """记录一个阶段的处理数量和等待时间"""
+
+    def __init__(self, name):
+        self.name = name
+        self.items = 0
+        self.busy_seconds = 0.0
+        self.wait_input_seconds = 0.0
+        self.wait_output_seconds = 0.0
+
+    def report(self):
+        """返回阶段统计"""
+        return {
+            'items': self.items,
+            'busy_seconds': round(self.busy_seconds, 3),
+            'wait_input_seconds': round(self.wait_input_seconds, 3),
+            'wait_output_seconds': round(self.wait_output_seconds, 3),
+        }
+
+
+class MonitoredQueue:
+    """记录深度的有界队列"""
+
+    def __init__(self, name, maxsize, stop_event):
+        self.name = name
+        self.maxsize = maxsize
+        self._queue = queue.Queue(maxsize)
+        self._stop_event = stop_event
+        self.max_depth = 0
+        self._depth_total = 0
+        self._depth_samples = 0
+
+    def depth(self):
+        """当前队列深度"""
+        return self._queue.qsize()
+
+    def put(self, item, timer):
+        """放入一项，队列满时阻塞（背压），等待时间记入 timer.wait_output_seconds"""
+        start = time.perf_counter()
+        while True:
+            if self._stop_event.is_set():
+                raise PipelineCancelled()
+            try:
+                self._queue.put(item, timeout=_POLL_INTERVAL)
+                break
+            except queue.Full:
+                continue
+        timer.wait_output_seconds += time.perf_counter() - start
+
+        depth = self._queue.qsize()
+        self._depth_total += depth
+        self._depth_samples += 1
+        if depth > self.max_depth:
+            self.max_depth = depth
+
+    def get(self, timer):
+        """取出一项，队列空时阻塞，等待时间记入 timer.wait_input_seconds"""
+        start = time.perf_counter()
+        while True:
+            if self._stop_event.is_set():
+                raise PipelineCancelled()
+            try:
+                item = self._queue.get(timeout=_POLL_INTERVAL)
+                break
+            except queue.Empty:
+                continue
+        timer.wait_input_seconds += time.perf_counter() - start
+        return item
+
+    def get_nowait(self):
+        """不阻塞地取出一项，队列为空时返回 None"""
+        try:
+            return self._queue.get_nowait()
+        except queue.Empty:
+            return None
+
+    def report(self):
+        """返回队列统计"""
+        return {
+            'max_size': self.maxsize,
+            'max_depth': self.max_depth,
+            'mean_depth': round(self._depth_total / self._depth_samples, 1) if self._depth_samples else 0.0,
+        }
+
+
+class ByteBudget:
+    """流水线中预读记录的字节数上限：读取阶段放入队列前申请，提交阶段处理完一批后归还"""
+
+    def __init__(self, max_bytes: Optional[int], stop_event):
+        """
+        Args:
+            max_bytes (int): 尚未提交的预读记录总字节数上限，None 表示不限制
+            stop_event (threading.Event): 流水线的停止标志
+        """
+        self.max_bytes = max_bytes
+        self.used_bytes = 0
+        self.peak_bytes = 0
+        self._condition = threading.Condition()
+        self._stop_event = stop_event
+
+    def acquire(self, size: int, timer):
+        """
+        申请 size 字节，超出上限时阻塞，等待时间记入 timer.wait_output_seconds
+        （没有其他未提交的记录时总是放行，单个超大的区块不会卡住流水线）
+        """
+        start = time.perf_counter()
+        with self._condition:
+            while self.max_bytes is not None and self.used_bytes and self.used_bytes + size > self.max_bytes:
+                if self._stop_event.is_set():
+                    raise PipelineCancelled()
+                self._condition.wait(_POLL_INTERVAL)
+            self.used_bytes += size
+            if self.used_bytes > self.peak_bytes:
+                self.peak_bytes = self.used_bytes
+        timer.wait_output_seconds += time.perf_counter() - start
+
+    def release(self, size: int):
+        """归还 size 字节"""
+        if not size:
+            return
+        with self._condition:
+            self.used_bytes -= size
+            self._condition.notify_all()
+
+    def report(self):
+        """返回字节数统计"""
+        return {'max_bytes': self.max_bytes, 'peak_bytes': self.peak_bytes}
+
+
+class ResetPipeline:
+    """读取 → 分类 → 提交 三阶段重置流水线"""
+
+    def __init__(self, db, dim_id: int, classify: Callable[..., Tuple[str, str, Optional[int]]],
+                 read_records: bool = True, queue_size: int = 256, batch_size: int = 64,
+                 max_queued_bytes: Optional[int] = None):
+        """
+        Args:
+            db: LevelDB 数据库对象
+            dim_id (int): 数据库中的维度ID
+            classify (callable): classify(cx, cz, *附加信息) -> (决策, 原因, 领地ID)，
+                                 附加信息为坐标元组中 cx, cz 之后的字段（例如区块版本号）
+            read_records (bool): 是否预读区块的原始记录（写入存档或导出存储大小时需要）
+            queue_size (int): 每个队列的最大长度
+            batch_size (int): 提交阶段每批最多处理的区块数量
+            max_queued_bytes (int): 尚未提交的预读记录总字节数上限（流水线的内存上限），None 表示只受队列长度限制
+        """
+        self.db = db
+        self.dim_id = dim_id
+        self.classify = classify
+        self.read_records = read_records
+        self.queue_size = max(1, queue_size)
+        self.batch_size = max(1, batch_size)
+
+        self._stop_event = threading.Event()
+        self._errors = []
+        self.read_queue = MonitoredQueue('read_queue', self.queue_size, self._stop_event)
+        self.decision_queue = MonitoredQueue('decision_queue', self.queue_size, self._stop_event)
+        self.budget = ByteBudget(max_queued_bytes, self._stop_event)
+        self.reader = StageTimer('reader')
+        self.classifier = StageTimer('classifier')
+        self.writer = StageTimer('writer')
+
+    def queue_depths(self) -> Tuple[int, int]:
+        """返回 (读取队列深度, 决策队列深度)，可在进度信息中实时显示"""
+        return self.read_queue.depth(), self.decision_queue.depth()
+
+    def _read_stage(self, coords: Iterable[tuple]):
+        """读取线程：按键顺序预读区块的原始记录"""
+        try:
+            for coord in coords:
+                cx, cz = coord[0], coord[1]
+                start = time.perf_counter()
+                records, error = None, None
+                if self.read_records:
+                    try:
+                        records = list(iter_chunk_records(self.db, cx, cz, self.dim_id))
+                    except Exception as e:
+                        error = e
+                self.reader.busy_seconds += time.perf_counter() - start
+                self.reader.items += 1
+                if records:
+                    self.budget.acquire(sum(len(key) + len(value) for key, value in records), self.reader)
+                self.read_queue.put((coord, records, error), self.reader)
+            self.read_queue.put(_END, self.reader)
+        except PipelineCancelled:
+            pass
+        except Exception as e:
+            self._fail(e)
+
+    def _classify_stage(self):
+        """分类线程：为每个区块做出决策"""
+        try:
+            while True:
+                item = self.read_queue.get(self.classifier)
+                if item is _END:
+                    break
+                start = time.perf_counter()
+                coord, records, error = item
+                cx, cz = coord[0], coord[1]
+                if error is not None:
+                    decision = (cx, cz, DECISION_ERROR, REASON_LOAD_ERROR, None, 0, None, error)
+                elif records is not None and not records:
+                    # 扫描之后区块已不存在
+                    decision = None
+                else:
+                    verdict, reason, land_id = self.classify(*coord)
+                    stored_bytes = sum(len(key) + len(value) for key, value in records) if records else 0
+                    decision = (cx, cz, verdict, reason, land_id, stored_bytes, records, None)
+                self.classifier.busy_seconds += time.perf_counter() - start
+                if decision is not None:
+                    self.classifier.items += 1
+                    self.decision_queue.put(decision, self.classifier)
+            self.decision_queue.put(_END, self.classifier)
+        except PipelineCancelled:
+            pass
+        except Exception as e:
+            self._fail(e)
+
+    def _fail(self, error):
+        """记录工作线程的异常并停止流水线"""
+        self._errors.append(error)
+        self._stop_event.set()
+
+    def run(self, coords: Iterable[tuple]) -> Iterator[List[tuple]]:
+        """
+        启动读取和分类线程，在调用线程中按批返回决策
+
+        Args:
+            coords (iterable): 要处理的区块坐标 (cx, cz, *附加信息)（按数据库键顺序）
+
+        Yields:
+            list: 一批决策 [(cx, cz, 决策, 原因, 领地ID, 存储字节数, 原始记录, 读取错误), ...]，
+                  未预读记录时原始记录为 None
+        """
+        threads = [
+            threading.Thread(target=self._read_stage, args=(coords,), name='reset-reader', daemon=True),
+            threading.Thread(target=self._classify_stage, name='reset-classifier', daemon=True),
+        ]
+        for thread in threads:
+            thread.start()
+
+        try:
+            finished = False
+            while not finished:
+                try:
+                    item = self.decision_queue.get(self.writer)
+                except PipelineCancelled:
+                    break
+                batch = []
+                while item is not None:
+                    if item is _END:
+                        finished = True
+                        break
+                    batch.append(item)
+                    if len(batch) >= self.batch_size:
+                        break
+                    item = self.decision_queue.get_nowait()
+                if batch:
+                    start = time.perf_counter()
+                    yield batch
+                    self.writer.busy_seconds += time.perf_counter() - start
+                    self.writer.items += len(batch)
+                    # 这一批的预读记录已处理完，归还字节数（分类阶段统计的存储字节数就是预读记录的大小）
+                    self.budget.release(sum(item[5] for item in batch if item[6]))
+        finally:
+            self._stop_event.set()
+            for thread in threads:
+                thread.join()
+
+        if self._errors:
+            raise self._errors[0]
+
+    def report(self, stats):
+        """把流水线的统计写入 stats['pipeline']"""
+        stats['pipeline'] = {
+            'queue_size': self.queue_size,
+            'batch_size': self.batch_size,
+            'reader': self.reader.report(),
+            'classifier': self.classifier.report(),
+            'writer': self.writer.report(),
+            'read_queue': self.read_queue.report(),
+            'decision_queue': self.decision_queue.report(),
+            'queued_bytes': self.budget.report(),
+        }
+
+
+def print_pipeline_stats(pipeline_stats):
+    """打印流水线各阶段的等待时间和队列深度"""
+    print(f"流水线统计 (队列长度 {pipeline_stats['queue_size']}, 批大小 {pipeline_stats['batch_size']}):")
+    for name, label in (('reader', '读取'), ('classifier', '分类'), ('writer', '提交')):
+        stage = pipeline_stats[name]
+        print(f"  {label}: {stage['items']} 项, 处理 {stage['busy_seconds']:.2f} 秒, "
+              f"等待输入 {stage['wait_input_seconds']:.2f} 秒, 等待输出 {stage['wait_output_seconds']:.2f} 秒")
+    for name, label in (('read_queue', '读取队列'), ('decision_queue', '决策队列')):
+        depth = pipeline_stats[name]
+        print(f"  {label}: 最大深度 {depth['max_depth']}/{depth['max_size']}, 平均深度 {depth['mean_depth']}")
+    queued = pipeline_stats['queued_bytes']
+    limit = f"{queued['max_bytes'] / 1024 / 1024:.1f} MB" if queued['max_bytes'] is not None else "不限"
+    print(f"  预读数据峰值: {queued['peak_bytes'] / 1024 / 1024:.1f} MB (上限 {limit})")
@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+重置引擎的运行遥测
+
+进度回调只提供 (current, total, message)，保存回调只提供 (chunk_index, chunk_count)，
+无法得知处理速度和剩余时间，加载世界和读取领地也没有任何进度。本模块提供一个线程安全的遥测对象：
+重置引擎在每个阶段（打开世界、读取领地、扫描、重置、保存、压缩）开始、推进和结束时更新它，
+GUI 和命令行可以在其他线程中随时轮询快照，显示当前阶段、处理速度（滑动窗口）、
+字节速度、预计剩余时间，以及每个阶段的耗时。
+
+Author: DEVILENMO
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Optional
+
+# 阶段名称
+PHASE_OPEN_WORLD = "open_world"
+PHASE_LOAD_LANDS = "load_lands"
+PHASE_SCAN = "scan"
+PHASE_RESET = "reset"
+PHASE_SAVE = "save"
+PHASE_COMPACT = "compact"
+
+PHASE_LABELS = {
+    PHASE_OPEN_WORLD: "打开世界",
+    PHASE_LOAD_LANDS: "读取领地",
+    PHASE_SCAN: "扫描区块",
+    PHASE_RESET: "重置区块",
+    PHASE_SAVE: "保存世界",
+    PHASE_COMPACT: "压缩数据库",
+}
+
+# 计算速度的滑动窗口（秒）和采样间隔（秒）
+RATE_WINDOW_SECONDS = 10.0
+SAMPLE_INTERVAL_SECONDS = 0.25
+
+# 保留的已结束阶段数量
+MAX_PHASE_HISTORY = 12
+
+
+class ResetTelemetry:
+    """线程安全的阶段遥测：引擎线程更新，其他线程通过 snapshot() 轮询"""
+
+    def __init__(self, window_seconds: float = RATE_WINDOW_SECONDS):
+        """
+        Args:
+            window_seconds (float): 计算速度使用的滑动窗口长度（秒）
+        """
+        self.window_seconds = window_seconds
+        self._lock = threading.Lock()
+        self._started = None
+        self._phase = None
+        self._phase_started = None
+        self._current = 0
+        self._total = None
+        self._bytes = 0
+        # 滑动窗口采样 (时间, 数量, 字节数)
+        self._samples = deque()
+        # 最近结束的阶段 [{'phase', 'elapsed_seconds', 'items', 'bytes'}, ...]
+        self._history = deque(maxlen=MAX_PHASE_HISTORY)
+
+    def begin_phase(self, phase: str, total: Optional[int] = None):
+        """
+        开始一个阶段（未结束的上一阶段会自动结束）
+
+        Args:
+            phase (str): 阶段名称，见 PHASE_LABELS
+            total (int): 本阶段的总数量，未知时为 None
+        """
+        now = time.perf_counter()
+        with self._lock:
+            self._finish_locked(now)
+            if self._started is None:
+                self._started = now
+            self._phase = phase
+            self._phase_started = now
+            self._current = 0
+            self._total = total
+            self._bytes = 0
+            self._samples.clear()
+            self._samples.append((now, 0, 0))
+
+    def update(self, current: Optional[int] = None, advance: int = 0, add_bytes: int = 0,
+               total: Optional[int] = None):
+        """
+        更新当前阶段的进度
+
+        Args:
+            current (int): 当前完成数量（绝对值），与 advance 二选一
+            advance (int): 新增完成数量
+            add_bytes (int): 新增处理的字节数
+            total (int): 更新总数量（例如保存时才知道总数）
+        """
+        now = time.perf_counter()
+        with self._lock:
+            if self._phase is None:
+                return
+            if current is not None:
+                self._current = current
+            else:
+                self._current += advance
+            self._bytes += add_bytes
+            if total is not None:
+                self._total = total
+            if now - self._samples[-1][0] >= SAMPLE_INTERVAL_SECONDS:
+                self._samples.append((now, self._current, self._bytes))
+                while len(self._samples) > 2 and now - self._samples[0][0] > self.window_seconds:
+                    self._samples.popleft()
+
+    def end_phase(self):
+        """结束当前阶段，记录耗时"""
+        with self._lock:
+            self._finish_locked(time.perf_counter())
+
+    def phase(self, phase: str, total: Optional[int] = None) -> "_PhaseContext":
+        """以 with 语句包裹一个阶段，退出时（包括异常）自动结束"""
+        return _PhaseContext(self, phase, total)
+
+    def _finish_locked(self, now):
+        if self._phase is None:
+            return
+        self._history.append({
+            'phase': self._phase,
+            'elapsed_seconds': round(now - self._phase_started, 3),
+            'items': self._current,
+            'bytes': self._bytes,
+        })
+        self._phase = None
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        获取当前状态的快照（可在任意线程调用）
+
+        Returns:
+            dict: {'phase', 'label', 'current', 'total', 'bytes', 'elapsed_seconds', 'phase_elapsed_seconds',
+                   'items_per_second', 'bytes_per_second', 'eta_seconds', 'phases'}，
+                  没有进行中的阶段时 phase 为 None；无法估算时 eta_seconds 为 None
+        """
+        now = time.perf_counter()
+        with self._lock:
+            items_per_second = bytes_per_second = 0.0
+            eta_seconds = None
+            if self._phase is not None:
+                start_time, start_items, start_bytes = self._samples[0]
+                span = now - start_time
+                if span > 0:
+                    items_per_second = (self._current - start_items) / span
+                    bytes_per_second = (self._bytes - start_bytes) / span
+                if self._total and items_per_second > 0:
+                    eta_seconds = max(0.0, (self._total - self._current) / items_per_second)
+            return {
+                'phase': self._phase,
+                'label': PHASE_LABELS.get(self._phase, self._phase),
+                'current': self._current,
+                'total': self._total,
+                'bytes': self._bytes,
+                'elapsed_seconds': round(now - self._started, 3) if self._started is not None else 0.0,
+                'phase_elapsed_seconds': round(now - self._phase_started, 3) if self._phase is not None else 0.0,
+                'items_per_second': round(items_per_second, 1),
+                'bytes_per_second': round(bytes_per_second, 1),
+                'eta_seconds': round(eta_seconds, 1) if eta_seconds is not None else None,
+                'phases': [dict(entry) for entry in self._history],
+            }
+
+
+class _PhaseContext:
+    """ResetTelemetry.phase 返回的上下文管理器"""
+
+    def __init__(self, telemetry, phase, total):
+        self.telemetry = telemetry
+        self.phase = phase
+        self.total = total
+
+    def __enter__(self):
+        self.telemetry.begin_phase(self.phase, self.total)
+        return self.telemetry
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.telemetry.end_phase()
+        return False
+
+
+def format_duration(seconds: Optional[float]) -> str:
+    """把秒数格式化为 时:分:秒"""
+    if seconds is None:
+        return "--:--"
+    seconds = int(seconds)
+    hours, remainder = divmod(seconds, 3600)
+    minutes, seconds = divmod(remainder, 60)
+    if hours:
+        return f"{hours}:{minutes:02d}:{seconds:02d}"
+    return f"{minutes:02d}:{seconds:02d}"
+
+
+def format_telemetry(snapshot: Dict[str, Any]) -> str:
+    """把遥测快照格式化为一行文字"""
+    if snapshot['phase'] is None:
+        return f"空闲 (总耗时 {format_duration(snapshot['elapsed_seconds'])})"
+    progress = f"{snapshot['current']}" + (f"/{snapshot['total']}" if snapshot['total'] else "")
+    text = f"{snapshot['label']}: {progress}, {snapshot['items_per_second']:.0f}/秒"
+    if snapshot['bytes_per_second']:
+        text += f", {snapshot['bytes_per_second'] / 1024 / 1024:.1f} MB/秒"
+    text += (f", 阶段耗时 {format_duration(snapshot['phase_elapsed_seconds'])}"
+             f", 剩余 {format_duration(snapshot['eta_seconds'])}"
+             f", 总耗时 {format_duration(snapshot['elapsed_seconds'])}")
+    return text
+
+
+def format_phase_summary(snapshot: Dict[str, Any]) -> str:
+    """把各阶段耗时格式化为一行文字"""
+    return ", ".join(f"{PHASE_LABELS.get(entry['phase'], entry['phase'])} {entry['elapsed_seconds']:.1f} 秒"
+                     for entry in snapshot['phases'])
+
+
+class ConsoleTelemetryReporter:
+    """在后台线程中定期把遥测打印到控制台（命令行模式使用）"""
+
+    def __init__(self, telemetry: ResetTelemetry, interval: float = 5.0):
+        """
+        Args:
+            telemetry (ResetTelemetry): 要轮询的遥测对象
+            interval (float): 打印间隔（秒）
+        """
+        self.telemetry = telemetry
+        self.interval = interval
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            snapshot = self.telemetry.snapshot()
+            if snapshot['phase'] is not None:
+                print(f"[进度] {format_telemetry(snapshot)}")
+
+    def start(self):
+        """启动后台打印线程"""
+        self._thread = threading.Thread(target=self._run, name="telemetry-reporter", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """停止后台打印线程"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+        return False
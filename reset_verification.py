@@ -0,0 +1,374 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+重置后的校验
+
+重置器通过 amulet 的内部接口删除区块，每次运行后需要确认两件事：
+    1. 受保护的区块一条记录都没有被修改
+    2. 被重置的区块在数据库中确实已经没有任何记录
+本模块在重置前顺序遍历一次数据库，为每个受保护区块的原始 LevelDB 记录（区块记录和实体摘要 digp）
+计算摘要并写入紧凑的摘要文件；保存世界后再顺序遍历一次，与摘要文件比较，同时检查被重置区块的键
+是否都已不存在。两次遍历都只读取原始记录，不经过 amulet 解码区块，比逐个 get_chunk 快得多。
+
+摘要文件格式：
+    文件头:   MAGIC(8) + 元数据长度(u32) + 元数据(JSON) + 对齐填充
+    区块键:   count 个 u64（见 protection_snapshot.pack_coord），升序
+    摘要:     count 个 16 字节摘要
+    记录数:   count 个 u32
+区块的摘要是其每条记录 blake2b 摘要的和（模 2^128），与记录的遍历顺序无关。
+
+使用方法：
+    # 重置前记录摘要（服务器需关闭）
+    python reset_verification.py capture path/to/world protected.dig --land-db plugins/ARCCore/database.db --extra 2
+
+    # 重置并保存后校验（可选提供被重置区块列表，每行 cx,cz）
+    python reset_verification.py verify path/to/world protected.dig --reset-list reset_chunks.txt
+
+Author: DEVILENMO
+"""
+
+import argparse
+import bisect
+import hashlib
+import json
+import os
+import struct
+import sys
+import time
+from array import array
+from typing import Any, Callable, Container, Dict, Iterable, List, Optional, Tuple
+
+from bedrock_keys import DIMENSION_IDS, parse_chunk_key, parse_digp_key
+from protection_snapshot import pack_coord, unpack_coord
+
+MAGIC = b"CRVDIG01"
+FORMAT_VERSION = 1
+HEADER_FORMAT = "<8sI"
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+DIGEST_SIZE = 16
+_DIGEST_MASK = (1 << (DIGEST_SIZE * 8)) - 1
+
+# 报告中每类问题最多列出的区块数量
+MAX_LISTED_CHUNKS = 20
+
+
+def _record_digest(key: bytes, value: bytes) -> int:
+    """一条记录的摘要（键长度 + 键 + 值）"""
+    digest = hashlib.blake2b(len(key).to_bytes(4, "little"), digest_size=DIGEST_SIZE)
+    digest.update(key)
+    digest.update(value)
+    return int.from_bytes(digest.digest(), "little")
+
+
+def _iter_dimension_records(db, dim_id: int) -> Iterable[Tuple[int, bytes, bytes]]:
+    """
+    顺序遍历数据库，返回指定维度中属于区块的记录（区块记录和 digp 记录）
+
+    Yields:
+        tuple: (打包后的区块坐标, 键, 值)
+    """
+    for key, value in db.iterate():
+        parsed = parse_chunk_key(key)
+        if parsed is None:
+            parsed = parse_digp_key(key)
+        if parsed is None or parsed[2] != dim_id:
+            continue
+        yield pack_coord(parsed[0], parsed[1]), key, value
+
+
+def compute_chunk_digests(db, dim_id: int, protected: Container[Tuple[int, int]],
+                          progress_callback: Optional[Callable[[int, int, str], None]] = None
+                          ) -> Tuple[array, List[int], array]:
+    """
+    一次顺序遍历计算受保护区块的摘要
+
+    Args:
+        db: LevelDB 数据库对象
+        dim_id (int): 数据库中的维度ID
+        protected: 受保护的区块坐标（集合或保护区块表）
+        progress_callback: 可选的进度回调函数，格式为 callback(current, total, message)
+
+    Returns:
+        tuple: (按坐标升序的区块键数组, 摘要列表, 记录数数组)，只包含数据库中存在的受保护区块
+    """
+    digests = {}
+    last_key = last_protected = None
+    records = 0
+    for packed, key, value in _iter_dimension_records(db, dim_id):
+        records += 1
+        if progress_callback and records % 100000 == 0:
+            progress_callback(records, 0, f"计算受保护区块摘要: 已读取 {records} 条记录")
+        # 同一区块的记录在键顺序上相邻，只判断一次是否受保护
+        if packed != last_key:
+            last_key = packed
+            last_protected = unpack_coord(packed) in protected
+        if not last_protected:
+            continue
+        entry = digests.get(packed)
+        if entry is None:
+            entry = digests[packed] = [0, 0]
+        entry[0] = (entry[0] + _record_digest(key, value)) & _DIGEST_MASK
+        entry[1] += 1
+
+    keys = array('Q', sorted(digests))
+    return keys, [digests[packed][0] for packed in keys], array('I', (digests[packed][1] for packed in keys))
+
+
+class DigestFile:
+    """受保护区块的摘要文件"""
+
+    def __init__(self, keys: array, digests: List[int], record_counts: array, metadata: Dict[str, Any]):
+        """
+        Args:
+            keys (array): 按坐标升序的区块键
+            digests (list): 与 keys 对应的摘要
+            record_counts (array): 与 keys 对应的记录数
+            metadata (dict): 元数据（维度、创建时间、世界路径等）
+        """
+        self.keys = keys
+        self.digests = digests
+        self.record_counts = record_counts
+        self.metadata = metadata
+
+    def __len__(self):
+        return len(self.keys)
+
+    def save(self, path: str) -> int:
+        """
+        写入摘要文件（先写临时文件再替换）
+
+        Returns:
+            int: 写入的字节数
+        """
+        metadata = dict(self.metadata, format_version=FORMAT_VERSION, count=len(self.keys))
+        meta_bytes = json.dumps(metadata, ensure_ascii=False).encode("utf-8")
+        keys, counts = array('Q', self.keys), array('I', self.record_counts)
+        if sys.byteorder != "little":
+            keys.byteswap()
+            counts.byteswap()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_path = path + ".tmp"
+        with open(temp_path, "wb") as f:
+            f.write(struct.pack(HEADER_FORMAT, MAGIC, len(meta_bytes)))
+            f.write(meta_bytes)
+            f.write(b"\0" * (-(HEADER_SIZE + len(meta_bytes)) % 8))
+            f.write(keys.tobytes())
+            f.write(b"".join(digest.to_bytes(DIGEST_SIZE, "little") for digest in self.digests))
+            f.write(counts.tobytes())
+            size = f.tell()
+        os.replace(temp_path, path)
+        return size
+
+    @classmethod
+    def load(cls, path: str) -> "DigestFile":
+        """
+        读取摘要文件
+
+        Raises:
+            ValueError: 不是摘要文件或版本不支持
+        """
+        with open(path, "rb") as f:
+            magic, meta_length = struct.unpack(HEADER_FORMAT, f.read(HEADER_SIZE))
+            if magic != MAGIC:
+                raise ValueError(f"不是区块摘要文件: {path}")
+            metadata = json.loads(f.read(meta_length).decode("utf-8"))
+            if metadata.get('format_version') != FORMAT_VERSION:
+                raise ValueError(f"不支持的摘要文件版本: {metadata.get('format_version')}")
+            f.read(-(HEADER_SIZE + meta_length) % 8)
+            count = metadata['count']
+            keys = array('Q')
+            keys.frombytes(f.read(count * 8))
+            digest_bytes = f.read(count * DIGEST_SIZE)
+            counts = array('I')
+            counts.frombytes(f.read(count * 4))
+        if len(keys) != count or len(counts) != count or len(digest_bytes) != count * DIGEST_SIZE:
+            raise ValueError(f"摘要文件不完整: {path}")
+        if sys.byteorder != "little":
+            keys.byteswap()
+            counts.byteswap()
+        digests = [int.from_bytes(digest_bytes[index:index + DIGEST_SIZE], "little")
+                   for index in range(0, len(digest_bytes), DIGEST_SIZE)]
+        return cls(keys, digests, counts, metadata)
+
+
+def capture_protected_digests(db, dimension: str, protected: Container[Tuple[int, int]], path: str,
+                              world_path: Optional[str] = None,
+                              progress_callback: Optional[Callable[[int, int, str], None]] = None) -> DigestFile:
+    """
+    重置前记录受保护区块的摘要并写入摘要文件
+
+    Args:
+        db: LevelDB 数据库对象
+        dimension (str): 维度名称
+        protected: 受保护的区块坐标（集合或保护区块表）
+        path (str): 摘要文件路径
+        world_path (str): 世界路径（只写入元数据）
+        progress_callback: 可选的进度回调函数，格式为 callback(current, total, message)
+
+    Returns:
+        DigestFile: 摘要
+    """
+    start = time.perf_counter()
+    dim_id = DIMENSION_IDS.get(dimension, 0)
+    keys, digests, counts = compute_chunk_digests(db, dim_id, protected, progress_callback)
+    digest_file = DigestFile(keys, digests, counts, {
+        'dimension': dimension,
+        'world': world_path,
+        'created': time.strftime("%Y-%m-%d %H:%M:%S"),
+    })
+    size = digest_file.save(path)
+    print(f"已记录 {len(keys)} 个受保护区块的摘要 ({sum(counts)} 条记录)，"
+          f"摘要文件 {size / 1024:.1f} KB，耗时 {time.perf_counter() - start:.1f} 秒")
+    return digest_file
+
+
+def verify_reset(db, digest_file: DigestFile, reset_chunks: Iterable[int],
+                 progress_callback: Optional[Callable[[int, int, str], None]] = None) -> Dict[str, Any]:
+    """
+    保存世界后校验：受保护区块的记录与摘要一致，被重置区块没有残留记录
+
+    Args:
+        db: LevelDB 数据库对象
+        digest_file (DigestFile): 重置前记录的摘要
+        reset_chunks (iterable): 被重置区块的打包坐标（见 protection_snapshot.pack_coord）
+        progress_callback: 可选的进度回调函数，格式为 callback(current, total, message)
+
+    Returns:
+        dict: {'ok', 'protected_checked', 'modified', 'missing', 'reset_checked', 'reset_residue',
+               'residue_records', 'elapsed_seconds'}，modified / missing / reset_residue 为区块坐标列表
+    """
+    start = time.perf_counter()
+    dim_id = DIMENSION_IDS.get(digest_file.metadata.get('dimension'), 0)
+    protected_keys = digest_file.keys
+    reset_keys = array('Q', sorted(set(reset_chunks)))
+    after_digests = [0] * len(protected_keys)
+    after_counts = [0] * len(protected_keys)
+    residue = {}
+
+    last_key = None
+    target = -1
+    records = 0
+    for packed, key, value in _iter_dimension_records(db, dim_id):
+        records += 1
+        if progress_callback and records % 100000 == 0:
+            progress_callback(records, 0, f"校验重置结果: 已读取 {records} 条记录")
+        if packed != last_key:
+            last_key = packed
+            index = bisect.bisect_left(protected_keys, packed)
+            if index < len(protected_keys) and protected_keys[index] == packed:
+                target = index
+            else:
+                index = bisect.bisect_left(reset_keys, packed)
+                target = -2 if index < len(reset_keys) and reset_keys[index] == packed else -1
+        if target >= 0:
+            after_digests[target] = (after_digests[target] + _record_digest(key, value)) & _DIGEST_MASK
+            after_counts[target] += 1
+        elif target == -2:
+            residue[packed] = residue.get(packed, 0) + 1
+
+    modified, missing = [], []
+    for index, packed in enumerate(protected_keys):
+        if after_counts[index] == 0:
+            missing.append(unpack_coord(packed))
+        elif (after_digests[index] != digest_file.digests[index]
+              or after_counts[index] != digest_file.record_counts[index]):
+            modified.append(unpack_coord(packed))
+
+    result = {
+        'ok': not modified and not missing and not residue,
+        'protected_checked': len(protected_keys),
+        'modified': modified,
+        'missing': missing,
+        'reset_checked': len(reset_keys),
+        'reset_residue': [unpack_coord(packed) for packed in sorted(residue)],
+        'residue_records': sum(residue.values()),
+        'elapsed_seconds': round(time.perf_counter() - start, 3),
+    }
+    return result
+
+
+def print_verification_report(result: Dict[str, Any]):
+    """打印校验结果"""
+    print("重置结果校验:")
+    print(f"  受保护区块: 检查 {result['protected_checked']} 个, 被修改 {len(result['modified'])} 个, "
+          f"被删除 {len(result['missing'])} 个")
+    print(f"  被重置区块: 检查 {result['reset_checked']} 个, 仍有记录 {len(result['reset_residue'])} 个 "
+          f"({result['residue_records']} 条记录)")
+    for label, coords in (("被修改的受保护区块", result['modified']),
+                          ("被删除的受保护区块", result['missing']),
+                          ("仍有记录的重置区块", result['reset_residue'])):
+        if coords:
+            listed = ", ".join(f"({cx}, {cz})" for cx, cz in coords[:MAX_LISTED_CHUNKS])
+            more = f" 等 {len(coords)} 个" if len(coords) > MAX_LISTED_CHUNKS else ""
+            print(f"  {label}: {listed}{more}")
+    print(f"  校验{'通过' if result['ok'] else '失败'}，耗时 {result['elapsed_seconds']:.1f} 秒")
+
+
+def save_verification_report(result: Dict[str, Any], path: str):
+    """把校验结果保存为 JSON"""
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+
+
+def _read_reset_list(path: str) -> List[int]:
+    """读取被重置区块列表（每行 cx,cz）"""
+    reset_chunks = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                cx, cz = map(int, line.split(","))
+                reset_chunks.append(pack_coord(cx, cz))
+    return reset_chunks
+
+
+def main():
+    """命令行入口"""
+    from leveldb import LevelDB
+    from world_compaction import get_db_directory
+
+    parser = argparse.ArgumentParser(description="重置前记录受保护区块的摘要，重置后校验")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    capture_parser = subparsers.add_parser("capture", help="重置前记录受保护区块的摘要")
+    capture_parser.add_argument("world", help="Minecraft世界路径（服务器需关闭）")
+    capture_parser.add_argument("digest", help="摘要文件路径")
+    capture_parser.add_argument("--land-db", required=True, help="领地数据库路径")
+    capture_parser.add_argument("--dimension", default="minecraft:overworld", choices=sorted(DIMENSION_IDS),
+                                help="维度")
+    capture_parser.add_argument("--extra", type=int, default=0, help="额外保护距离（区块）")
+
+    verify_parser = subparsers.add_parser("verify", help="重置并保存后校验")
+    verify_parser.add_argument("world", help="Minecraft世界路径（服务器需关闭）")
+    verify_parser.add_argument("digest", help="重置前记录的摘要文件路径")
+    verify_parser.add_argument("--reset-list", help="被重置区块列表（每行 cx,cz），提供时检查这些区块没有残留记录")
+    verify_parser.add_argument("--report", help="把校验结果保存为 JSON")
+    args = parser.parse_args()
+
+    db = LevelDB(get_db_directory(args.world))
+    try:
+        if args.command == "capture":
+            from land_data_reader import LandDataReader
+            from protection_model import ProtectionModel
+            from protection_snapshot import DEFAULT_SNAPSHOT_DIR
+            model = ProtectionModel(LandDataReader(args.land_db), snapshot_dir=DEFAULT_SNAPSHOT_DIR)
+            protected = model.get_protection_map(args.dimension, args.extra)
+            capture_protected_digests(db, args.dimension, protected, args.digest, world_path=args.world)
+        else:
+            reset_chunks = _read_reset_list(args.reset_list) if args.reset_list else []
+            result = verify_reset(db, DigestFile.load(args.digest), reset_chunks)
+            print_verification_report(result)
+            if args.report:
+                save_verification_report(result, args.report)
+                print(f"校验结果已保存到: {args.report}")
+            if not result['ok']:
+                sys.exit(1)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
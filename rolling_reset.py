@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+滚动重置（分多个维护窗口完成大范围重置）
+
+大范围重置在一次停服窗口内做不完时，可以使用滚动模式：
+    1. 第一次运行时扫描搜索范围，生成本轮的重置计划（所有不受保护的区块，按优先级排序），
+       计划以紧凑的二进制文件保存在游标文件旁边
+    2. 每次运行从游标位置继续，在时间、区块数量或字节数预算内重置尽可能多的区块，
+       保存世界成功后才推进游标
+    3. 计划全部处理完后，下一次运行开始新的一轮
+
+时间预算包含保存世界的时间：每次运行都会记录每个区块的平均保存耗时，下次运行据此为保存预留时间，
+保证整次运行不超过预算。执行时会按最新的领地数据重新检查每个区块，计划生成后被圈地的区块不会被重置。
+
+优先级：
+    key       按数据库键顺序（磁盘访问最快）
+    largest   存储占用最大的区块优先（尽快回收空间）
+    farthest  离领地最远的区块优先（最不可能有玩家建筑的区域先处理）
+
+使用方法：
+    python rolling_reset.py path/to/world --land-db plugins/ARCCore/database.db --range 3000 \\
+        --cursor rolling.json --order farthest --max-minutes 20 --execute
+
+Author: DEVILENMO
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from array import array
+from typing import Any, Container, Dict, List, Optional, Tuple
+
+from bedrock_keys import parse_chunk_key, iter_chunk_coords
+from chunk_index import land_distances
+
+ORDER_KEY = "key"
+ORDER_LARGEST = "largest"
+ORDER_FARTHEST = "farthest"
+ORDERS = (ORDER_KEY, ORDER_LARGEST, ORDER_FARTHEST)
+
+# 还没有测量数据时，每个区块预留的保存时间（秒）
+DEFAULT_SAVE_SECONDS_PER_CHUNK = 0.01
+
+# 计划文件的扩展名（与游标文件同名）
+PLAN_SUFFIX = ".plan"
+
+
+class RollingCursor:
+    """滚动重置的游标：本轮计划的参数、处理位置和历次运行记录"""
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path (str): 游标文件路径（JSON），计划保存在 <path>.plan
+        """
+        self.path = path
+        self.plan_path = path + PLAN_SUFFIX
+        self.state = {
+            'params': None,
+            'position': 0,
+            'total': 0,
+            'cycle': 0,
+            'cycle_started': None,
+            'save_seconds_per_chunk': None,
+            'runs': [],
+        }
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self.state.update(json.load(f))
+
+    @property
+    def position(self) -> int:
+        return self.state['position']
+
+    @property
+    def total(self) -> int:
+        return self.state['total']
+
+    def needs_new_plan(self, params: Dict[str, Any]) -> bool:
+        """没有计划、参数改变或本轮已完成时需要生成新计划"""
+        if self.state['params'] != params or not os.path.exists(self.plan_path):
+            return True
+        return self.state['position'] >= self.state['total']
+
+    def start_cycle(self, params: Dict[str, Any], plan: array):
+        """保存新一轮的计划并把游标移到开头"""
+        _write_atomic(self.plan_path, plan.tobytes())
+        self.state['params'] = params
+        self.state['position'] = 0
+        self.state['total'] = len(plan) // 2
+        self.state['cycle'] += 1
+        self.state['cycle_started'] = time.strftime("%Y-%m-%d %H:%M:%S")
+        self.save()
+
+    def load_plan(self) -> array:
+        """读取本轮计划（交替存放 cx, cz 的数组）"""
+        plan = array('i')
+        with open(self.plan_path, "rb") as f:
+            plan.frombytes(f.read())
+        return plan
+
+    def save_seconds_per_chunk(self) -> float:
+        """每个区块的预计保存耗时"""
+        return self.state['save_seconds_per_chunk'] or DEFAULT_SAVE_SECONDS_PER_CHUNK
+
+    def record_run(self, position: int, run: Dict[str, Any]):
+        """记录一次成功的运行并推进游标"""
+        self.state['position'] = position
+        if run['reset_chunks'] > 0 and run['save_seconds'] is not None:
+            self.state['save_seconds_per_chunk'] = run['save_seconds'] / run['reset_chunks']
+        self.state['runs'].append(run)
+        self.save()
+
+    def save(self):
+        """原子地写入游标文件"""
+        _write_atomic(self.path, json.dumps(self.state, ensure_ascii=False, indent=2).encode("utf-8"))
+
+
+def _write_atomic(path: str, data: bytes):
+    """先写临时文件再替换，避免中断时留下损坏的文件"""
+    temp_path = path + ".tmp"
+    with open(temp_path, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+
+
+def collect_chunk_sizes(db, dim_id: int, search_range: int) -> Dict[Tuple[int, int], int]:
+    """
+    一次流式遍历统计搜索范围内每个区块记录的存储字节数（不含实体记录）
+
+    Returns:
+        dict: {(cx, cz): 字节数}
+    """
+    sizes = {}
+    for key, value in db.iterate():
+        parsed = parse_chunk_key(key)
+        if parsed is None or parsed[2] != dim_id:
+            continue
+        cx, cz = parsed[0], parsed[1]
+        if abs(cx) > search_range or abs(cz) > search_range:
+            continue
+        sizes[(cx, cz)] = sizes.get((cx, cz), 0) + len(key) + len(value)
+    return sizes
+
+
+def build_plan(db, dim_id: int, search_range: int, protected_chunks: Container[Tuple[int, int]], order: str,
+               land_rects: Optional[List[Tuple[int, int, int, int, int]]] = None) -> array:
+    """
+    生成一轮滚动重置的计划：搜索范围内所有存在且不受保护的区块，按优先级排序
+
+    Args:
+        db: LevelDB 数据库对象
+        dim_id (int): 数据库中的维度ID
+        search_range (int): 搜索范围（区块）
+        protected_chunks (set): 受保护的区块坐标（集合或保护区块表）
+        order (str): 优先级，见 ORDERS
+        land_rects (list): 领地区块矩形，order 为 farthest 时使用
+
+    Returns:
+        array: 交替存放 cx, cz 的紧凑数组
+    """
+    if order not in ORDERS:
+        raise ValueError(f"不支持的优先级: {order}，可选: {', '.join(ORDERS)}")
+
+    if order == ORDER_LARGEST:
+        sizes = collect_chunk_sizes(db, dim_id, search_range)
+        coords = [coord for coord in iter_chunk_coords(db, dim_id, search_range) if coord not in protected_chunks]
+        # 按大小降序，同样大小时保持键顺序
+        coords.sort(key=lambda coord: -sizes.get(coord, 0))
+    elif order == ORDER_FARTHEST:
+        coords = [coord for coord in iter_chunk_coords(db, dim_id, search_range) if coord not in protected_chunks]
+        distances = land_distances([cx for cx, _ in coords], [cz for _, cz in coords], land_rects or []).tolist()
+        ranked = sorted(range(len(coords)), key=lambda index: -distances[index])
+        coords = [coords[index] for index in ranked]
+    else:
+        coords = [coord for coord in iter_chunk_coords(db, dim_id, search_range) if coord not in protected_chunks]
+
+    plan = array('i')
+    for cx, cz in coords:
+        plan.append(cx)
+        plan.append(cz)
+    return plan
+
+
+def main():
+    """命令行入口"""
+    from ChunkAutoResetter import ChunkAutoResetter
+
+    parser = argparse.ArgumentParser(description="滚动重置（按预算分多次完成）")
+    parser.add_argument("world", help="Minecraft世界路径（服务器需关闭）")
+    parser.add_argument("--land-db", help="领地数据库路径")
+    parser.add_argument("--cursor", default="rolling_reset.json", help="游标文件路径")
+    parser.add_argument("--dimension", default="minecraft:overworld", help="维度")
+    parser.add_argument("--range", type=int, dest="search_range", default=50, help="搜索范围（区块）")
+    parser.add_argument("--extra", type=int, default=0, help="额外保护距离（区块）")
+    parser.add_argument("--order", choices=ORDERS, default=ORDER_KEY, help="重置优先级")
+    parser.add_argument("--max-minutes", type=float, help="本次运行的时间预算（分钟，含保存）")
+    parser.add_argument("--max-chunks", type=int, help="本次最多重置的区块数量")
+    parser.add_argument("--max-mb", type=float, help="本次最多重置的存储量（MB）")
+    parser.add_argument("--archive", help="撤销存档路径")
+    parser.add_argument("--execute", action="store_true", help="实际执行（默认只试运行，不推进游标）")
+    args = parser.parse_args()
+    if args.execute and not args.land_db:
+        parser.error("实际执行需要 --land-db，拒绝在没有任何保护的情况下重置")
+
+    # 时间预算从加载世界之前开始计算
+    started_at = time.time()
+    resetter = ChunkAutoResetter(args.world, args.land_db)
+    if not resetter.load_world():
+        sys.exit(1)
+    try:
+        stats = resetter.reset_chunks_rolling(
+            args.cursor,
+            dimension=args.dimension,
+            search_range=args.search_range,
+            extra_protection_distance=args.extra,
+            order=args.order,
+            max_seconds=args.max_minutes * 60 if args.max_minutes else None,
+            max_chunks=args.max_chunks,
+            max_bytes=int(args.max_mb * 1024 * 1024) if args.max_mb else None,
+            dry_run=not args.execute,
+            archive_path=args.archive,
+            started_at=started_at,
+        )
+    finally:
+        resetter.close_world()
+    if stats is None:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+世界存储统计（普查）
+
+在选择重置范围之前，先弄清楚磁盘空间花在了哪里。本工具对 level.db 做一次流式遍历，
+只看键和值的长度，不解码任何区块，即使是非常大的世界也能在很短时间内完成。统计内容：
+    - 每个维度的区块数量和存储字节数
+    - 每个 32×32 区块的区域（region）的区块数量和存储字节数
+    - 每种记录类型（SubChunkPrefix、BlockEntity、实体等）的记录数量和字节数
+    - 按给定的预览参数（维度、搜索范围、保护区块）重置时可以回收的字节数
+
+实体记录（actorprefix）通过区块的 digp 摘要归属到区块。统计结果可以保存为 JSON，
+GUI 中以热力图显示。
+
+使用方法：
+    python world_census.py path/to/world --json census.json
+    python world_census.py path/to/world --range 750 --land-db plugins/ARCCore/database.db --extra 2
+
+Author: DEVILENMO
+"""
+
+import argparse
+import json
+import time
+from typing import Any, Container, Dict, Optional, Tuple
+
+from bedrock_keys import (
+    ACTOR_PREFIX, DIMENSION_IDS, DIMENSION_NAMES, TAG_NAMES, VERSION_TAGS,
+    parse_chunk_key, parse_digp_key, split_actor_ids
+)
+
+# 区域边长（区块）
+REGION_SIZE = 32
+REGION_SHIFT = 5
+
+# 不属于区块的记录类型
+RECORD_TYPE_DIGEST = "ActorDigest"
+RECORD_TYPE_ACTOR = "Actor"
+RECORD_TYPE_OTHER = "Other"
+
+
+def run_census(db, preview_dimension: Optional[str] = None, search_range: Optional[int] = None,
+               protected_chunks: Optional[Container[Tuple[int, int]]] = None,
+               progress_callback=None) -> Dict[str, Any]:
+    """
+    流式遍历数据库，统计存储空间的分布
+
+    Args:
+        db: LevelDB 数据库对象
+        preview_dimension (str): 预览的维度，提供时统计按预览参数重置可回收的字节数
+        search_range (int): 预览的搜索范围（区块），None 表示整个维度
+        protected_chunks (set): 预览时受保护的区块坐标（集合或保护区块表）
+        progress_callback: 可选的进度回调函数，格式为 callback(current, total, message)，total 为 0（总数未知）
+
+    Returns:
+        dict: 可以直接保存为 JSON 的统计结果
+    """
+    start_time = time.time()
+    protected_chunks = protected_chunks or set()
+    preview_dim_id = DIMENSION_IDS.get(preview_dimension) if preview_dimension else None
+
+    total_keys = 0
+    total_bytes = 0
+    dimensions = {}
+    record_types = {}
+    regions = {}
+    # 实体记录的键排在 digp 之前，先记下每个实体的大小，遇到 digp 时再归属到区块
+    actor_sizes = {}
+    digests = []
+    reclaim = {'chunks': 0, 'bytes': 0}
+
+    def add_record_type(name, size):
+        entry = record_types.setdefault(name, {'records': 0, 'bytes': 0})
+        entry['records'] += 1
+        entry['bytes'] += size
+
+    def add_chunk_bytes(dim_id, cx, cz, size, is_chunk=False):
+        dimension = dimensions.setdefault(dim_id, {'chunks': 0, 'bytes': 0})
+        region = regions.setdefault((dim_id, cx >> REGION_SHIFT, cz >> REGION_SHIFT), [0, 0])
+        dimension['bytes'] += size
+        region[1] += size
+        if is_chunk:
+            dimension['chunks'] += 1
+            region[0] += 1
+        if dim_id == preview_dim_id and (cx, cz) not in protected_chunks and (
+                search_range is None or (abs(cx) <= search_range and abs(cz) <= search_range)):
+            reclaim['bytes'] += size
+            if is_chunk:
+                reclaim['chunks'] += 1
+
+    last_version_chunk = None
+    for key, value in db.iterate():
+        size = len(key) + len(value)
+        total_keys += 1
+        total_bytes += size
+        if progress_callback and total_keys % 100000 == 0:
+            progress_callback(total_keys, 0, f"已统计 {total_keys} 条记录...")
+
+        parsed = parse_chunk_key(key)
+        if parsed is not None:
+            cx, cz, dim_id, tag, _ = parsed
+            # 同一区块可能同时有新旧两种版本记录，只计一次
+            is_chunk = tag in VERSION_TAGS and (dim_id, cx, cz) != last_version_chunk
+            if is_chunk:
+                last_version_chunk = (dim_id, cx, cz)
+            add_record_type(TAG_NAMES.get(tag, str(tag)), size)
+            add_chunk_bytes(dim_id, cx, cz, size, is_chunk)
+            continue
+
+        if key.startswith(ACTOR_PREFIX):
+            add_record_type(RECORD_TYPE_ACTOR, size)
+            actor_sizes[key[len(ACTOR_PREFIX):]] = size
+            continue
+
+        digest = parse_digp_key(key)
+        if digest is not None:
+            add_record_type(RECORD_TYPE_DIGEST, size)
+            digests.append((digest, size, value))
+            continue
+
+        add_record_type(RECORD_TYPE_OTHER, size)
+
+    # 把实体摘要及其引用的实体记录归属到区块
+    for (cx, cz, dim_id), size, value in digests:
+        for actor_id in split_actor_ids(value):
+            size += actor_sizes.pop(actor_id, 0)
+        add_chunk_bytes(dim_id, cx, cz, size)
+
+    result = {
+        'total_keys': total_keys,
+        'total_bytes': total_bytes,
+        'elapsed_seconds': round(time.time() - start_time, 3),
+        'region_size': REGION_SIZE,
+        'dimensions': {
+            DIMENSION_NAMES.get(dim_id, str(dim_id)): entry for dim_id, entry in sorted(dimensions.items())
+        },
+        'record_types': dict(sorted(record_types.items(), key=lambda item: -item[1]['bytes'])),
+        'regions': [
+            {'dimension': DIMENSION_NAMES.get(dim_id, str(dim_id)), 'rx': rx, 'rz': rz,
+             'chunks': chunks, 'bytes': size}
+            for (dim_id, rx, rz), (chunks, size) in sorted(regions.items())
+        ],
+        # 没有被任何 digp 引用的实体记录（孤立实体）
+        'unreferenced_actor_bytes': sum(actor_sizes.values()),
+        'preview': None,
+    }
+    if preview_dimension:
+        result['preview'] = {
+            'dimension': preview_dimension,
+            'search_range': search_range,
+            'protected_chunks': len(protected_chunks),
+            'reclaimable_chunks': reclaim['chunks'],
+            'reclaimable_bytes': reclaim['bytes'],
+        }
+    return result
+
+
+def save_census(census: Dict[str, Any], path: str):
+    """把统计结果保存为 JSON"""
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(census, f, ensure_ascii=False, indent=2)
+
+
+def print_census(census: Dict[str, Any], top_regions: int = 10):
+    """打印统计摘要"""
+    mb = 1024 * 1024
+    print(f"共 {census['total_keys']} 条记录, {census['total_bytes'] / mb:.2f} MB "
+          f"(耗时 {census['elapsed_seconds']:.1f} 秒)")
+    print("按维度:")
+    for name, entry in census['dimensions'].items():
+        print(f"  {name}: {entry['chunks']} 个区块, {entry['bytes'] / mb:.2f} MB")
+    print("按记录类型:")
+    for name, entry in census['record_types'].items():
+        print(f"  {name}: {entry['records']} 条, {entry['bytes'] / mb:.2f} MB")
+    print(f"占用最多的 {top_regions} 个区域 ({census['region_size']}×{census['region_size']} 区块):")
+    for region in sorted(census['regions'], key=lambda item: -item['bytes'])[:top_regions]:
+        print(f"  {region['dimension']} 区域 ({region['rx']}, {region['rz']}): "
+              f"{region['chunks']} 个区块, {region['bytes'] / mb:.2f} MB")
+    if census['unreferenced_actor_bytes']:
+        print(f"孤立实体记录: {census['unreferenced_actor_bytes'] / mb:.2f} MB")
+    preview = census['preview']
+    if preview:
+        range_text = "整个维度" if preview['search_range'] is None else f"±{preview['search_range']}"
+        print(f"预览 ({preview['dimension']}, {range_text}, 保护 {preview['protected_chunks']} 个区块): "
+              f"可回收 {preview['reclaimable_chunks']} 个区块, {preview['reclaimable_bytes'] / mb:.2f} MB")
+
+
+def main():
+    """命令行入口"""
+    from leveldb import LevelDB
+    from world_compaction import get_db_directory
+
+    parser = argparse.ArgumentParser(description="世界存储统计")
+    parser.add_argument("world", help="Minecraft世界路径（服务器需关闭）")
+    parser.add_argument("--json", dest="json_path", help="把统计结果保存为 JSON")
+    parser.add_argument("--dimension", default="minecraft:overworld", choices=sorted(DIMENSION_IDS),
+                        help="预览的维度")
+    parser.add_argument("--range", type=int, dest="search_range", help="预览的搜索范围（区块）")
+    parser.add_argument("--land-db", help="领地数据库路径，提供时按领地保护计算可回收空间")
+    parser.add_argument("--extra", type=int, default=0, help="额外保护距离（区块）")
+    args = parser.parse_args()
+
+    protected_chunks = set()
+    if args.land_db:
+        from land_data_reader import LandDataReader
+        from protection_model import ProtectionModel
+        from protection_snapshot import DEFAULT_SNAPSHOT_DIR
+        model = ProtectionModel(LandDataReader(args.land_db), snapshot_dir=DEFAULT_SNAPSHOT_DIR)
+        protected_chunks = model.get_protection_map(args.dimension, args.extra)
+
+    db = LevelDB(get_db_directory(args.world))
+    try:
+        census = run_census(db, args.dimension, args.search_range, protected_chunks,
+                            progress_callback=lambda current, total, message: print(message))
+    finally:
+        db.close()
+
+    print_census(census)
+    if args.json_path:
+        save_census(census, args.json_path)
+        print(f"统计结果已保存到: {args.json_path}")
+
+
+if __name__ == "__main__":
+    main()
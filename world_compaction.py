@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+基岩版世界 LevelDB 压缩工具
+
+大量删除区块后，删除标记（tombstone）会一直留在 level.db 中，直到服务器自行压缩，
+世界占用的磁盘空间不会减少，重置后第一次启动服务器也会很慢。
+本工具对数据库执行压缩，回收磁盘空间，并报告压缩前后的大小。
+
+使用方法：
+    # 单独对一个世界执行压缩（服务器需处于关闭状态）
+    python world_compaction.py path/to/world
+
+    # 在代码中使用
+    from world_compaction import compact_world_directory
+    stats = compact_world_directory("path/to/world")
+
+Author: DEVILENMO
+"""
+
+import os
+import sys
+import time
+from typing import Dict, Iterable, Optional, Tuple, Any
+
+
+def get_db_directory(world_path: str) -> str:
+    """获取世界的 LevelDB 目录路径"""
+    return os.path.join(world_path, "db")
+
+
+def get_directory_size(path: str) -> int:
+    """
+    统计目录下所有文件的总字节数
+
+    Args:
+        path (str): 目录路径
+
+    Returns:
+        int: 总字节数
+    """
+    total = 0
+    for root, _, files in os.walk(path):
+        for file_name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, file_name))
+            except OSError:
+                # 压缩过程中文件可能被删除
+                pass
+    return total
+
+
+def compact_db(db, db_dir: str, key_ranges: Optional[Iterable[Tuple[bytes, bytes]]] = None,
+               progress_callback=None) -> Dict[str, Any]:
+    """
+    压缩已打开的 LevelDB 数据库
+
+    Args:
+        db: LevelDB 数据库对象
+        db_dir (str): 数据库目录，用于统计压缩前后的大小
+        key_ranges: 可选的键范围列表 [(start, end), ...]，只压缩被修改过的范围；
+                    为 None 时压缩整个数据库。当前的 LevelDB 绑定不支持按范围压缩时，
+                    会退回到整库压缩
+        progress_callback: 可选的进度回调函数，格式为 callback(current, total, message)
+
+    Returns:
+        dict: 包含压缩前后字节数和耗时的统计信息
+    """
+    stats = {
+        'bytes_before': get_directory_size(db_dir),
+        'bytes_after': 0,
+        'bytes_reclaimed': 0,
+        'compacted_ranges': 0,
+        'full_compaction': False,
+        'elapsed_seconds': 0.0
+    }
+    start_time = time.time()
+
+    key_ranges = list(key_ranges) if key_ranges is not None else None
+    compact_range = getattr(db, "compact_range", None)
+
+    if key_ranges and compact_range is not None:
+        total = len(key_ranges)
+        for index, (start, end) in enumerate(key_ranges, 1):
+            if progress_callback:
+                progress_callback(index - 1, total, f"压缩键范围 {index}/{total}")
+            compact_range(start, end)
+            stats['compacted_ranges'] += 1
+        if progress_callback:
+            progress_callback(total, total, "键范围压缩完成")
+    else:
+        if key_ranges:
+            print("提示: 当前LevelDB绑定不支持按范围压缩，将压缩整个数据库")
+        if progress_callback:
+            progress_callback(0, 1, "正在压缩整个数据库...")
+        db.compact()
+        stats['full_compaction'] = True
+        if progress_callback:
+            progress_callback(1, 1, "数据库压缩完成")
+
+    stats['elapsed_seconds'] = time.time() - start_time
+    stats['bytes_after'] = get_directory_size(db_dir)
+    stats['bytes_reclaimed'] = stats['bytes_before'] - stats['bytes_after']
+    return stats
+
+
+def print_compaction_stats(stats: Dict[str, Any]):
+    """打印压缩统计信息"""
+    print("-" * 50)
+    print("数据库压缩统计:")
+    print(f"压缩前大小: {stats['bytes_before'] / 1024 / 1024:.2f} MB")
+    print(f"压缩后大小: {stats['bytes_after'] / 1024 / 1024:.2f} MB")
+    print(f"回收空间: {stats['bytes_reclaimed'] / 1024 / 1024:.2f} MB")
+    if stats['full_compaction']:
+        print("压缩方式: 整库压缩")
+    else:
+        print(f"压缩方式: 按范围压缩 ({stats['compacted_ranges']} 个范围)")
+    print(f"耗时: {stats['elapsed_seconds']:.1f} 秒")
+
+
+def compact_world_directory(world_path: str, progress_callback=None) -> Optional[Dict[str, Any]]:
+    """
+    打开一个未被占用的世界并压缩其整个数据库
+
+    Args:
+        world_path (str): Minecraft世界路径（包含 db 目录）
+        progress_callback: 可选的进度回调函数，格式为 callback(current, total, message)
+
+    Returns:
+        Optional[dict]: 压缩统计信息，失败时返回 None
+    """
+    from leveldb import LevelDB
+
+    db_dir = get_db_directory(world_path)
+    if not os.path.isdir(db_dir):
+        print(f"错误: 找不到数据库目录 {db_dir}")
+        return None
+
+    try:
+        db = LevelDB(db_dir)
+    except Exception as e:
+        print(f"打开数据库失败（请确认服务器已关闭）: {e}")
+        return None
+
+    try:
+        print(f"开始压缩世界数据库: {db_dir}")
+        stats = compact_db(db, db_dir, progress_callback=progress_callback)
+    finally:
+        db.close()
+
+    # 关闭后重新统计，确保包含关闭时写出的文件
+    stats['bytes_after'] = get_directory_size(db_dir)
+    stats['bytes_reclaimed'] = stats['bytes_before'] - stats['bytes_after']
+    print_compaction_stats(stats)
+    return stats
+
+
+def main():
+    """命令行入口"""
+    if len(sys.argv) < 2:
+        print("用法: python world_compaction.py <世界路径>")
+        return
+
+    def progress_callback(current, total, message):
+        print(message)
+
+    compact_world_directory(sys.argv[1], progress_callback=progress_callback)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,511 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+世界快照与原子替换（尽量减少停服时间）
+
+通常在重置期间服务器必须一直关闭：加载、扫描、删除、保存全部完成后才能重新开服。
+快照模式把耗时的工作移到服务器运行期间：
+    1. 在服务器控制台执行 save hold，等待 save query 显示可以复制后创建快照。
+       LevelDB 的表文件（.ldb/.sst）写入后不会再被修改，快照优先使用写时复制（reflink），
+       不支持时使用硬链接，其余少量可变文件（MANIFEST、日志等）直接复制，几乎瞬间完成。
+       完成后执行 save resume，服务器继续运行。
+    2. 对快照中的世界副本（work）执行扫描、删除和保存，服务器不受影响。
+    3. 关闭服务器，执行替换：把运行期间玩家对世界的修改合并到副本中，再把副本的 db 目录替换回世界。
+       如果运行期间被修改的区块恰好是本次被重置的区块，则放弃替换并列出冲突的区块。
+       重置引擎保存副本时会把被重置的区块记录到 snapshot.json，停服期间只需比较快照与运行中的世界。
+
+快照目录结构：
+    <快照目录>/base/db      创建快照时的原始数据库（只读，用于比较）
+    <快照目录>/work/        世界副本，重置在这里进行
+    <快照目录>/snapshot.json
+
+使用方法：
+    python world_snapshot.py create path/to/world
+    python ChunkAutoResetter.py ...  (对 path/to/world_snapshot/work 执行重置)
+    python world_snapshot.py swap path/to/world
+
+Author: DEVILENMO
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+
+from bedrock_keys import ACTOR_PREFIX, DIGP_PREFIX, iter_prefix, parse_chunk_key, parse_digp_key, split_actor_ids
+from world_compaction import get_db_directory
+
+SNAPSHOT_SUFFIX = "_snapshot"
+MANIFEST_NAME = "snapshot.json"
+
+# LevelDB 写入后不再修改的表文件，可以安全地使用硬链接
+IMMUTABLE_EXTENSIONS = (".ldb", ".sst")
+# 比较数据库文件时忽略的文件（LevelDB 自身的文本日志和锁文件）
+IGNORED_DB_FILES = ("LOCK", "LOG", "LOG.old")
+
+# Linux 的 FICLONE ioctl，用于在 btrfs / XFS 等文件系统上创建写时复制副本
+FICLONE = 0x40049409
+
+
+def get_default_snapshot_path(world_path: str) -> str:
+    """获取世界默认的快照目录"""
+    return os.path.normpath(world_path) + SNAPSHOT_SUFFIX
+
+
+def _reflink(src: str, dst: str) -> bool:
+    """尝试创建写时复制副本，文件系统不支持时返回 False"""
+    if not sys.platform.startswith("linux"):
+        return False
+    import fcntl
+    try:
+        with open(src, "rb") as src_file, open(dst, "wb") as dst_file:
+            fcntl.ioctl(dst_file.fileno(), FICLONE, src_file.fileno())
+        return True
+    except OSError:
+        try:
+            os.remove(dst)
+        except OSError:
+            pass
+        return False
+
+
+def _clone_file(src: str, dst: str) -> str:
+    """
+    复制一个数据库文件，优先使用写时复制，其次硬链接（仅限不可变的表文件），最后普通复制
+
+    Returns:
+        str: 使用的方式 reflink / hardlink / copy
+    """
+    if _reflink(src, dst):
+        return "reflink"
+    if src.endswith(IMMUTABLE_EXTENSIONS):
+        try:
+            os.link(src, dst)
+            return "hardlink"
+        except OSError:
+            pass
+    shutil.copy2(src, dst)
+    return "copy"
+
+
+def clone_db_directory(src_dir: str, dst_dir: str) -> Dict[str, int]:
+    """
+    克隆一个 LevelDB 目录
+
+    Returns:
+        dict: 各复制方式的文件数量和复制的字节数
+    """
+    os.makedirs(dst_dir)
+    stats = {"reflink": 0, "hardlink": 0, "copy": 0, "copied_bytes": 0}
+    for name in sorted(os.listdir(src_dir)):
+        src = os.path.join(src_dir, name)
+        if name == "LOCK" or not os.path.isfile(src):
+            continue
+        method = _clone_file(src, os.path.join(dst_dir, name))
+        stats[method] += 1
+        if method == "copy":
+            stats["copied_bytes"] += os.path.getsize(src)
+    return stats
+
+
+def get_db_signature(db_dir: str) -> Dict[str, Tuple[int, int]]:
+    """获取数据库目录的文件签名 {文件名: (大小, 修改时间)}，用于快速判断数据库是否被修改"""
+    signature = {}
+    for name in os.listdir(db_dir):
+        path = os.path.join(db_dir, name)
+        if name in IGNORED_DB_FILES or not os.path.isfile(path):
+            continue
+        stat = os.stat(path)
+        signature[name] = (stat.st_size, stat.st_mtime_ns)
+    return signature
+
+
+def create_snapshot(world_path: str, snapshot_path: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """
+    为世界创建快照（调用前应在服务器控制台执行 save hold）
+
+    Args:
+        world_path (str): Minecraft世界路径
+        snapshot_path (str): 快照目录，默认为 <世界路径>_snapshot
+
+    Returns:
+        Optional[dict]: 快照信息（含 work_path，即用于重置的世界副本路径），失败时返回 None
+    """
+    snapshot_path = snapshot_path or get_default_snapshot_path(world_path)
+    db_dir = get_db_directory(world_path)
+    if not os.path.isdir(db_dir):
+        print(f"错误: 找不到数据库目录 {db_dir}")
+        return None
+    if os.path.exists(snapshot_path):
+        print(f"错误: 快照目录已存在 {snapshot_path}，请先替换或删除旧快照")
+        return None
+
+    start_time = time.time()
+    work_path = os.path.join(snapshot_path, "work")
+    try:
+        signature = get_db_signature(db_dir)
+        base_stats = clone_db_directory(db_dir, os.path.join(snapshot_path, "base", "db"))
+        work_stats = clone_db_directory(db_dir, get_db_directory(work_path))
+        db_elapsed = time.time() - start_time
+
+        # 数据库以外的文件（level.dat 等）服务器运行时也可能被修改，但替换时只替换 db 目录，这里复制一份供加载世界使用
+        shutil.copytree(world_path, work_path, dirs_exist_ok=True,
+                        ignore=lambda directory, names: ["db"] if os.path.samefile(directory, world_path) else [])
+
+        info = {
+            "world_path": os.path.abspath(world_path),
+            "work_path": os.path.abspath(work_path),
+            "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "db_signature": signature,
+            "clone_stats": work_stats,
+        }
+        with open(os.path.join(snapshot_path, MANIFEST_NAME), "w", encoding="utf-8") as f:
+            json.dump(info, f, ensure_ascii=False, indent=2)
+    except Exception as e:
+        # 删除没有创建完成的快照目录，否则之后的创建会因为目录已存在而被拒绝
+        print(f"创建快照失败: {e}")
+        shutil.rmtree(snapshot_path, ignore_errors=True)
+        return None
+
+    print(f"快照已创建: {snapshot_path}")
+    print(f"数据库克隆耗时: {db_elapsed:.2f} 秒 (写时复制 {work_stats['reflink']} 个, "
+          f"硬链接 {work_stats['hardlink']} 个, 复制 {work_stats['copy']} 个文件 / "
+          f"{(base_stats['copied_bytes'] + work_stats['copied_bytes']) / 1024 / 1024:.2f} MB)")
+    print(f"现在可以在服务器控制台执行 save resume，然后对 {work_path} 执行重置")
+    return info
+
+
+def find_snapshot_manifest(work_path: str) -> Optional[str]:
+    """
+    世界路径是某个快照的世界副本（work）时返回该快照的 snapshot.json 路径，否则返回 None
+    """
+    work_path = os.path.abspath(work_path)
+    manifest_path = os.path.join(os.path.dirname(work_path), MANIFEST_NAME)
+    if not os.path.exists(manifest_path):
+        return None
+    try:
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            info = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return manifest_path if os.path.normcase(info.get("work_path", "")) == os.path.normcase(work_path) else None
+
+
+def record_reset_chunks(work_path: str, chunks: Iterable[Tuple[int, int, int]]) -> Optional[int]:
+    """
+    把世界副本中被重置（删除或修改）的区块追加记录到快照的 snapshot.json
+
+    替换时直接使用这份列表判断冲突，不必在停服期间比较快照与整个世界副本。
+    应在重置结果保存到副本之后调用。
+
+    Args:
+        work_path (str): 世界副本路径
+        chunks (iterable): 被重置的区块 [(dim_id, cx, cz), ...]
+
+    Returns:
+        Optional[int]: 记录后的区块总数，work_path 不是快照的世界副本时返回 None
+    """
+    manifest_path = find_snapshot_manifest(work_path)
+    if manifest_path is None:
+        return None
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        info = json.load(f)
+    recorded = {tuple(chunk) for chunk in info.get("reset_chunks", [])}
+    recorded.update(tuple(chunk) for chunk in chunks)
+    info["reset_chunks"] = [list(chunk) for chunk in sorted(recorded)]
+    fd, temp_path = tempfile.mkstemp(prefix=MANIFEST_NAME + ".", suffix=".tmp", dir=os.path.dirname(manifest_path))
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(info, f, ensure_ascii=False)
+        os.replace(temp_path, manifest_path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+    return len(recorded)
+
+
+def _iter_all(db) -> Iterator[Tuple[bytes, bytes]]:
+    """按键顺序遍历数据库的所有记录"""
+    return iter(db.iterate())
+
+
+def iter_db_differences(db_a, db_b) -> Iterator[Tuple[bytes, Optional[bytes], Optional[bytes]]]:
+    """
+    按键顺序合并遍历两个数据库，返回值不同的键
+
+    Yields:
+        tuple: (键, db_a 中的值, db_b 中的值)，键不存在时对应的值为 None
+    """
+    iter_a, iter_b = _iter_all(db_a), _iter_all(db_b)
+    item_a, item_b = next(iter_a, None), next(iter_b, None)
+    while item_a is not None or item_b is not None:
+        if item_b is None or (item_a is not None and item_a[0] < item_b[0]):
+            yield item_a[0], item_a[1], None
+            item_a = next(iter_a, None)
+        elif item_a is None or item_b[0] < item_a[0]:
+            yield item_b[0], None, item_b[1]
+            item_b = next(iter_b, None)
+        else:
+            if item_a[1] != item_b[1]:
+                yield item_a[0], item_a[1], item_b[1]
+            item_a, item_b = next(iter_a, None), next(iter_b, None)
+
+
+def get_key_chunk(key: bytes) -> Optional[Tuple[int, int, int]]:
+    """获取区块记录或实体摘要所属的区块 (dim_id, cx, cz)，其他记录（包括实体记录）返回 None"""
+    digest = parse_digp_key(key)
+    if digest is not None:
+        cx, cz, dim_id = digest
+        return dim_id, cx, cz
+    parsed = parse_chunk_key(key)
+    if parsed is not None:
+        cx, cz, dim_id = parsed[0], parsed[1], parsed[2]
+        return dim_id, cx, cz
+    return None
+
+
+def get_actor_owners(db) -> Dict[bytes, Tuple[int, int, int]]:
+    """
+    通过实体摘要（digp）得到每个实体所在的区块
+
+    Returns:
+        dict: {实体ID: (dim_id, cx, cz)}
+    """
+    owners = {}
+    for key, value in iter_prefix(db, DIGP_PREFIX):
+        digest = parse_digp_key(key)
+        if digest is None:
+            continue
+        cx, cz, dim_id = digest
+        for actor_id in split_actor_ids(value):
+            owners[actor_id] = (dim_id, cx, cz)
+    return owners
+
+
+def merge_live_changes(base_db, work_db, live_db, reset_chunks=None, progress_callback=None) -> Dict[str, Any]:
+    """
+    把快照之后运行中的世界产生的修改合并到世界副本中
+
+    比较 base 与运行中的世界：修改发生在未被重置的区块或区块以外的数据（玩家、地图等）时写入副本；
+    修改发生在被重置的区块中时记为冲突。实体记录（actorprefix）不包含坐标，按运行中的世界
+    和快照中的实体摘要（digp）归属到区块。先只读地检查全部修改，没有任何冲突时才写入副本，
+    有冲突时副本保持不变，可以安全地重试。
+
+    Args:
+        base_db: 快照时的原始数据库
+        work_db: 重置后的世界副本
+        live_db: 运行中的世界（服务器已关闭）
+        reset_chunks (set): 本次重置修改过的区块 {(dim_id, cx, cz), ...}（见 record_reset_chunks），
+                            None 时比较 base 与 work 得到
+        progress_callback: 可选的进度回调函数，格式为 callback(current, total, message)
+
+    Returns:
+        dict: 统计信息，conflict_chunks 为冲突区块列表 [(dim_id, cx, cz), ...]
+    """
+    stats = {
+        "reset_chunks": 0,
+        "live_changed_keys": 0,
+        "merged_keys": 0,
+        "conflict_chunks": [],
+    }
+
+    if reset_chunks is None:
+        if progress_callback:
+            progress_callback(0, 3, "快照中没有重置区块列表，比较快照与世界副本...")
+        reset_chunks = set()
+        for key, _, _ in iter_db_differences(base_db, work_db):
+            chunk = get_key_chunk(key)
+            if chunk is not None:
+                reset_chunks.add(chunk)
+    stats["reset_chunks"] = len(reset_chunks)
+
+    # 1. 只读：找出运行期间修改的键和冲突区块
+    if progress_callback:
+        progress_callback(1, 3, "比较快照与运行中的世界...")
+    conflicts = set()
+    changed_keys = []
+    actor_keys = []
+    for key, _, live_value in iter_db_differences(base_db, live_db):
+        stats["live_changed_keys"] += 1
+        if key.startswith(ACTOR_PREFIX):
+            actor_keys.append(key)
+        else:
+            chunk = get_key_chunk(key)
+            if chunk is not None and chunk in reset_chunks:
+                conflicts.add(chunk)
+                continue
+        changed_keys.append((key, live_value is None))
+
+    if actor_keys and reset_chunks:
+        # 实体快照时或现在所在的区块被重置过都算冲突
+        live_owners = get_actor_owners(live_db)
+        base_owners = get_actor_owners(base_db)
+        for key in actor_keys:
+            actor_id = key[len(ACTOR_PREFIX):]
+            for chunk in (base_owners.get(actor_id), live_owners.get(actor_id)):
+                if chunk is not None and chunk in reset_chunks:
+                    conflicts.add(chunk)
+
+    stats["conflict_chunks"] = sorted(conflicts)
+    if conflicts:
+        if progress_callback:
+            progress_callback(3, 3, "存在冲突，世界副本未修改")
+        return stats
+
+    # 2. 没有冲突，把修改写入副本
+    if progress_callback:
+        progress_callback(2, 3, f"合并 {len(changed_keys)} 条修改...")
+    batch = {}
+    for key, deleted in changed_keys:
+        if deleted:
+            work_db.delete(key)
+        else:
+            batch[key] = live_db.get(key)
+            if len(batch) >= 1000:
+                work_db.putBatch(batch)
+                batch.clear()
+        stats["merged_keys"] += 1
+    if batch:
+        work_db.putBatch(batch)
+
+    if progress_callback:
+        progress_callback(3, 3, "合并完成")
+    return stats
+
+
+def swap_snapshot(world_path: str, snapshot_path: Optional[str] = None, keep_backup: bool = True,
+                  progress_callback=None) -> Optional[Dict[str, Any]]:
+    """
+    把重置后的世界副本替换回世界（服务器必须已关闭）
+
+    Args:
+        world_path (str): Minecraft世界路径
+        snapshot_path (str): 快照目录，默认为 <世界路径>_snapshot
+        keep_backup (bool): 是否保留替换前的数据库目录（db.before_reset_<时间>）
+        progress_callback: 可选的进度回调函数，格式为 callback(current, total, message)
+
+    Returns:
+        Optional[dict]: 替换统计信息，swapped 为 False 表示存在冲突未替换；失败时返回 None
+    """
+    from leveldb import LevelDB
+
+    snapshot_path = snapshot_path or get_default_snapshot_path(world_path)
+    manifest_path = os.path.join(snapshot_path, MANIFEST_NAME)
+    if not os.path.exists(manifest_path):
+        print(f"错误: 找不到快照 {snapshot_path}")
+        return None
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        info = json.load(f)
+
+    live_dir = get_db_directory(world_path)
+    base_dir = os.path.join(snapshot_path, "base", "db")
+    work_dir = get_db_directory(info["work_path"])
+    start_time = time.time()
+
+    # 重置时记录的区块列表（见 record_reset_chunks），没有时在合并时比较 base 与 work 得到
+    reset_chunks = None
+    if "reset_chunks" in info:
+        reset_chunks = {tuple(chunk) for chunk in info["reset_chunks"]}
+
+    live_signature = get_db_signature(live_dir)
+    live_unchanged = live_signature == {name: tuple(value) for name, value in info["db_signature"].items()}
+
+    if live_unchanged:
+        print("快照之后世界数据库没有变化，直接替换")
+        stats = {"reset_chunks": len(reset_chunks) if reset_chunks is not None else None,
+                 "live_changed_keys": 0, "merged_keys": 0, "conflict_chunks": []}
+    else:
+        try:
+            live_db = LevelDB(live_dir)
+        except Exception as e:
+            print(f"打开世界数据库失败（请确认服务器已关闭）: {e}")
+            return None
+        base_db = LevelDB(base_dir)
+        work_db = LevelDB(work_dir)
+        try:
+            stats = merge_live_changes(base_db, work_db, live_db, reset_chunks, progress_callback)
+        finally:
+            live_db.close()
+            base_db.close()
+            work_db.close()
+
+    stats["swapped"] = False
+    stats["backup_path"] = None
+    if stats["conflict_chunks"]:
+        print(f"错误: 快照之后有 {len(stats['conflict_chunks'])} 个被重置的区块在运行中的世界里被修改，已放弃替换:")
+        for dim_id, cx, cz in stats["conflict_chunks"][:20]:
+            print(f"  维度 {dim_id} 区块 ({cx}, {cz})")
+        if len(stats["conflict_chunks"]) > 20:
+            print("  ...")
+        print("可以删除快照后重新创建快照并重置，或在停服状态下直接重置")
+        stats["elapsed_seconds"] = time.time() - start_time
+        return stats
+
+    backup_dir = f"{live_dir}.before_reset_{time.strftime('%Y%m%d_%H%M%S')}"
+    try:
+        os.replace(live_dir, backup_dir)
+    except OSError as e:
+        print(f"替换失败，无法移动世界数据库（请确认服务器已关闭）: {e}")
+        stats["elapsed_seconds"] = time.time() - start_time
+        return stats
+    try:
+        os.replace(work_dir, live_dir)
+    except OSError as e:
+        os.replace(backup_dir, live_dir)
+        print(f"替换失败，已恢复原数据库: {e}")
+        stats["elapsed_seconds"] = time.time() - start_time
+        return stats
+
+    stats["swapped"] = True
+    if keep_backup:
+        stats["backup_path"] = backup_dir
+    else:
+        shutil.rmtree(backup_dir, ignore_errors=True)
+    shutil.rmtree(snapshot_path, ignore_errors=True)
+    stats["elapsed_seconds"] = time.time() - start_time
+
+    print(f"替换完成，耗时 {stats['elapsed_seconds']:.2f} 秒")
+    print(f"合并了运行期间修改的 {stats['merged_keys']} 条记录")
+    if keep_backup:
+        print(f"原数据库已备份到: {backup_dir}")
+    return stats
+
+
+def main():
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="世界快照与原子替换工具")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    create_parser = subparsers.add_parser("create", help="创建世界快照（服务器执行 save hold 后）")
+    create_parser.add_argument("world", help="Minecraft世界路径")
+    create_parser.add_argument("--snapshot", help="快照目录，默认为 <世界路径>_snapshot")
+    create_parser.add_argument("--yes", action="store_true", help="不等待确认，直接创建")
+
+    swap_parser = subparsers.add_parser("swap", help="把重置后的世界副本替换回世界（服务器需关闭）")
+    swap_parser.add_argument("world", help="Minecraft世界路径")
+    swap_parser.add_argument("--snapshot", help="快照目录，默认为 <世界路径>_snapshot")
+    swap_parser.add_argument("--no-backup", action="store_true", help="替换后删除原数据库")
+
+    args = parser.parse_args()
+
+    def progress_callback(current, total, message):
+        print(message)
+
+    if args.command == "create":
+        if not args.yes:
+            input("请在服务器控制台执行 save hold，待 save query 显示可以复制后按回车...")
+        create_snapshot(args.world, args.snapshot)
+    elif args.command == "swap":
+        swap_snapshot(args.world, args.snapshot, keep_backup=not args.no_backup,
+                      progress_callback=progress_callback)
+
+
+if __name__ == "__main__":
+    main()